@@ -0,0 +1,139 @@
+# accounts/authentication.py
+import copy
+import time
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.functional import SimpleLazyObject, empty
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+
+# Attributs de l'utilisateur recopiés dans les jetons (voir CustomTokenObtainPairSerializer)
+USER_CLAIMS = ('role', 'is_staff', 'is_superuser', 'is_verified')
+VERSION_CLAIM = 'ver'
+
+def token_claims(user):
+    """Revendications ajoutées aux jetons d'un utilisateur"""
+    claims = {claim: getattr(user, claim) for claim in USER_CLAIMS}
+    claims[VERSION_CLAIM] = user.token_version
+    return claims
+
+class UserCache:
+    """
+    Cache local au processus, de courte durée, des utilisateurs authentifiés
+    par jeton: version des jetons et état actif (vérifiés à chaque requête),
+    et instance complète une fois chargée. Une révocation faite dans un autre
+    processus y est prise en compte après au plus ACCOUNTS['USER_CACHE_TIMEOUT']
+    secondes.
+    """
+
+    # user_id -> [expiration, token_version, is_active, instance ou None]
+    _entries = {}
+
+    @staticmethod
+    def _config(key, default):
+        return settings.ACCOUNTS.get(key, default)
+
+    @staticmethod
+    def _entry(user_id):
+        entry = UserCache._entries.get(user_id)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry
+        return None
+
+    @staticmethod
+    def _store(user_id, token_version, is_active, user=None):
+        entries = UserCache._entries
+        if len(entries) >= UserCache._config('USER_CACHE_MAX_SIZE', 10000):
+            now = time.monotonic()
+            for key in [key for key, entry in list(entries.items()) if entry[0] <= now]:
+                entries.pop(key, None)
+            if len(entries) >= UserCache._config('USER_CACHE_MAX_SIZE', 10000):
+                entries.clear()
+
+        entry = [time.monotonic() + UserCache._config('USER_CACHE_TIMEOUT', 30), token_version, is_active, user]
+        entries[user_id] = entry
+        return entry
+
+    @staticmethod
+    def state(user_id):
+        """(version des jetons, actif) de l'utilisateur, None s'il n'existe pas"""
+        entry = UserCache._entry(user_id)
+        if entry is None:
+            row = get_user_model().objects.filter(pk=user_id).values_list('token_version', 'is_active').first()
+            if row is None:
+                return None
+            entry = UserCache._store(user_id, *row)
+        return entry[1], entry[2]
+
+    @staticmethod
+    def user(user_id):
+        """Instance de l'utilisateur (copie propre à la requête), chargée au plus une fois par durée de cache"""
+        entry = UserCache._entry(user_id)
+        if entry is None or entry[3] is None:
+            user = get_user_model().objects.get(pk=user_id)
+            entry = UserCache._store(user_id, user.token_version, user.is_active, user)
+        return copy.copy(entry[3])
+
+    @staticmethod
+    def invalidate(user_id):
+        UserCache._entries.pop(user_id, None)
+
+class LazyUser(SimpleLazyObject):
+    """
+    Utilisateur authentifié par jeton. L'identifiant, le rôle et les statuts
+    portés par le jeton sont lus sans requête, ce qui suffit aux contrôles
+    de permissions; tout autre accès (attributs, save, isinstance,
+    comparaison avec une instance) charge l'utilisateur via UserCache.
+    """
+
+    def __init__(self, validated_token):
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        self.__dict__['_claims'] = {
+            'id': user_id,
+            **{claim: validated_token[claim] for claim in USER_CLAIMS}
+        }
+        super().__init__(lambda: UserCache.user(user_id))
+
+    def _claim(name):
+        def getter(self):
+            if self._wrapped is empty:
+                return self._claims[name]
+            return getattr(self._wrapped, name)
+        return property(getter)
+
+    pk = id = _claim('id')
+    role = _claim('role')
+    is_staff = _claim('is_staff')
+    is_superuser = _claim('is_superuser')
+    is_verified = _claim('is_verified')
+    del _claim
+
+    # Le compte a été vérifié actif lors de l'authentification
+    is_active = True
+    is_authenticated = True
+    is_anonymous = False
+
+class LazyJWTAuthentication(JWTAuthentication):
+    """
+    Authentification JWT sans chargement de l'utilisateur à chaque requête:
+    la version des jetons et l'état actif sont contrôlés via UserCache, et
+    request.user est un LazyUser. Les jetons émis sans les revendications
+    nécessaires passent par l'authentification standard.
+    """
+
+    def get_user(self, validated_token):
+        if VERSION_CLAIM not in validated_token or any(claim not in validated_token for claim in USER_CLAIMS):
+            return super().get_user(validated_token)
+
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        state = UserCache.state(user_id)
+        if state is None:
+            raise AuthenticationFailed("Utilisateur introuvable.", code='user_not_found')
+
+        token_version, is_active = state
+        if not is_active:
+            raise AuthenticationFailed("Ce compte est désactivé.", code='user_inactive')
+        if validated_token[VERSION_CLAIM] != token_version:
+            raise AuthenticationFailed("Ce jeton a été révoqué.", code='token_revoked')
+        return LazyUser(validated_token)
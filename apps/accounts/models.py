@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import F
 from django.contrib.auth.models import AbstractUser
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
@@ -31,11 +32,22 @@ class User(AbstractUser):
     # Champs de facturation
     billing_address = models.TextField(blank=True)
     
+    # Version des jetons JWT: les jetons émis avec une version antérieure sont refusés
+    token_version = models.PositiveIntegerField(default=0)
+    
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
     
     def __str__(self):
         return self.email
+    
+    def revoke_tokens(self):
+        """Invalide tous les jetons (accès et rafraîchissement) émis pour l'utilisateur"""
+        from .authentication import UserCache
+        
+        User.objects.filter(pk=self.pk).update(token_version=F('token_version') + 1)
+        self.refresh_from_db(fields=['token_version'])
+        UserCache.invalidate(self.pk)
 
 class OrganizerProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='organizer_profile')
@@ -1,7 +1,10 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from .models import OrganizerProfile
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from .authentication import VERSION_CLAIM, token_claims
 
 User = get_user_model()
 
@@ -98,10 +101,50 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         # Ajouter des informations supplémentaires au token
         token['email'] = user.email
         token['username'] = user.username
-        token['role'] = user.role
+        # Rôle, statuts et version utilisés par LazyJWTAuthentication
+        for claim, value in token_claims(user).items():
+            token[claim] = value
         
         return token
 
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Rafraîchissement refusé pour un jeton révoqué (version antérieure); le
+    nouveau jeton d'accès porte le rôle et les statuts actuels.
+    """
+    
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.filter(
+            **{api_settings.USER_ID_FIELD: refresh.payload.get(api_settings.USER_ID_CLAIM)}
+        ).first()
+        if (
+            user is None
+            or not api_settings.USER_AUTHENTICATION_RULE(user)
+            or refresh.payload.get(VERSION_CLAIM, user.token_version) != user.token_version
+        ):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+        
+        access = refresh.access_token
+        for claim, value in token_claims(user).items():
+            access[claim] = value
+        data = {'access': str(access)}
+        
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                try:
+                    refresh.blacklist()
+                except AttributeError:
+                    # Application token_blacklist non installée
+                    pass
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data['refresh'] = str(refresh)
+        
+        return data
+
 class PasswordResetRequestSerializer(serializers.Serializer):
     email = serializers.EmailField()
 
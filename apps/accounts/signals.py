@@ -0,0 +1,42 @@
+# accounts/signals.py
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .authentication import UserCache
+from .models import User
+
+# Rôles dont la perte retire des droits portés par les jetons
+PRIVILEGED_ROLES = ('organizer', 'admin')
+
+@receiver(pre_save, sender=User)
+def revoke_tokens_on_security_change(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Révoque les jetons existants (nouvelle version) lorsque le mot de passe
+    change, que le compte est désactivé ou qu'il perd des droits portés par
+    les jetons. Les droits acquis sont pris en compte au rafraîchissement.
+    """
+    watched = {'password', 'is_active', 'is_staff', 'is_superuser', 'is_verified', 'role'}
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not watched & set(update_fields):
+        return
+
+    previous = User.objects.filter(pk=instance.pk).values(*watched, 'token_version').first()
+    if previous is None:
+        return
+
+    revoked = (
+        previous['password'] != instance.password
+        or any(previous[flag] and not getattr(instance, flag) for flag in ('is_active', 'is_staff', 'is_superuser', 'is_verified'))
+        or (previous['role'] in PRIVILEGED_ROLES and instance.role != previous['role'])
+    )
+    if revoked:
+        instance.token_version = previous['token_version'] + 1
+        if update_fields is not None and 'token_version' not in update_fields:
+            # Enregistrement partiel: la nouvelle version est écrite à part
+            User.objects.filter(pk=instance.pk).update(token_version=F('token_version') + 1)
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    UserCache.invalidate(instance.pk)
@@ -0,0 +1,97 @@
+import asyncio
+import time
+from django.test import TestCase, TransactionTestCase
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from apps.core.testing import QueryCounter
+from apps.notifications.views import notification_stream
+from .authentication import LazyJWTAuthentication, LazyUser, UserCache
+from .models import User
+from .serializers import CustomTokenObtainPairSerializer
+
+class LazyJWTAuthenticationTests(TestCase):
+    factory = APIRequestFactory()
+
+    def setUp(self):
+        UserCache._entries.clear()
+        self.user = User.objects.create_user(email='user@example.com', username='user', password='x', role='organizer')
+
+    def access_token(self):
+        return str(CustomTokenObtainPairSerializer.get_token(self.user).access_token)
+
+    def authenticate(self, authentication, token):
+        request = self.factory.get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        return authentication.authenticate(request)
+
+    def test_claims_read_without_loading_user(self):
+        user, _ = self.authenticate(LazyJWTAuthentication(), self.access_token())
+        with QueryCounter() as queries:
+            self.assertIsInstance(user, LazyUser)
+            self.assertEqual((user.pk, user.role, user.is_authenticated), (self.user.pk, 'organizer', True))
+        self.assertEqual(queries.count, 0)
+
+    def test_revoked_token_rejected(self):
+        token = self.access_token()
+        self.authenticate(LazyJWTAuthentication(), token)
+        self.user.revoke_tokens()
+        with self.assertRaises(AuthenticationFailed) as context:
+            self.authenticate(LazyJWTAuthentication(), token)
+        self.assertEqual(context.exception.detail['code'], 'token_revoked')
+
+    def test_inactive_user_rejected(self):
+        token = self.access_token()
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        UserCache.invalidate(self.user.pk)
+        with self.assertRaises(AuthenticationFailed) as context:
+            self.authenticate(LazyJWTAuthentication(), token)
+        self.assertEqual(context.exception.detail['code'], 'user_inactive')
+
+    def test_authentication_throughput(self):
+        # Débit d'authentification comparé à l'authentification standard (chargement de l'utilisateur)
+        token = self.access_token()
+        iterations = 300
+        results = {}
+        for authentication in (JWTAuthentication(), LazyJWTAuthentication()):
+            self.authenticate(authentication, token)
+            with QueryCounter() as queries:
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    self.authenticate(authentication, token)
+                elapsed = time.perf_counter() - started
+            results[type(authentication).__name__] = (queries.count, iterations / elapsed)
+
+        self.assertEqual(results['JWTAuthentication'][0], iterations)
+        self.assertEqual(results['LazyJWTAuthentication'][0], 0)
+        self.assertGreater(results['LazyJWTAuthentication'][1], results['JWTAuthentication'][1])
+
+class NotificationStreamAuthenticationTests(TransactionTestCase):
+    # Le flux est asynchrone: ses requêtes passent par un autre thread
+    factory = APIRequestFactory()
+
+    def setUp(self):
+        UserCache._entries.clear()
+        self.user = User.objects.create_user(email='user@example.com', username='user', password='x')
+        self.token = str(CustomTokenObtainPairSerializer.get_token(self.user).access_token)
+
+    def open_stream(self):
+        request = self.factory.get('/api/realtime/events/', {'token': self.token})
+        return asyncio.run(notification_stream(request))
+
+    def test_missing_token_rejected(self):
+        response = asyncio.run(notification_stream(self.factory.get('/api/realtime/events/')))
+        self.assertEqual(response.status_code, 401)
+
+    def test_revoked_token_rejected(self):
+        self.user.revoke_tokens()
+        self.assertEqual(self.open_stream().status_code, 401)
+
+    def test_inactive_user_rejected(self):
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.open_stream().status_code, 401)
+
+    def test_valid_token_opens_stream(self):
+        response = self.open_stream()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
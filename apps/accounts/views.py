@@ -3,6 +3,7 @@ from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from django.contrib.auth import get_user_model
+from apps.core.throttling import WRITE_THROTTLES
 from .models import OrganizerProfile, PasswordResetToken
 from .serializers import (
     UserSerializer, 
@@ -10,6 +11,7 @@ from .serializers import (
     UserRegistrationSerializer,
     OrganizerRegistrationSerializer,
     CustomTokenObtainPairSerializer,
+    CustomTokenRefreshSerializer,
     PasswordResetRequestSerializer,
     PasswordResetConfirmSerializer
 )
@@ -32,7 +34,7 @@ class CustomTokenRefreshView(TokenRefreshView):
     """
     Custom view for refreshing tokens.
     """
-    pass
+    serializer_class = CustomTokenRefreshSerializer
 
 class UserRegistrationView(generics.CreateAPIView):
     queryset = User.objects.all()
@@ -134,6 +136,13 @@ class UserViewSet(viewsets.ModelViewSet):
 
 class PasswordResetRequestView(APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_classes = WRITE_THROTTLES
+    throttle_scope = 'password_reset'
+    
+    def get_throttle_resource(self, request):
+        # Demandes limitées par adresse visée
+        email = request.data.get('email') if isinstance(request.data, dict) else None
+        return email.strip().lower() if isinstance(email, str) else None
     
     def post(self, request):
         serializer = PasswordResetRequestSerializer(data=request.data)
@@ -1,8 +1,7 @@
 from django.db.models import Count, Sum, Avg, F, Case, When, IntegerField, Q
+from django.db.models.functions import TruncHour, TruncDate, TruncWeek, TruncMonth
 from django.utils import timezone
 import datetime
-import pandas as pd
-import numpy as np
 from apps.events.models import Event
 from apps.registrations.models import Registration, TicketType, TicketPurchase
 from apps.payments.models import Payment
@@ -168,56 +167,43 @@ class EventAnalyticsService:
             'form_usage': form_usage
         }
     
+    # Fonctions de troncature disponibles pour la timeline des inscriptions
+    TIMELINE_INTERVALS = {
+        'hour': TruncHour,
+        'day': TruncDate,
+        'week': TruncWeek,
+        'month': TruncMonth,
+    }
+    
+    @staticmethod
+    def iter_registration_timeline(event_id, interval='day', chunk_size=2000):
+        """
+        Parcourt la timeline des inscriptions d'un événement par blocs.
+        
+        L'agrégation (troncature + comptages conditionnels par statut) est faite
+        en base: seules les lignes agrégées sont lues, via un curseur itératif.
+        """
+        trunc_class = EventAnalyticsService.TIMELINE_INTERVALS.get(interval, TruncDate)
+        
+        timeline = Registration.objects.filter(event_id=event_id).annotate(
+            interval=trunc_class('created_at')
+        ).values('interval').annotate(
+            pending=Count('id', filter=Q(status='pending')),
+            confirmed=Count('id', filter=Q(status='confirmed')),
+            cancelled=Count('id', filter=Q(status='cancelled'))
+        ).order_by('interval')
+        
+        for row in timeline.iterator(chunk_size=chunk_size):
+            row['total'] = row['pending'] + row['confirmed'] + row['cancelled']
+            yield row
+    
     @staticmethod
     def get_registration_timeline(event_id, interval='day'):
         """Génère une timeline des inscriptions pour un événement"""
-        try:
-            event = Event.objects.get(id=event_id)
-        except Event.DoesNotExist:
+        if not Event.objects.filter(id=event_id).exists():
             return {'error': 'Événement non trouvé'}
         
-        registrations = Registration.objects.filter(event=event).order_by('created_at')
-        
-        # Convertir en DataFrame pandas pour l'analyse
-        if not registrations.exists():
-            return []
-        
-        # Extraire les données nécessaires
-        reg_data = []
-        for reg in registrations:
-            reg_data.append({
-                'created_at': reg.created_at,
-                'status': reg.status
-            })
-        
-        df = pd.DataFrame(reg_data)
-        
-        # Définir l'intervalle pour le regroupement
-        if interval == 'hour':
-            df['interval'] = df['created_at'].dt.floor('H')
-        elif interval == 'day':
-            df['interval'] = df['created_at'].dt.date
-        elif interval == 'week':
-            df['interval'] = df['created_at'].dt.to_period('W').dt.start_time
-        elif interval == 'month':
-            df['interval'] = df['created_at'].dt.to_period('M').dt.start_time
-        
-        # Grouper et compter
-        timeline = df.groupby(['interval', 'status']).size().unstack(fill_value=0).reset_index()
-        
-        # Formater pour la sortie
-        result = []
-        for _, row in timeline.iterrows():
-            data_point = {
-                'interval': row['interval'],
-                'pending': int(row.get('pending', 0)),
-                'confirmed': int(row.get('confirmed', 0)),
-                'cancelled': int(row.get('cancelled', 0)),
-                'total': int(row.get('pending', 0) + row.get('confirmed', 0) + row.get('cancelled', 0))
-            }
-            result.append(data_point)
-        
-        return result
+        return list(EventAnalyticsService.iter_registration_timeline(event_id, interval))
     
     @staticmethod
     def predict_attendance(event_id):
@@ -0,0 +1,228 @@
+import math
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, IntegerField
+from django.db.models.functions import Cast, Floor, Least
+from apps.events.models import CustomFormField
+from apps.registrations.models import FormFieldAnswer, Registration
+
+class FormAnalyticsService:
+    """Analyse champ par champ des soumissions de formulaires personnalisés"""
+
+    CHOICE_TYPES = ('select', 'radio', 'checkbox')
+    TEXT_TYPES = ('text', 'textarea', 'email', 'phone')
+    NUMERIC_TYPES = ('number',)
+    HISTOGRAM_BINS = 10
+
+    @staticmethod
+    def _cache_key(event_id):
+        """Clé de cache de l'état incrémental d'un événement"""
+        return f"analytics:form_fields:{event_id}"
+
+    @staticmethod
+    def _fields_signature(fields):
+        """Signature des champs: toute modification du formulaire invalide l'état"""
+        return [(field.id, field.label, field.field_type, field.options) for field in fields]
+
+    @staticmethod
+    def _empty_state(fields):
+        """État initial (aucune réponse traitée)"""
+        return {
+            'signature': FormAnalyticsService._fields_signature(fields),
+            'watermark': 0,  # Identifiant de la dernière réponse traitée
+            'rows': 0,  # Réponses traitées (identifiants <= watermark)
+            'last': None,  # (inscription, champ) de la dernière réponse traitée
+            'fields': {
+                field.id: {
+                    'filled': 0,
+                    'invalid': 0,
+                    'values': {},
+                    # Moments des réponses numériques (taille de l'état indépendante du nombre de valeurs)
+                    'count': 0,
+                    'sum': 0.0,
+                    'sum_squares': 0.0,
+                    'min': None,
+                    'max': None,
+                    'length_count': 0,
+                    'length_sum': 0,
+                    'length_min': None,
+                    'length_max': None,
+                }
+                for field in fields
+            }
+        }
+
+    @staticmethod
+    def _is_filled(value):
+        return value not in (None, '', [], {})
+
+    @staticmethod
+    def _update_field(stats, field_type, value, value_text, value_number):
+        """Ajoute une réponse (une option pour une réponse multiple) aux compteurs d'un champ"""
+        if field_type in FormAnalyticsService.CHOICE_TYPES:
+            stats['values'][value_text] = stats['values'].get(value_text, 0) + 1
+
+        elif field_type in FormAnalyticsService.NUMERIC_TYPES:
+            if value_number is None or not math.isfinite(value_number):
+                stats['invalid'] += 1
+                return
+            stats['count'] += 1
+            stats['sum'] += value_number
+            stats['sum_squares'] += value_number * value_number
+            if stats['min'] is None or value_number < stats['min']:
+                stats['min'] = value_number
+            if stats['max'] is None or value_number > stats['max']:
+                stats['max'] = value_number
+
+        elif field_type in FormAnalyticsService.TEXT_TYPES:
+            length = len(str(value))
+            stats['length_count'] += 1
+            stats['length_sum'] += length
+            if stats['length_min'] is None or length < stats['length_min']:
+                stats['length_min'] = length
+            if stats['length_max'] is None or length > stats['length_max']:
+                stats['length_max'] = length
+
+    @staticmethod
+    def _histogram(field_id, minimum, maximum):
+        """Histogramme à pas constant, calculé par la base sur l'index (champ, valeur numérique)"""
+        bins = FormAnalyticsService.HISTOGRAM_BINS if maximum > minimum else 1
+        width = (maximum - minimum) / bins if maximum > minimum else 1
+
+        counts = dict(FormFieldAnswer.objects.filter(
+            field_id=field_id,
+            value_number__gte=minimum,
+            value_number__lte=maximum
+        ).annotate(
+            bin=Least(Cast(Floor((F('value_number') - minimum) / width), IntegerField()), bins - 1)
+        ).values('bin').annotate(count=Count('id')).values_list('bin', 'count').order_by())
+
+        return [
+            {
+                'start': round(minimum + i * width, 2),
+                'end': round(minimum + (i + 1) * width, 2),
+                'count': counts.get(i, 0)
+            }
+            for i in range(bins)
+        ]
+
+    @staticmethod
+    def _numeric_summary(field_id, stats):
+        """Statistiques à partir des moments et histogramme des réponses numériques"""
+        count = stats['count']
+        if not count:
+            return {'count': 0, 'min': None, 'max': None, 'mean': None, 'std': None, 'histogram': []}
+
+        mean = stats['sum'] / count
+        variance = max(stats['sum_squares'] / count - mean * mean, 0)
+        return {
+            'count': count,
+            'min': stats['min'],
+            'max': stats['max'],
+            'mean': round(mean, 2),
+            'std': round(math.sqrt(variance), 2),
+            'histogram': FormAnalyticsService._histogram(field_id, stats['min'], stats['max'])
+        }
+
+    @staticmethod
+    def _format(fields, state, total):
+        """Met en forme l'analyse des champs à partir de l'état"""
+        analysis = []
+
+        for field in fields:
+            stats = state['fields'][field.id]
+            data = {
+                'field_id': field.id,
+                'label': field.label,
+                'field_type': field.field_type,
+                'required': field.required,
+                'responses': stats['filled'],
+                'completion_rate': round(stats['filled'] / total * 100, 2) if total > 0 else 0
+            }
+
+            if field.field_type in FormAnalyticsService.CHOICE_TYPES:
+                data['distribution'] = [
+                    {
+                        'value': value,
+                        'count': count,
+                        'percentage': round(count / stats['filled'] * 100, 2) if stats['filled'] > 0 else 0
+                    }
+                    for value, count in sorted(stats['values'].items(), key=lambda item: -item[1])
+                ]
+            elif field.field_type in FormAnalyticsService.NUMERIC_TYPES:
+                data['numeric'] = FormAnalyticsService._numeric_summary(field.id, stats)
+                data['numeric']['invalid'] = stats['invalid']
+            elif field.field_type in FormAnalyticsService.TEXT_TYPES:
+                data['text_length'] = {
+                    'min': stats['length_min'],
+                    'max': stats['length_max'],
+                    'mean': round(stats['length_sum'] / stats['length_count'], 2) if stats['length_count'] else None
+                }
+
+            analysis.append(data)
+
+        return analysis
+
+    @staticmethod
+    def analyze_event_fields(event_id, chunk_size=2000):
+        """
+        Analyse les réponses de chaque champ du formulaire d'un événement.
+
+        Les réponses normalisées (FormFieldAnswer, une ligne par champ ou par
+        option cochée) sont lues par blocs. L'état agrégé est conservé en cache
+        avec l'identifiant de la dernière réponse traitée: une nouvelle
+        exécution ne lit que les réponses plus récentes. Une inscription
+        modifiée ou supprimée fait disparaître ses anciennes réponses: le
+        nombre de réponses déjà traitées encore présentes est contrôlé à chaque
+        exécution et relance l'analyse complète, comme toute modification des
+        champs du formulaire.
+        """
+        fields = list(CustomFormField.objects.filter(event_id=event_id))
+        if not fields:
+            return []
+
+        field_types = {field.id: field.field_type for field in fields}
+        answers = FormFieldAnswer.objects.filter(field_id__in=field_types)
+
+        cache_key = FormAnalyticsService._cache_key(event_id)
+        state = cache.get(cache_key)
+        rebuilt = (
+            state is None
+            or state['signature'] != FormAnalyticsService._fields_signature(fields)
+            or answers.filter(id__lte=state['watermark']).count() != state['rows']
+        )
+        if rebuilt:
+            state = FormAnalyticsService._empty_state(fields)
+
+        rows = answers.filter(id__gt=state['watermark']).order_by('id').values_list(
+            'id', 'registration_id', 'field_id', 'value', 'value_text', 'value_number'
+        )
+
+        processed = 0
+        last = state['last']
+        for answer_id, registration_id, field_id, value, value_text, value_number in rows.iterator(chunk_size=chunk_size):
+            processed += 1
+            state['watermark'] = answer_id
+            if not FormAnalyticsService._is_filled(value):
+                continue
+
+            stats = state['fields'][field_id]
+            # Les options d'une même réponse sont enregistrées ensemble
+            key = (str(registration_id), field_id)
+            if key != last:
+                stats['filled'] += 1
+                last = key
+            FormAnalyticsService._update_field(stats, field_types[field_id], value, value_text, value_number)
+
+        state['rows'] += processed
+        state['last'] = last
+
+        if processed or rebuilt:
+            cache.set(
+                cache_key,
+                state,
+                settings.ANALYTICS.get('FORM_ANALYSIS_CACHE_TIMEOUT', 7 * 24 * 3600)
+            )
+
+        total = Registration.objects.filter(event_id=event_id, registration_type='inscription').count()
+        return FormAnalyticsService._format(fields, state, total)
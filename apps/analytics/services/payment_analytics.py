@@ -1,9 +1,9 @@
 from django.db.models import Sum, Count, Avg, F, Min, Max, Window, ExpressionWrapper, DateField
 from django.db.models.functions import TruncDate, TruncMonth, TruncWeek, TruncDay
 from django.utils import timezone
+from django.core.cache import cache
+from django.conf import settings
 import datetime
-import pandas as pd
-import numpy as np
 from apps.payments.models import Payment
 from apps.events.models import Event
 from django.db.models import FloatField
@@ -123,28 +123,150 @@ class PaymentAnalyticsService:
             }
         }
     
+    # Paramètres par intervalle: fonction de troncature, fréquence pandas,
+    # nombre de périodes à prédire et saisonnalité utilisée pour la prévision
+    TREND_INTERVALS = {
+        'day': (TruncDay, 'D', 7, 'weekday'),
+        'week': (TruncWeek, 'W-MON', 4, None),
+        'month': (TruncMonth, 'MS', 3, 'month'),
+    }
+    
     @staticmethod
-    def get_revenue_trends(interval='day', periods=30, organizer_id=None):
-        """Analyse des tendances de revenus avec prédiction pour les périodes futures"""
-        
-        # Définir la date de début en fonction de l'intervalle et du nombre de périodes
-        if interval == 'day':
-            start_date = timezone.now() - datetime.timedelta(days=periods)
-            trunc_func = TruncDay('payment_date')
-            future_periods = 7  # Prédire 7 jours
-        elif interval == 'week':
-            start_date = timezone.now() - datetime.timedelta(weeks=periods)
-            trunc_func = TruncWeek('payment_date')
-            future_periods = 4  # Prédire 4 semaines
+    def _trends_cache_key(interval, periods, organizer_id):
+        """Clé de cache des tendances pour un couple (organisateur, intervalle)"""
+        return f"analytics:revenue_trends:{organizer_id or 'all'}:{interval}:{periods}"
+    
+    @staticmethod
+    def _trends_start_date(interval, periods):
+        """Date de début de la fenêtre d'analyse"""
+        if interval == 'week':
+            return timezone.now() - datetime.timedelta(weeks=periods)
+        if interval == 'month':
+            return timezone.now() - datetime.timedelta(days=periods*30)
+        return timezone.now() - datetime.timedelta(days=periods)
+    
+    @staticmethod
+    def _period_grid(interval, start_date):
+        """Grille continue des périodes entre le début de la fenêtre et maintenant"""
+        import pandas as pd
+        
+        freq = PaymentAnalyticsService.TREND_INTERVALS[interval][1]
+        start = pd.Timestamp(timezone.localtime(start_date)).normalize()
+        if interval == 'week':
+            start -= pd.Timedelta(days=start.weekday())
         elif interval == 'month':
-            start_date = timezone.now() - datetime.timedelta(days=periods*30)
-            trunc_func = TruncMonth('payment_date')
-            future_periods = 3  # Prédire 3 mois
-        else:
+            start = start.replace(day=1)
+        return pd.date_range(start=start, end=pd.Timestamp(timezone.localtime()), freq=freq)
+    
+    @staticmethod
+    def _season_labels(index, seasonality):
+        """Numéro de saison de chaque période (jour de semaine ou mois) et nombre de saisons"""
+        import numpy as np
+        
+        if seasonality == 'weekday':
+            return np.asarray(index.dayofweek), 7
+        if seasonality == 'month':
+            return np.asarray(index.month) - 1, 12
+        return np.zeros(len(index), dtype=int), 1
+    
+    @staticmethod
+    def _forecast_matrix(values, seasons, future_seasons, n_seasons, horizon, alpha=0.5, beta=0.2, phi=0.9):
+        """
+        Prévision vectorisée de plusieurs séries à la fois (une série par ligne).
+        
+        Les séries sont désaisonnalisées avec des indices multiplicatifs (moyenne
+        par saison / moyenne globale), lissées par un lissage exponentiel double
+        à tendance amortie (Holt), puis resaisonnalisées sur l'horizon de prévision.
+        """
+        import numpy as np
+        
+        values = np.asarray(values, dtype=float)
+        n_series, n_periods = values.shape
+        
+        # Indices saisonniers calculés pour toutes les séries en un seul produit matriciel
+        onehot = np.zeros((n_periods, n_seasons))
+        onehot[np.arange(n_periods), seasons] = 1
+        counts = onehot.sum(axis=0)
+        season_means = np.divide(
+            values @ onehot, counts,
+            out=np.zeros((n_series, n_seasons)), where=counts > 0
+        )
+        overall = values.mean(axis=1, keepdims=True)
+        seasonal = np.divide(
+            season_means, overall,
+            out=np.ones_like(season_means), where=(overall > 0) & (counts > 0)
+        )
+        
+        # Séries désaisonnalisées (une saison toujours nulle reste nulle)
+        period_seasonal = seasonal[:, seasons]
+        adjusted = np.divide(values, period_seasonal, out=np.zeros_like(values), where=period_seasonal > 0)
+        
+        # Lissage exponentiel double: la boucle porte sur le temps, pas sur les séries
+        level = adjusted[:, 0].copy()
+        trend = np.zeros(n_series)
+        for t in range(1, n_periods):
+            previous_level = level
+            level = alpha * adjusted[:, t] + (1 - alpha) * (previous_level + phi * trend)
+            trend = beta * (level - previous_level) + (1 - beta) * phi * trend
+        
+        damping = np.cumsum(phi ** np.arange(1, horizon + 1))
+        forecast = (level[:, None] + trend[:, None] * damping) * seasonal[:, future_seasons]
+        return np.clip(forecast, 0, None)
+    
+    @staticmethod
+    def _format_trends(df, interval, grid, revenue_forecast, count_forecast):
+        """Met en forme l'historique et les prévisions d'une série"""
+        import pandas as pd
+        
+        df = df.sort_values('period').reset_index(drop=True)
+        df['revenue'] = df['revenue'].astype(float)
+        df['count'] = df['count'].astype(int)
+        columns = ['period', 'revenue', 'count']
+        
+        # Calculer la moyenne mobile
+        if len(df) >= 7 and interval == 'day':
+            moving_avg = df['revenue'].rolling(window=7).mean()
+            df['moving_avg_7d'] = moving_avg.astype(object).where(moving_avg.notna(), None)
+            columns.append('moving_avg_7d')
+        
+        # Conversion vectorisée des lignes en dictionnaires
+        historical = df[columns].to_dict('records')
+        
+        predicted = []
+        if revenue_forecast is not None:
+            freq = PaymentAnalyticsService.TREND_INTERVALS[interval][1]
+            future_index = pd.date_range(start=grid[-1], periods=len(revenue_forecast) + 1, freq=freq)[1:]
+            predicted = [
+                {
+                    'period': period,
+                    'revenue': float(revenue),
+                    'count': float(count),
+                    'is_prediction': True
+                }
+                for period, revenue, count in zip(future_index, revenue_forecast, count_forecast)
+            ]
+        
+        return {
+            'historical': historical,
+            'predicted': predicted,
+            'interval': interval
+        }
+    
+    @staticmethod
+    def get_revenue_trends(interval='day', periods=30, organizer_id=None, use_cache=True):
+        """Analyse des tendances de revenus avec prédiction pour les périodes futures"""
+        if interval not in PaymentAnalyticsService.TREND_INTERVALS:
             # Par défaut, utiliser l'intervalle journalier
-            start_date = timezone.now() - datetime.timedelta(days=periods)
-            trunc_func = TruncDay('payment_date')
-            future_periods = 7
+            interval = 'day'
+        
+        cache_key = PaymentAnalyticsService._trends_cache_key(interval, periods, organizer_id)
+        if use_cache:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        trunc_class, _, future_periods, seasonality = PaymentAnalyticsService.TREND_INTERVALS[interval]
+        start_date = PaymentAnalyticsService._trends_start_date(interval, periods)
         
         # Filtrer les paiements
         payments = Payment.objects.filter(
@@ -156,76 +278,110 @@ class PaymentAnalyticsService:
             payments = payments.filter(registration__event__organizer_id=organizer_id)
         
         # Agréger par période
-        trends = payments.annotate(
-            period=trunc_func
+        trends_data = list(payments.annotate(
+            period=trunc_class('payment_date')
         ).values('period').annotate(
             revenue=Sum('amount'),
             count=Count('id')
-        ).order_by('period')
-        
-        # Convertir en DataFrame pour analyse et prédiction
-        trends_data = list(trends)
+        ).order_by('period'))
         
         if not trends_data:
-            return {
+            result = {
                 'historical': [],
                 'predicted': [],
                 'interval': interval
             }
-        
-        df = pd.DataFrame(trends_data)
-        
-        # Calculer la moyenne mobile
-        if len(df) >= 7 and interval == 'day':
-            df['moving_avg_7d'] = df['revenue'].rolling(window=7).mean()
-        
-        # Préparer les données historiques
-        historical = []
-        for _, row in df.iterrows():
-            data_point = {
-                'period': row['period'],
-                'revenue': float(row['revenue']),
-                'count': int(row['count']),
-            }
-            if 'moving_avg_7d' in df.columns:
-                data_point['moving_avg_7d'] = float(row['moving_avg_7d']) if not np.isnan(row['moving_avg_7d']) else None
+        else:
+            import pandas as pd
+            
+            df = pd.DataFrame(trends_data)
+            
+            # Série continue (les périodes sans paiement valent 0) pour la prévision
+            grid = PaymentAnalyticsService._period_grid(interval, start_date)
+            series = df.set_index('period')[['revenue', 'count']].astype(float).reindex(grid, fill_value=0)
+            
+            revenue_forecast = count_forecast = None
+            if len(grid) >= 5:
+                seasons, n_seasons = PaymentAnalyticsService._season_labels(grid, seasonality)
+                future_index = pd.date_range(start=grid[-1], periods=future_periods + 1, freq=grid.freq)[1:]
+                future_seasons, _ = PaymentAnalyticsService._season_labels(future_index, seasonality)
+                revenue_forecast, count_forecast = PaymentAnalyticsService._forecast_matrix(
+                    series.values.T, seasons, future_seasons, n_seasons, future_periods
+                )
             
-            historical.append(data_point)
+            result = PaymentAnalyticsService._format_trends(df, interval, grid, revenue_forecast, count_forecast)
         
-        # Prédiction pour les périodes futures
-        predicted = []
+        cache.set(cache_key, result, settings.ANALYTICS.get('FORECAST_CACHE_TIMEOUT', 3600))
+        return result
+    
+    @staticmethod
+    def forecast_all_organizers(interval='day', periods=30):
+        """
+        Calcule en un seul passage les tendances et prévisions de revenus de tous
+        les organisateurs et les met en cache. Retourne le nombre d'organisateurs traités.
+        """
+        import numpy as np
+        import pandas as pd
+        
+        if interval not in PaymentAnalyticsService.TREND_INTERVALS:
+            interval = 'day'
+        
+        trunc_class, _, future_periods, seasonality = PaymentAnalyticsService.TREND_INTERVALS[interval]
+        start_date = PaymentAnalyticsService._trends_start_date(interval, periods)
+        
+        # Une seule requête agrégée par (organisateur, période)
+        rows = list(Payment.objects.filter(
+            status='completed',
+            payment_date__gte=start_date
+        ).annotate(
+            period=trunc_class('payment_date'),
+            organizer_id=F('registration__event__organizer_id')
+        ).values('organizer_id', 'period').annotate(
+            revenue=Sum('amount'),
+            count=Count('id')
+        ).order_by('organizer_id', 'period'))
+        
+        if not rows:
+            return 0
+        
+        df = pd.DataFrame(rows)
+        df['revenue'] = df['revenue'].astype(float)
+        df['count'] = df['count'].astype(int)
+        
+        # Matrices (organisateurs x périodes) sur une grille commune
+        grid = PaymentAnalyticsService._period_grid(interval, start_date)
+        revenue = df.pivot_table(
+            index='organizer_id', columns='period', values='revenue', aggfunc='sum', fill_value=0
+        ).reindex(columns=grid, fill_value=0)
+        counts = df.pivot_table(
+            index='organizer_id', columns='period', values='count', aggfunc='sum', fill_value=0
+        ).reindex(index=revenue.index, columns=grid, fill_value=0)
+        
+        n_organizers = len(revenue.index)
+        forecasts = None
+        if len(grid) >= 5:
+            seasons, n_seasons = PaymentAnalyticsService._season_labels(grid, seasonality)
+            future_index = pd.date_range(start=grid[-1], periods=future_periods + 1, freq=grid.freq)[1:]
+            future_seasons, _ = PaymentAnalyticsService._season_labels(future_index, seasonality)
+            forecasts = PaymentAnalyticsService._forecast_matrix(
+                np.vstack([revenue.values, counts.values]),
+                seasons, future_seasons, n_seasons, future_periods
+            )
         
-        # Méthode de prédiction simple basée sur la moyenne des N dernières périodes
-        if len(df) >= 5:
-            # Utiliser les 5 dernières périodes pour la prédiction
-            last_periods = df.tail(5)
-            avg_revenue = last_periods['revenue'].mean()
-            avg_count = last_periods['count'].mean()
+        cache_entries = {}
+        for position, (organizer_id, group) in enumerate(df.groupby('organizer_id', sort=True)):
+            revenue_forecast = count_forecast = None
+            if forecasts is not None:
+                revenue_forecast = forecasts[position]
+                count_forecast = forecasts[n_organizers + position]
             
-            last_date = df['period'].max()
-            
-            # Générer les dates des périodes futures
-            for i in range(1, future_periods + 1):
-                if interval == 'day':
-                    next_date = last_date + datetime.timedelta(days=i)
-                elif interval == 'week':
-                    next_date = last_date + datetime.timedelta(weeks=i)
-                elif interval == 'month':
-                    # Approximation pour les mois
-                    next_date = last_date + datetime.timedelta(days=i*30)
-                
-                predicted.append({
-                    'period': next_date,
-                    'revenue': float(avg_revenue),
-                    'count': float(avg_count),
-                    'is_prediction': True
-                })
+            key = PaymentAnalyticsService._trends_cache_key(interval, periods, str(organizer_id))
+            cache_entries[key] = PaymentAnalyticsService._format_trends(
+                group.drop(columns='organizer_id'), interval, grid, revenue_forecast, count_forecast
+            )
         
-        return {
-            'historical': historical,
-            'predicted': predicted,
-            'interval': interval
-        }
+        cache.set_many(cache_entries, settings.ANALYTICS.get('FORECAST_CACHE_TIMEOUT', 3600))
+        return n_organizers
     
     @staticmethod
     def get_payment_methods_analysis(start_date=None, end_date=None, organizer_id=None):
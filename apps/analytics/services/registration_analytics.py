@@ -1,12 +1,12 @@
-from django.db.models import Count, Sum, Avg, F, Q, Case, When, Value, IntegerField, FloatField
+from django.db.models import Count, Sum, Avg, F, Q, Case, When, Value, IntegerField, FloatField, OuterRef, Subquery
 from django.utils import timezone
-from django.db.models.functions import TruncWeek, TruncMonth
+from django.db.models.functions import TruncWeek, TruncMonth, Coalesce
 import datetime
-import pandas as pd
 from apps.registrations.models import Registration, TicketType, TicketPurchase
-from apps.events.models import Event
+from apps.events.models import Event, CustomFormField
 from apps.accounts.models import User
 from apps.payments.models import Payment
+from .form_analytics import FormAnalyticsService
 
 class RegistrationAnalyticsService:
     """Services d'analyse des inscriptions"""
@@ -335,32 +335,43 @@ class RegistrationAnalyticsService:
             }
         
         # Calculs globaux
-        total_submissions = registrations.count()
-        total_storage = registrations.aggregate(total=Sum('form_data_size'))['total'] or 0
-        
-        # Analyse par événement
-        events_with_forms = Event.objects.filter(
-            id__in=registrations.values_list('event_id', flat=True)
+        totals = registrations.aggregate(
+            total_submissions=Count('id'),
+            total_storage=Sum('form_data_size')
         )
+        total_submissions = totals['total_submissions']
+        total_storage = totals['total_storage'] or 0
+        
+        # Analyse par événement en une seule requête groupée
+        form_fields_count = CustomFormField.objects.filter(
+            event_id=OuterRef('event_id')
+        ).values('event_id').annotate(count=Count('id')).values('count')
+        
+        events_with_forms = registrations.values(
+            'event_id', 'event__title', 'event__form_active_days'
+        ).annotate(
+            submissions_count=Count('id'),
+            storage_used=Sum('form_data_size'),
+            form_fields=Coalesce(Subquery(form_fields_count, output_field=IntegerField()), 0)
+        ).order_by('event__title')
         
         events_analysis = []
         for event in events_with_forms:
-            event_registrations = registrations.filter(event=event)
-            submissions_count = event_registrations.count()
-            storage_used = event_registrations.aggregate(total=Sum('form_data_size'))['total'] or 0
+            storage_used = event['storage_used'] or 0
             
             events_analysis.append({
-                'event_id': str(event.id),
-                'event_title': event.title,
-                'submissions_count': submissions_count,
+                'event_id': str(event['event_id']),
+                'event_title': event['event__title'],
+                'submissions_count': event['submissions_count'],
                 'storage_used': storage_used,
-                'form_fields': event.form_fields.count(),
-                'estimated_cost': (storage_used * 50) + (event.form_active_days * 50)  # 50 XAF par MB et par jour
+                'form_fields': event['form_fields'],
+                'estimated_cost': (storage_used * 50) + (event['event__form_active_days'] * 50)  # 50 XAF par MB et par jour
             })
         
-        # Analyse des champs de formulaires
-        # Cette partie nécessiterait d'explorer les données JSON des formulaires
+        # Analyse des champs de formulaires (incrémentale, pour un événement donné)
         field_analysis = []
+        if event_id:
+            field_analysis = FormAnalyticsService.analyze_event_fields(event_id)
         
         return {
             'total_submissions': total_submissions,
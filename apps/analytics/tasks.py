@@ -5,6 +5,7 @@ from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from .models import AnalyticsReport
 from .services.report_generator import ReportGenerator
+from .services.payment_analytics import PaymentAnalyticsService
 
 @shared_task
 def generate_scheduled_reports():
@@ -101,4 +102,25 @@ def clean_old_reports():
     deleted_count = old_reports.count()
     old_reports.delete()
     
-    return f"Suppression de {deleted_count} anciens rapports"
\ No newline at end of file
+    return f"Suppression de {deleted_count} anciens rapports"
+
+@shared_task
+def refresh_revenue_forecasts(periods=30):
+    """Recalcule et met en cache les prévisions de revenus de tous les organisateurs"""
+    processed = {}
+    
+    for interval in PaymentAnalyticsService.TREND_INTERVALS:
+        # Tous les organisateurs en un seul passage vectorisé
+        processed[interval] = PaymentAnalyticsService.forecast_all_organizers(
+            interval=interval,
+            periods=periods
+        )
+        
+        # Vue globale (administrateurs)
+        PaymentAnalyticsService.get_revenue_trends(
+            interval=interval,
+            periods=periods,
+            use_cache=False
+        )
+    
+    return f"Prévisions recalculées: {processed}"
@@ -0,0 +1,306 @@
+import os
+import subprocess
+import sys
+import time
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from apps.accounts.models import User
+from apps.events.models import CustomFormField, Event
+from apps.payments.models import Payment
+from apps.registrations.models import FormFieldAnswer, Registration
+from .services.event_analytics import EventAnalyticsService
+from .services.form_analytics import FormAnalyticsService
+from .services.payment_analytics import PaymentAnalyticsService
+
+class FormAnalyticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        self.organizer = User.objects.create_user(email='org@example.com', username='org', password='x', role='organizer')
+        self.user = User.objects.create_user(email='user@example.com', username='user', password='x')
+        self.event = Event.objects.create(
+            title='Conférence', description='Description', organizer=self.organizer, event_type='inscription',
+            start_date=now + timedelta(days=3), end_date=now + timedelta(days=4),
+            location_name='Salle', location_address='Adresse', location_city='Douala', status='validated'
+        )
+        self.age = CustomFormField.objects.create(event=self.event, label='Âge', field_type='number', order=1)
+        self.meals = CustomFormField.objects.create(event=self.event, label='Repas', field_type='checkbox', order=2)
+        self.comment = CustomFormField.objects.create(event=self.event, label='Commentaire', field_type='textarea', order=3)
+
+    def submit(self, form_data):
+        registration = Registration.objects.create(
+            event=self.event, user=self.user, registration_type='inscription', form_data=form_data
+        )
+        FormFieldAnswer.rebuild(registration)
+        return registration
+
+    def analyze(self):
+        return {item['label']: item for item in FormAnalyticsService.analyze_event_fields(self.event.pk)}
+
+    def test_field_statistics(self):
+        self.submit({'Âge': 20, 'Repas': ['Midi', 'Soir'], 'Commentaire': 'abcd'})
+        self.submit({'Âge': 40, 'Repas': ['Midi'], 'Commentaire': ''})
+        self.submit({'Âge': 'inconnu'})
+        self.submit({})
+
+        analysis = self.analyze()
+        self.assertEqual(analysis['Repas']['responses'], 2)
+        self.assertEqual(analysis['Repas']['completion_rate'], 50)
+        self.assertEqual(
+            [(item['value'], item['count']) for item in analysis['Repas']['distribution']],
+            [('Midi', 2), ('Soir', 1)]
+        )
+
+        numeric = analysis['Âge']['numeric']
+        self.assertEqual((numeric['count'], numeric['invalid'], numeric['min'], numeric['max']), (2, 1, 20, 40))
+        self.assertEqual((numeric['mean'], numeric['std']), (30, 10))
+        self.assertEqual(len(numeric['histogram']), FormAnalyticsService.HISTOGRAM_BINS)
+        self.assertEqual(sum(item['count'] for item in numeric['histogram']), 2)
+        self.assertEqual((numeric['histogram'][0]['count'], numeric['histogram'][-1]['count']), (1, 1))
+
+        self.assertEqual(analysis['Commentaire']['responses'], 1)
+        self.assertEqual(analysis['Commentaire']['text_length'], {'min': 4, 'max': 4, 'mean': 4})
+
+    def test_numeric_state_bounded(self):
+        for age in range(200):
+            self.submit({'Âge': age + 0.5})
+        self.analyze()
+
+        state = cache.get(FormAnalyticsService._cache_key(self.event.pk))
+        stats = state['fields'][self.age.pk]
+        self.assertEqual(stats['count'], 200)
+        self.assertEqual(set(stats), set(FormAnalyticsService._empty_state([self.age])['fields'][self.age.pk]))
+
+    def test_incremental_update(self):
+        self.submit({'Âge': 20})
+        self.analyze()
+        self.submit({'Âge': 30})
+
+        with self.assertNumQueries(5):
+            analysis = self.analyze()
+        self.assertEqual(analysis['Âge']['numeric']['count'], 2)
+
+    def test_edited_submission_rebuilds_state(self):
+        registration = self.submit({'Âge': 20, 'Repas': ['Midi']})
+        self.submit({'Âge': 30, 'Repas': ['Midi']})
+        self.analyze()
+
+        registration.form_data = {'Âge': 60, 'Repas': ['Soir']}
+        registration.save()
+        FormFieldAnswer.rebuild(registration)
+
+        analysis = self.analyze()
+        self.assertEqual((analysis['Âge']['numeric']['count'], analysis['Âge']['numeric']['max']), (2, 60))
+        self.assertEqual(
+            sorted((item['value'], item['count']) for item in analysis['Repas']['distribution']),
+            [('Midi', 1), ('Soir', 1)]
+        )
+
+    def test_deleted_submission_rebuilds_state(self):
+        registration = self.submit({'Âge': 20})
+        self.submit({'Âge': 30})
+        self.analyze()
+
+        registration.delete()
+        analysis = self.analyze()
+        self.assertEqual(analysis['Âge']['responses'], 1)
+        self.assertEqual(analysis['Âge']['numeric']['min'], 30)
+
+class RevenueForecastTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        self.customer = User.objects.create_user(email='client@example.com', username='client', password='x')
+        self.organizers = []
+        payments = []
+        for index in range(3):
+            organizer = User.objects.create_user(
+                email=f'org{index}@example.com', username=f'org{index}', password='x', role='organizer'
+            )
+            self.organizers.append(organizer)
+            event = Event.objects.create(
+                title=f'Concert {index}', description='Description', organizer=organizer, event_type='billetterie',
+                start_date=now + timedelta(days=3), end_date=now + timedelta(days=4),
+                location_name='Salle', location_address='Adresse', location_city='Douala', status='published'
+            )
+            registration = Registration.objects.create(event=event, user=self.customer, registration_type='billetterie')
+            # Ventes quotidiennes propres à chaque organisateur, plus élevées le week-end
+            for day in range(1, 29):
+                when = now - timedelta(days=day)
+                if (day + index) % 4 == 0:
+                    continue
+                amount = 1000 * (index + 1) * (2 if when.weekday() >= 5 else 1) + 10 * day
+                payments.append(Payment(
+                    registration=registration, user=self.customer, amount=Decimal(amount),
+                    payment_method='mtn_money', status='completed', payment_date=when
+                ))
+        # Un paiement non complété est ignoré
+        payments.append(Payment(
+            registration=registration, user=self.customer, amount=Decimal(99999),
+            payment_method='mtn_money', status='failed', payment_date=now - timedelta(days=2)
+        ))
+        Payment.objects.bulk_create(payments)
+
+    def test_batch_matches_single_organizer(self):
+        for interval in ('day', 'week'):
+            self.assertEqual(PaymentAnalyticsService.forecast_all_organizers(interval, 30), 3)
+            for organizer in self.organizers:
+                cached = PaymentAnalyticsService.get_revenue_trends(interval, 30, organizer_id=str(organizer.pk))
+                single = PaymentAnalyticsService.get_revenue_trends(
+                    interval, 30, organizer_id=str(organizer.pk), use_cache=False
+                )
+                self.assertTrue(single['historical'])
+                self.assertEqual(cached['historical'], single['historical'])
+                self.assertEqual(
+                    [item['period'] for item in cached['predicted']],
+                    [item['period'] for item in single['predicted']]
+                )
+                for batch_item, single_item in zip(cached['predicted'], single['predicted']):
+                    self.assertAlmostEqual(batch_item['revenue'], single_item['revenue'], places=6)
+                    self.assertAlmostEqual(batch_item['count'], single_item['count'], places=6)
+
+        daily = PaymentAnalyticsService.get_revenue_trends('day', 30, organizer_id=str(self.organizers[0].pk))
+        self.assertEqual(len(daily['predicted']), 7)
+        self.assertTrue(all(item['revenue'] < 99999 for item in daily['historical']))
+
+    def test_forecast_reproduces_seasonal_series(self):
+        import numpy as np
+
+        pattern = np.array([10, 20, 30, 40, 50, 60, 70], dtype=float)
+        seasons = np.tile(np.arange(7), 8)
+        values = np.vstack([np.tile(pattern, 8), 3 * np.tile(pattern, 8)])
+        future_seasons = np.arange(7)
+
+        forecast = PaymentAnalyticsService._forecast_matrix(values, seasons, future_seasons, 7, 7)
+        np.testing.assert_allclose(forecast, np.vstack([pattern, 3 * pattern]), rtol=1e-9)
+
+        # Série saisonnière en croissance: la prévision poursuit la hausse et garde la saisonnalité
+        growth = np.tile(pattern, 8) * np.linspace(1, 2, 56)
+        forecast = PaymentAnalyticsService._forecast_matrix(growth[None, :], seasons, future_seasons, 7, 7)[0]
+        self.assertGreater(forecast.mean(), growth[-7:].mean())
+        self.assertEqual(list(np.argsort(forecast)), list(range(7)))
+
+    def test_forecast_benchmark_10k_organizers(self):
+        import numpy as np
+
+        # Revenus et nombres de paiements de 10 000 organisateurs sur 30 jours
+        organizers, periods = 10000, 30
+        rng = np.random.default_rng(0)
+        values = rng.poisson(5, size=(2 * organizers, periods)).astype(float)
+        seasons = np.arange(periods) % 7
+        future_seasons = np.arange(periods, periods + 7) % 7
+
+        started = time.perf_counter()
+        forecast = PaymentAnalyticsService._forecast_matrix(values, seasons, future_seasons, 7, 7)
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(forecast.shape, (2 * organizers, 7))
+        for row in (0, 1234, 2 * organizers - 1):
+            np.testing.assert_allclose(
+                forecast[row],
+                PaymentAnalyticsService._forecast_matrix(values[row:row + 1], seasons, future_seasons, 7, 7)[0]
+            )
+        self.assertLess(elapsed, 2)
+
+class RegistrationTimelineTests(TestCase):
+    def setUp(self):
+        organizer = User.objects.create_user(email='org@example.com', username='org', password='x', role='organizer')
+        start = timezone.make_aware(timezone.datetime(2026, 1, 5, 9))
+        self.event = Event.objects.create(
+            title='Conférence', description='Description', organizer=organizer, event_type='inscription',
+            start_date=start + timedelta(days=90), end_date=start + timedelta(days=91),
+            location_name='Salle', location_address='Adresse', location_city='Douala', status='validated'
+        )
+        statuses = ('pending', 'confirmed', 'confirmed', 'cancelled')
+        # Plusieurs inscriptions par jour, en journée (heure locale), sur environ deux mois
+        for index in range(120):
+            user = User.objects.create_user(email=f'user{index}@example.com', username=f'user{index}', password='x')
+            registration = Registration.objects.create(
+                event=self.event, user=user, registration_type='inscription', status=statuses[index % 4]
+            )
+            created_at = start + timedelta(days=index // 2, hours=(index * 5) % 7)
+            Registration.objects.filter(pk=registration.pk).update(created_at=created_at)
+
+    def pandas_timeline(self, interval):
+        """Timeline calculée comme l'ancienne implémentation pandas (en heure locale)"""
+        import pandas as pd
+
+        df = pd.DataFrame([
+            {'created_at': timezone.localtime(created_at), 'status': status}
+            for created_at, status in Registration.objects.filter(event=self.event).values_list('created_at', 'status')
+        ])
+        if interval == 'day':
+            df['interval'] = df['created_at'].dt.date
+        else:
+            period = 'W' if interval == 'week' else 'M'
+            df['interval'] = df['created_at'].dt.tz_localize(None).dt.to_period(period).dt.start_time.dt.date
+
+        timeline = df.groupby(['interval', 'status']).size().unstack(fill_value=0).reset_index()
+        return [
+            {
+                'interval': row['interval'],
+                'pending': int(row['pending']),
+                'confirmed': int(row['confirmed']),
+                'cancelled': int(row['cancelled']),
+                'total': int(row['pending'] + row['confirmed'] + row['cancelled']),
+            }
+            for _, row in timeline.iterrows()
+        ]
+
+    def test_matches_pandas_timeline(self):
+        for interval in ('day', 'week', 'month'):
+            with self.subTest(interval=interval):
+                rows = list(EventAnalyticsService.iter_registration_timeline(self.event.pk, interval, chunk_size=7))
+                for row in rows:
+                    if interval != 'day':
+                        row['interval'] = timezone.localtime(row['interval']).date()
+
+                expected = self.pandas_timeline(interval)
+                self.assertEqual(rows, expected)
+                self.assertGreater(min(row['total'] for row in rows), 1)
+                self.assertEqual(sum(row['total'] for row in rows), 120)
+
+    def test_unknown_event(self):
+        self.assertEqual(
+            EventAnalyticsService.get_registration_timeline('00000000-0000-0000-0000-000000000000'),
+            {'error': 'Événement non trouvé'}
+        )
+
+class HeavyImportsTests(SimpleTestCase):
+    """pandas et numpy ne sont importés que par les traitements qui les utilisent"""
+
+    HEAVY_MODULES = ('pandas', 'numpy')
+
+    def loaded_modules(self, *modules):
+        # Processus neuf: les autres tests ont pu importer ces bibliothèques
+        script = (
+            "import sys, django; django.setup(); "
+            + "".join(f"import {module}; " for module in modules)
+            + f"print(','.join(name for name in {self.HEAVY_MODULES!r} if name in sys.modules))"
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', script],
+            capture_output=True,
+            text=True,
+            cwd=settings.BASE_DIR,
+            env=dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE),
+            check=True
+        )
+        return [name for name in result.stdout.strip().split(',') if name]
+
+    def test_urlconf_import(self):
+        self.assertEqual(self.loaded_modules('config.urls'), [])
+
+    def test_task_modules_import(self):
+        self.assertEqual(self.loaded_modules(
+            'config.celery',
+            'apps.analytics.tasks',
+            'apps.core.tasks',
+            'apps.events.tasks',
+            'apps.notifications.tasks',
+            'apps.user_messages.tasks'
+        ), [])
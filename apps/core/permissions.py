@@ -29,13 +29,14 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
         if request.user.is_staff:
             return True
         
+        # Les identifiants sont comparés sans charger l'utilisateur actuel ni celui de l'objet
         # Vérifier si l'objet a un attribut 'user' et s'il correspond à l'utilisateur actuel
-        if hasattr(obj, 'user'):
-            return obj.user == request.user
+        if hasattr(obj, 'user_id'):
+            return obj.user_id == request.user.pk
         
         # Vérifier si l'objet a un attribut 'organizer' et s'il correspond à l'utilisateur actuel
-        if hasattr(obj, 'organizer'):
-            return obj.organizer == request.user
+        if hasattr(obj, 'organizer_id'):
+            return obj.organizer_id == request.user.pk
         
         return False
 
@@ -78,11 +79,11 @@ class IsAdminOrOrganizer(permissions.BasePermission):
             return True
             
         # Autoriser les organisateurs pour leurs propres événements
-        if hasattr(obj, 'organizer'):
-            return obj.organizer == request.user
+        if hasattr(obj, 'organizer_id'):
+            return obj.organizer_id == request.user.pk
             
         # Pour les objets liés à un événement
-        if hasattr(obj, 'event') and hasattr(obj.event, 'organizer'):
-            return obj.event.organizer == request.user
+        if hasattr(obj, 'event') and hasattr(obj.event, 'organizer_id'):
+            return obj.event.organizer_id == request.user.pk
             
         return False
\ No newline at end of file
@@ -1,16 +1,19 @@
  # apps/core/tasks.py
 from config.celery import app
 from django.utils import timezone
+from django.db import transaction
 from django.db.models import Q
 from apps.events.models import Event
 from apps.notifications.models import Notification
 from apps.registrations.models import Registration
-from apps.core.utils import send_notification
+from apps.core.utils import send_notification, send_bulk_notifications
+from django.conf import settings
 
 @app.task
 def send_event_reminders():
     """Envoie des rappels pour les événements à venir"""
     now = timezone.now()
+    batch_size = settings.NOTIFICATIONS.get('BULK_BATCH_SIZE', 500)
     
     # Événements commençant dans les 24 heures
     tomorrow = now + timezone.timedelta(days=1)
@@ -21,26 +24,46 @@ def send_event_reminders():
     )
     
     for event in events:
-        # Récupérer tous les participants inscrits
-        registrations = Registration.objects.filter(
-            event=event,
-            status='confirmed'
-        )
+        # Récupérer les identifiants de tous les participants inscrits
+        registration_ids = [
+            str(registration_id) for registration_id in Registration.objects.filter(
+                event=event,
+                status='confirmed'
+            ).values_list('id', flat=True)
+        ]
         
-        for registration in registrations:
-            # Envoyer un rappel
-            send_notification(
-                user=registration.user,
-                notification_type='event_reminder',
-                related_object=event,
-                extra_data={
-                    'event_title': event.title,
-                    'event_date': event.start_date.strftime('%d/%m/%Y à %H:%M'),
-                    'event_location': event.location_address,
-                    'registration_code': registration.reference_code
-                },
-                channels=['email', 'in_app']
-            )
+        # Répartir l'envoi en sous-tâches par lots
+        for start in range(0, len(registration_ids), batch_size):
+            send_event_reminder_batch.delay(str(event.id), registration_ids[start:start + batch_size])
+
+@app.task
+def send_event_reminder_batch(event_id, registration_ids):
+    """Envoie les rappels d'un événement à un lot d'inscriptions"""
+    try:
+        event = Event.objects.get(id=event_id)
+    except Event.DoesNotExist:
+        # Événement supprimé entre la répartition et l'exécution du lot
+        return 0
+    registrations = Registration.objects.filter(
+        id__in=registration_ids,
+        status='confirmed'
+    ).select_related('user')
+    
+    event_data = {
+        'event_title': event.title,
+        'event_date': event.start_date.strftime('%d/%m/%Y à %H:%M'),
+        'event_location': event.location_address,
+    }
+    
+    return send_bulk_notifications(
+        notification_type='event_reminder',
+        recipients=[
+            (registration.user, dict(event_data, registration_code=registration.reference_code))
+            for registration in registrations
+        ],
+        related_object=event,
+        channels=['email', 'in_app']
+    )
 
 @app.task
 def clean_pending_registrations():
@@ -54,28 +77,30 @@ def clean_pending_registrations():
     )
     
     for registration in pending_registrations:
-        # Si c'est un événement avec billetterie, libérer les billets
-        if registration.registration_type == 'billetterie':
-            for ticket in registration.tickets.all():
-                ticket_type = ticket.ticket_type
-                ticket_type.quantity_sold -= ticket.quantity
-                ticket_type.save()
+        # L'annulation et la notification (file d'envoi) sont validées ensemble
+        with transaction.atomic():
+            # Si c'est un événement avec billetterie, libérer les billets
+            if registration.registration_type == 'billetterie':
+                for ticket in registration.tickets.all():
+                    ticket_type = ticket.ticket_type
+                    ticket_type.quantity_sold -= ticket.quantity
+                    ticket_type.save()
         
-        # Annuler l'inscription
-        registration.status = 'cancelled'
-        registration.save()
+            # Annuler l'inscription
+            registration.status = 'cancelled'
+            registration.save()
         
-        # Notifier l'utilisateur
-        send_notification(
-            user=registration.user,
-            notification_type='registration_expired',
-            related_object=registration,
-            extra_data={
-                'event_title': registration.event.title,
-                'registration_code': registration.reference_code
-            },
-            channels=['email', 'in_app']
-        )
+            # Notifier l'utilisateur
+            send_notification(
+                user=registration.user,
+                notification_type='registration_expired',
+                related_object=registration,
+                extra_data={
+                    'event_title': registration.event.title,
+                    'registration_code': registration.reference_code
+                },
+                channels=['email', 'in_app']
+            )
 
 @app.task
 def send_usage_billing_notifications():
@@ -0,0 +1,44 @@
+# core/testing.py
+import functools
+from django.db import connection
+
+class QueryCounter:
+    """Requêtes SQL exécutées dans le bloc (context manager)"""
+
+    def __init__(self):
+        self.queries = []
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._wrapper = connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrapper.__exit__(*exc_info)
+
+def query_budget(max_queries):
+    """
+    Décorateur de méthode de test: échoue si le test exécute plus de
+    max_queries requêtes SQL (la préparation faite dans setUp n'est pas comptée).
+    """
+    def decorator(test):
+        @functools.wraps(test)
+        def wrapper(self, *args, **kwargs):
+            with QueryCounter() as queries:
+                result = test(self, *args, **kwargs)
+            self.assertLessEqual(
+                queries.count,
+                max_queries,
+                f"{queries.count} requêtes pour un budget de {max_queries}:\n" + '\n'.join(queries.queries)
+            )
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,202 @@
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+from django.core.cache import cache
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import Throttled
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+from apps.accounts.models import User
+from apps.events.models import Event
+from apps.notifications.models import Notification, NotificationTemplate
+from apps.registrations.models import Registration
+from .tasks import send_event_reminder_batch, send_event_reminders
+from .throttling import SlidingWindowThrottle, WRITE_THROTTLES
+from .utils import send_bulk_notifications
+
+RATES = {'test': '3/min', 'test_ip': '1000/min', 'test_resource': '50/min'}
+
+class ThrottledView(APIView):
+    permission_classes = []
+    throttle_classes = WRITE_THROTTLES
+    throttle_scope = 'test'
+
+    def get_throttle_resource(self, request):
+        return request.data.get('event')
+
+@mock.patch.object(SlidingWindowThrottle, 'THROTTLE_RATES', RATES)
+@mock.patch.object(SlidingWindowThrottle, 'timer', lambda self: 60 * 1000 + 30.0)
+class SlidingWindowThrottleTests(SimpleTestCase):
+    factory = APIRequestFactory()
+
+    def setUp(self):
+        cache.clear()
+
+    def attempt(self, ip, event='E1'):
+        """True si la requête passe toutes les limites"""
+        view = ThrottledView()
+        request = view.initialize_request(
+            self.factory.post('/', {'event': event}, format='json', REMOTE_ADDR=ip)
+        )
+        view.request, view.args, view.kwargs = request, (), {}
+        try:
+            view.check_throttles(request)
+        except Throttled:
+            return False
+        return True
+
+    def test_limit_per_client(self):
+        results = [self.attempt('10.0.0.1') for _ in range(5)]
+        self.assertEqual(results, [True, True, True, False, False])
+
+    def test_rejected_requests_not_counted_on_shared_limits(self):
+        # Un client bloqué qui insiste n'épuise pas la limite de l'événement
+        allowed = sum(self.attempt('10.0.0.1') for _ in range(1300))
+        self.assertEqual(allowed, 3)
+        self.assertTrue(self.attempt('10.0.0.2'))
+        self.assertTrue(self.attempt('10.0.0.3'))
+
+    def test_resource_limit_shared_between_clients(self):
+        allowed = sum(self.attempt(f'10.0.{i // 250}.{i % 250}') for i in range(60))
+        self.assertEqual(allowed, 50)
+
+    def test_concurrent_requests_never_exceed_limit(self):
+        results = []
+        lock = threading.Lock()
+
+        def client(index):
+            accepted = sum(self.attempt(f'10.1.{index}.{i}') for i in range(100))
+            with lock:
+                results.append(accepted)
+
+        threads = [threading.Thread(target=client, args=(index,)) for index in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sum(results), 50)
+
+    def test_check_overhead(self):
+        # Coût d'un contrôle complet (trois limites) par requête acceptée
+        view = ThrottledView()
+        view.args, view.kwargs = (), {}
+        requests = [
+            view.initialize_request(self.factory.post(
+                '/', {'event': f'E{index}'}, format='json', REMOTE_ADDR=f'10.2.{index // 250}.{index % 250}'
+            ))
+            for index in range(2000)
+        ]
+        for request in requests:
+            request.data
+
+        started = time.perf_counter()
+        for request in requests:
+            view.check_throttles(request)
+        per_check = (time.perf_counter() - started) / len(requests)
+        self.assertLess(per_check, 0.001)
+
+class SendBulkNotificationsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = [
+            User.objects.create_user(email=f'user{index}@example.com', username=f'user{index}', password='x')
+            for index in range(3)
+        ]
+        NotificationTemplate.objects.create(
+            name='Inscription expirée',
+            notification_type='registration_expired',
+            email_subject='Inscription expirée',
+            email_body='Votre inscription {registration_code} a expiré.',
+            in_app_title='Inscription {registration_code} expirée',
+            in_app_body='Votre inscription {registration_code} a expiré.',
+            available_variables='registration_code'
+        )
+
+    def send(self):
+        return send_bulk_notifications(
+            'registration_expired',
+            [(user, {'registration_code': 'ABC'}) for user in self.users],
+            channels=['email', 'in_app']
+        )
+
+    def test_notifications_created(self):
+        self.assertEqual(self.send(), 3)
+        self.assertEqual(Notification.objects.filter(channel='in_app').count(), 3)
+        self.assertEqual(Notification.objects.filter(channel='email', delivery_status='pending').count(), 3)
+
+        for notification in Notification.objects.filter(channel='in_app'):
+            self.assertEqual(notification.get_title(), 'Inscription ABC expirée')
+            self.assertEqual(notification.get_message(), 'Votre inscription ABC a expiré.')
+        for notification in Notification.objects.filter(channel='email'):
+            self.assertEqual(notification.get_email_subject(), 'Inscription expirée')
+            self.assertEqual(notification.get_message(), 'Votre inscription ABC a expiré.')
+
+    def test_failure_keeps_caller_transaction_usable(self):
+        with transaction.atomic():
+            User.objects.filter(pk=self.users[0].pk).update(first_name='Annulé')
+            with mock.patch('apps.core.utils.publish_notifications', side_effect=RuntimeError('broker')):
+                self.assertEqual(self.send(), 0)
+
+            # Les notifications sont annulées, le reste de la transaction est validé
+            self.assertFalse(transaction.get_connection().needs_rollback)
+            self.assertEqual(Notification.objects.count(), 0)
+            User.objects.filter(pk=self.users[1].pk).update(first_name='Annulé')
+
+        self.assertEqual(User.objects.filter(first_name='Annulé').count(), 2)
+
+class EventReminderTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        organizer = User.objects.create_user(email='org@example.com', username='org', password='x', role='organizer')
+        now = timezone.now()
+        self.event = Event.objects.create(
+            title='Concert', description='Description', organizer=organizer, event_type='inscription',
+            start_date=now + timedelta(hours=6), end_date=now + timedelta(hours=9),
+            location_name='Salle', location_address='Adresse', location_city='Douala', status='validated'
+        )
+        self.registrations = [
+            Registration.objects.create(
+                event=self.event, registration_type='inscription', status='confirmed',
+                user=User.objects.create_user(email=f'user{index}@example.com', username=f'user{index}', password='x')
+            )
+            for index in range(5)
+        ]
+        NotificationTemplate.objects.create(
+            name='Rappel',
+            notification_type='event_reminder',
+            email_subject='Rappel: {event_title}',
+            email_body='{event_title} le {event_date}, inscription {registration_code}.',
+            in_app_title='Rappel: {event_title}',
+            in_app_body='{event_title} le {event_date}, inscription {registration_code}.',
+            available_variables='event_title,event_date,registration_code'
+        )
+
+    @override_settings(NOTIFICATIONS={'BULK_BATCH_SIZE': 2})
+    @mock.patch('apps.core.tasks.send_event_reminder_batch.delay')
+    def test_reminders_split_in_batches(self, delay):
+        send_event_reminders()
+
+        batches = [call.args for call in delay.call_args_list]
+        self.assertEqual([len(registration_ids) for _, registration_ids in batches], [2, 2, 1])
+        self.assertEqual({event_id for event_id, _ in batches}, {str(self.event.pk)})
+        self.assertEqual(
+            sorted(registration_id for _, registration_ids in batches for registration_id in registration_ids),
+            sorted(str(registration.pk) for registration in self.registrations)
+        )
+
+    def test_batch_sends_reminders(self):
+        registration = self.registrations[0]
+        self.assertEqual(send_event_reminder_batch(str(self.event.pk), [str(registration.pk)]), 1)
+
+        notification = Notification.objects.get(channel='in_app')
+        self.assertEqual(notification.user, registration.user)
+        self.assertIn(registration.reference_code, notification.get_message())
+
+    def test_batch_ignores_deleted_event(self):
+        registration_ids = [str(registration.pk) for registration in self.registrations]
+        Event.objects.filter(pk=self.event.pk).delete()
+        self.assertEqual(send_event_reminder_batch(str(self.event.pk), registration_ids), 0)
+        self.assertFalse(Notification.objects.exists())
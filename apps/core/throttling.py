@@ -0,0 +1,156 @@
+# core/throttling.py
+import hashlib
+from rest_framework import permissions
+from rest_framework.throttling import SimpleRateThrottle
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    """
+    Limitation de débit par fenêtre glissante approchée.
+
+    Deux compteurs par identifiant (fenêtre courante et précédente) dans le
+    cache: le nombre de requêtes sur la dernière durée est estimé par
+    précédente × (part restante de la fenêtre précédente) + courante. Le
+    contrôle coûte un incrément atomique et une lecture, quel que
+    soit le débit autorisé (DRF conserve l'historique complet des requêtes).
+    L'incrément a lieu avant la comparaison: des requêtes simultanées ne
+    peuvent pas dépasser la limite. Une requête refusée n'est pas comptée:
+    ses incréments sont annulés, y compris ceux des limites déjà passées, et
+    les limites suivantes ne font que lire leurs compteurs (DRF les consulte
+    toutes). Un client bloqué ne peut donc pas épuiser les limites partagées
+    (adresse IP, ressource) des autres.
+
+    Les compteurs doivent être dans un cache partagé par tous les processus
+    (CACHES['default']), sinon chaque processus applique sa propre limite.
+
+    Seules les méthodes d'écriture sont limitées. La portée est celle de
+    l'action dans view.throttle_scopes ({action: portée}), à défaut celle de
+    la vue (throttle_scope); le débit est lu dans
+    REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] sous '<portée><suffixe>'.
+    """
+
+    suffix = ''
+
+    def __init__(self):
+        # Le débit dépend de la portée de la vue: il est lu dans allow_request
+        pass
+
+    def get_ident_key(self, request, view):
+        """Identifiant limité (utilisateur, adresse IP, ressource), None pour ne pas limiter"""
+        raise NotImplementedError
+
+    def get_cache_key(self, request, view):
+        ident = self.get_ident_key(request, view)
+        if ident is None:
+            return None
+        return f"throttle:{self.scope}{self.suffix}:{ident}"
+
+    def allow_request(self, request, view):
+        if request.method in permissions.SAFE_METHODS:
+            return True
+
+        self.scope = (
+            getattr(view, 'throttle_scopes', {}).get(getattr(view, 'action', None))
+            or getattr(view, 'throttle_scope', None)
+        )
+        if not self.scope:
+            return True
+        self.rate = self.THROTTLE_RATES.get(f"{self.scope}{self.suffix}")
+        if self.rate is None:
+            return True
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window, elapsed = divmod(self.now, self.duration)
+        current_key = f"{self.key}:{int(window)}"
+        previous_key = f"{self.key}:{int(window) - 1}"
+        self.previous = self.cache.get(previous_key, 0)
+        self.elapsed = elapsed
+
+        # Requête déjà refusée par une autre limite: lecture seule
+        if getattr(request, '_throttle_rejected', False):
+            self.current = self.cache.get(current_key, 0) + 1
+            if self._estimate() > self.num_requests:
+                return self.throttle_failure()
+            return True
+
+        self.current = self._increment(current_key)
+        if self._estimate() > self.num_requests:
+            self._decrement(current_key)
+            for key in getattr(request, '_throttle_counted', ()):
+                self._decrement(key)
+            request._throttle_counted = []
+            request._throttle_rejected = True
+            return self.throttle_failure()
+
+        if not hasattr(request, '_throttle_counted'):
+            request._throttle_counted = []
+        request._throttle_counted.append(current_key)
+        return True
+
+    def _estimate(self):
+        return self.previous * (1 - self.elapsed / self.duration) + self.current
+
+    def _increment(self, key):
+        if self.cache.add(key, 1, self.duration * 2):
+            return 1
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # Clé expirée entre add et incr
+            self.cache.set(key, 1, self.duration * 2)
+            return 1
+
+    def _decrement(self, key):
+        try:
+            self.cache.decr(key)
+        except ValueError:
+            # Clé expirée entre-temps: plus rien à annuler
+            pass
+
+    def wait(self):
+        """Délai (s) avant que l'estimation repasse sous la limite"""
+        if self.current >= self.num_requests or not self.previous:
+            return self.duration - self.elapsed
+        # previous × (1 - t / durée) + current <= limite
+        target = self.duration * (1 - (self.num_requests - self.current) / self.previous)
+        return max(target - self.elapsed, 0)
+
+class UserThrottle(SlidingWindowThrottle):
+    """Par utilisateur (par adresse IP pour un visiteur anonyme)"""
+
+    def get_ident_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return f"user:{request.user.pk}"
+        return f"ip:{self.get_ident(request)}"
+
+class IPThrottle(SlidingWindowThrottle):
+    """Par adresse IP, tous comptes confondus"""
+
+    suffix = '_ip'
+
+    def get_ident_key(self, request, view):
+        return self.get_ident(request)
+
+class ResourceThrottle(SlidingWindowThrottle):
+    """
+    Par ressource visée (événement, code promo, conversation...), tous
+    demandeurs confondus. La vue fournit l'identifiant de la ressource avec
+    get_throttle_resource(request).
+    """
+
+    suffix = '_resource'
+
+    def get_ident_key(self, request, view):
+        get_resource = getattr(view, 'get_throttle_resource', None)
+        resource = get_resource(request) if get_resource else None
+        if resource is None or resource == '':
+            return None
+        # Valeur fournie par le client: réduite à une clé de cache sûre
+        return hashlib.blake2b(str(resource).encode(), digest_size=12).hexdigest()
+
+# Limites combinées des points d'écriture exposés aux abus
+WRITE_THROTTLES = [UserThrottle, IPThrottle, ResourceThrottle]
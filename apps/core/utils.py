@@ -2,10 +2,14 @@ import string
 import random
 import json
 from decimal import Decimal
+from django.db import transaction
 from django.utils import timezone
-from django.core.mail import EmailMessage
 from django.template.loader import render_to_string
-from apps.notifications.models import Notification, NotificationTemplate
+from apps.notifications.models import Notification
+from apps.notifications.registry import template_registry
+from apps.notifications.dispatcher import OutboxDispatcher
+from apps.notifications.badges import BadgeService
+from apps.notifications.realtime import publish_notifications
 
 def generate_unique_code(length=8, prefix=''):
     """Génère un code aléatoire unique"""
@@ -30,99 +34,130 @@ def send_notification(user, notification_type, related_object=None, extra_data=N
     :param extra_data: Données supplémentaires pour le template
     :param channels: Liste des canaux à utiliser ('email', 'sms', 'push', 'in_app')
     """
-    try:
-        # Récupérer le template
-        template = NotificationTemplate.objects.get(notification_type=notification_type)
-        
-        # Définir les canaux par défaut si non spécifiés
-        if not channels:
-            channels = ['email', 'in_app']
-        
-        # Préparer les données de contexte
-        context = extra_data or {}
-        if related_object:
-            context['object'] = related_object
-            related_object_id = str(related_object.id)
-            related_object_type = related_object.__class__.__name__.lower()
+    return send_bulk_notifications(
+        notification_type,
+        [(user, extra_data)],
+        related_object=related_object,
+        channels=channels
+    ) > 0
+
+def send_bulk_notifications(notification_type, recipients, related_object=None, channels=None):
+    """
+    Envoie une notification à plusieurs utilisateurs en un seul passage
+    
+    Le template est chargé une seule fois et les notifications sont insérées avec
+    bulk_create, au format compact lorsque c'est possible. Les notifications
+    email, SMS et push sont placées dans la file d'envoi (état 'pending') dans
+    la transaction courante: elles sont transmises par le dispatcher après la
+    validation de celle-ci. En cas d'échec de l'enregistrement, seules les
+    notifications sont annulées (point de sauvegarde), pas la transaction de
+    l'appelant.
+    
+    :param notification_type: Type de notification (doit correspondre à un template existant)
+    :param recipients: Liste de couples (utilisateur, données supplémentaires pour le template)
+    :param related_object: Objet lié à la notification (événement, inscription, etc.)
+    :param channels: Liste des canaux à utiliser ('email', 'sms', 'push', 'in_app')
+    :return: Nombre de destinataires notifiés
+    """
+    import logging
+    logger = logging.getLogger('apps')
+    
+    # Récupérer le template compilé (chargé une fois par processus)
+    template = template_registry.get(notification_type)
+    if template is None:
+        logger.error(f"Template de notification non trouvé pour le type {notification_type}")
+        return 0
+    
+    # Définir les canaux par défaut si non spécifiés
+    if not channels:
+        channels = ['email', 'in_app']
+    
+    if related_object:
+        related_object_id = str(related_object.id)
+        related_object_type = related_object.__class__.__name__.lower()
+    else:
+        related_object_id = ''
+        related_object_type = ''
+    
+    now = timezone.now()
+    notifications = []
+    queued = 0
+    notified = 0
+    
+    def build(channel, context, **fields):
+        """
+        Prépare une notification: si ses textes ne dépendent que des données
+        supplémentaires, seule la référence au template est stockée (rendu à la lecture)
+        """
+        notification = Notification(channel=channel, **fields)
+        if all(
+            template.can_render_from(field, notification.extra_data)
+            for field in Notification.CHANNEL_TEMPLATE_FIELDS[channel]
+            if field and template.has(field)
+        ):
+            notification.template_id = template.id
         else:
-            related_object_id = ''
-            related_object_type = ''
-        
-        # Créer une notification in-app si demandé
-        if 'in_app' in channels:
-            notification = Notification.objects.create(
-                user=user,
-                title=template.in_app_title.format(**context) if template.in_app_title else template.name,
-                message=template.in_app_body.format(**context) if template.in_app_body else '',
-                notification_type=notification_type,
-                related_object_id=related_object_id,
-                related_object_type=related_object_type,
-                channel='in_app',
-                is_sent=True,
-                sent_at=timezone.now(),
-                extra_data=context
-            )
-        
-        # Envoyer un email si demandé
-        if 'email' in channels and user.email and template.email_subject and template.email_body:
-            subject = template.email_subject.format(**context)
-            message = template.email_body.format(**context)
+            notification.title, notification.message = notification.render_with(template, context, strict=True)
+        return notification
+    
+    for user, extra_data in recipients:
+        try:
+            # Préparer les données de contexte
+            extra_data = extra_data or {}
+            context = dict(extra_data)
+            if related_object:
+                context['object'] = related_object
+            
+            common = {
+                'user': user,
+                'notification_type': notification_type,
+                'related_object_id': related_object_id,
+                'related_object_type': related_object_type,
+                'extra_data': extra_data,
+            }
+            # Les canaux externes passent par la file d'envoi
+            outbox = dict(common, delivery_status='pending', next_attempt_at=now)
             
-            email = EmailMessage(
-                subject=subject,
-                body=message,
-                to=[user.email]
-            )
-            email.send()
+            # Créer une notification in-app si demandé
+            if 'in_app' in channels:
+                notifications.append(build(
+                    'in_app', context,
+                    is_sent=True,
+                    sent_at=now,
+                    delivery_status='sent',
+                    **common
+                ))
             
-            # Enregistrer la notification
-            Notification.objects.create(
-                user=user,
-                title=subject,
-                message=message,
-                notification_type=notification_type,
-                related_object_id=related_object_id,
-                related_object_type=related_object_type,
-                channel='email',
-                is_sent=True,
-                sent_at=timezone.now(),
-                email_subject=subject,
-                extra_data=context
-            )
-        
-        # Envoyer un SMS si demandé
-        if 'sms' in channels and user.phone_number and template.sms_body:
-            message = template.sms_body.format(**context)
+            # Mettre l'email en file si demandé
+            if 'email' in channels and user.email and template.has('email_subject') and template.has('email_body'):
+                notifications.append(build('email', context, **outbox))
+                queued += 1
             
-            # Intégration SMS à implémenter
-            # send_sms(user.phone_number, message)
+            # Mettre le SMS en file si demandé
+            if 'sms' in channels and user.phone_number and template.has('sms_body'):
+                notifications.append(build('sms', context, phone_number=user.phone_number, **outbox))
+                queued += 1
             
-            # Enregistrer la notification
-            Notification.objects.create(
-                user=user,
-                title='SMS Notification',
-                message=message,
-                notification_type=notification_type,
-                related_object_id=related_object_id,
-                related_object_type=related_object_type,
-                channel='sms',
-                is_sent=True,
-                sent_at=timezone.now(),
-                phone_number=user.phone_number,
-                extra_data=context
-            )
-        
-        return True
+            # Mettre la notification push en file si demandé
+            if 'push' in channels and template.has('push_body'):
+                notifications.append(build('push', context, **outbox))
+                queued += 1
+            
+            notified += 1
+        except Exception as e:
+            logger.error(f"Erreur lors de la préparation de la notification pour {user}: {str(e)}")
     
-    except NotificationTemplate.DoesNotExist:
-        # Log l'erreur
-        import logging
-        logger = logging.getLogger('apps')
-        logger.error(f"Template de notification non trouvé pour le type {notification_type}")
-        return False
+    try:
+        # Point de sauvegarde: un échec n'interrompt pas la transaction de l'appelant
+        with transaction.atomic():
+            Notification.objects.bulk_create(notifications)
+            BadgeService.notifications_created(notifications)
+            publish_notifications(notifications)
     except Exception as e:
-        # Log l'erreur
-        import logging
-        logger = logging.getLogger('apps')
-        logger.error(f"Erreur lors de l'envoi de la notification: {str(e)}")
-        return False
\ No newline at end of file
+        logger.error(f"Erreur lors de l'enregistrement des notifications: {str(e)}")
+        return 0
+    
+    if queued:
+        OutboxDispatcher.schedule()
+    
+    return notified
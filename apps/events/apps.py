@@ -0,0 +1,11 @@
+# apps/events/apps.py
+from django.apps import AppConfig
+
+
+class EventsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.events'
+    verbose_name = "Événements"
+
+    def ready(self):
+        import apps.events.signals
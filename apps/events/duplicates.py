@@ -0,0 +1,207 @@
+# events/duplicates.py
+import hashlib
+import random
+import re
+import unicodedata
+from functools import lru_cache
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from .models import Event, EventSignature, EventSignatureBucket
+
+# Champs dont dépend la signature d'un événement
+SIGNATURE_FIELDS = ('title', 'description', 'location_name', 'location_city', 'start_date')
+
+# Modulo des permutations: plus petit nombre premier supérieur à 2^32
+_PRIME = 4294967311
+
+class DuplicateDetector:
+    """
+    Détection des événements quasi identiques.
+
+    Chaque événement est réduit à un ensemble de fragments (suites de mots du
+    titre et de la description, lieu, ville et date de début) dont la
+    signature MinHash estime la similarité de Jaccard. La signature est
+    découpée en bandes hachées (LSH): deux événements partageant au moins une
+    bande sont candidats, et seuls les candidats sont comparés.
+    """
+
+    @staticmethod
+    def _config(key, default):
+        return settings.EVENTS.get(key, default)
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _coefficients(num_perm):
+        """Coefficients (a, b) des permutations h(x) = (a·x + b) mod p, stables d'une version à l'autre"""
+        import numpy as np
+
+        rng = random.Random(num_perm)
+        a = np.array([rng.randrange(1, 2 ** 32) for _ in range(num_perm)], dtype=np.uint64)
+        b = np.array([rng.randrange(0, 2 ** 32) for _ in range(num_perm)], dtype=np.uint64)
+        return a, b
+
+    @staticmethod
+    def _words(text):
+        text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode().lower()
+        return re.findall(r'[a-z0-9]+', text)
+
+    @staticmethod
+    def shingles(event):
+        """Fragments décrivant le contenu de l'événement"""
+        size = DuplicateDetector._config('DUPLICATE_SHINGLE_SIZE', 3)
+        shingles = set()
+        for field in ('title', 'description'):
+            words = DuplicateDetector._words(getattr(event, field))
+            if len(words) <= size:
+                if words:
+                    shingles.add(f"{field}:{' '.join(words)}")
+                continue
+            shingles.update(
+                f"{field}:{' '.join(words[i:i + size])}" for i in range(len(words) - size + 1)
+            )
+
+        shingles.update(f"place:{word}" for word in DuplicateDetector._words(event.location_name))
+        shingles.add(f"city:{' '.join(DuplicateDetector._words(event.location_city))}")
+        if event.start_date:
+            shingles.add(f"date:{event.start_date.date().isoformat()}")
+        return shingles
+
+    @staticmethod
+    def signature(shingles):
+        """Signature MinHash (tableau numpy uint64) d'un ensemble de fragments"""
+        import numpy as np
+
+        a, b = DuplicateDetector._coefficients(DuplicateDetector._config('DUPLICATE_NUM_PERM', 128))
+        values = np.array([
+            int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=4).digest(), 'big')
+            for shingle in shingles
+        ] or [0], dtype=np.uint64)
+        # a·x + b < 2^64 pour a, x, b < 2^32: pas de dépassement
+        return ((np.outer(values, a) + b) % np.uint64(_PRIME)).min(axis=0)
+
+    @staticmethod
+    def buckets(signature):
+        """Identifiants des compartiments LSH (un par bande) d'une signature"""
+        bands = DuplicateDetector._config('DUPLICATE_BANDS', 32)
+        rows = len(signature) // bands
+        return [
+            int.from_bytes(
+                hashlib.blake2b(band.to_bytes(2, 'big') + signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8).digest(),
+                'big',
+                signed=True
+            )
+            for band in range(bands)
+        ]
+
+    @staticmethod
+    def _load(minhash):
+        import numpy as np
+        return np.frombuffer(bytes(minhash), dtype=np.uint64)
+
+    @staticmethod
+    def similarity(signature, other):
+        """Similarité de Jaccard estimée entre deux signatures"""
+        if len(signature) != len(other):
+            return 0.0
+        return float((signature == other).mean())
+
+    @staticmethod
+    def index(event):
+        """Calcule et enregistre la signature et les compartiments d'un événement"""
+        signature = DuplicateDetector.signature(DuplicateDetector.shingles(event))
+        minhash = signature.tobytes()
+
+        stored = EventSignature.objects.filter(pk=event.pk).values_list('minhash', flat=True).first()
+        if stored is not None and bytes(stored) == minhash:
+            return False
+
+        with transaction.atomic():
+            EventSignature.objects.update_or_create(event_id=event.pk, defaults={'minhash': minhash})
+            EventSignatureBucket.objects.filter(event_id=event.pk).delete()
+            EventSignatureBucket.objects.bulk_create([
+                EventSignatureBucket(event_id=event.pk, bucket=bucket)
+                for bucket in DuplicateDetector.buckets(signature)
+            ])
+        return True
+
+    @staticmethod
+    def reindex(queryset=None, batch_size=500):
+        """Indexe les événements indiqués (tous par défaut); retourne le nombre de signatures modifiées"""
+        if queryset is None:
+            queryset = Event.objects.all()
+
+        changed = 0
+        for event in queryset.only(*SIGNATURE_FIELDS).iterator(chunk_size=batch_size):
+            changed += DuplicateDetector.index(event)
+        return changed
+
+    @staticmethod
+    def _verify(pairs, threshold):
+        """Garde les paires candidates dont la similarité estimée atteint le seuil"""
+        event_ids = {event_id for pair in pairs for event_id in pair}
+        signatures = {
+            event_id: DuplicateDetector._load(minhash)
+            for event_id, minhash in EventSignature.objects.filter(pk__in=event_ids).values_list('event_id', 'minhash')
+        }
+
+        results = []
+        for first, second in pairs:
+            if first in signatures and second in signatures:
+                similarity = DuplicateDetector.similarity(signatures[first], signatures[second])
+                if similarity >= threshold:
+                    results.append((first, second, similarity))
+        return results
+
+    @staticmethod
+    def likely_duplicates(event_id, limit=10, threshold=None):
+        """
+        Doublons probables d'un événement: [(event_id, similarité)] par
+        similarité décroissante.
+        """
+        if threshold is None:
+            threshold = DuplicateDetector._config('DUPLICATE_THRESHOLD', 0.5)
+
+        own_buckets = EventSignatureBucket.objects.filter(event_id=event_id).values('bucket')
+        candidates = EventSignatureBucket.objects.filter(
+            bucket__in=own_buckets
+        ).exclude(
+            event_id=event_id
+        ).values('event_id').annotate(
+            shared=Count('id')
+        ).order_by('-shared').values_list('event_id', flat=True)[:limit * 5]
+
+        results = DuplicateDetector._verify([(event_id, candidate) for candidate in candidates], threshold)
+        results.sort(key=lambda result: -result[2])
+        return [(candidate, similarity) for _, candidate, similarity in results[:limit]]
+
+    @staticmethod
+    def scan(threshold=None, batch_size=5000):
+        """
+        Balayage du catalogue: [(event_id, event_id, similarité)] pour toutes
+        les paires de doublons probables.
+        """
+        if threshold is None:
+            threshold = DuplicateDetector._config('DUPLICATE_THRESHOLD', 0.5)
+        max_size = DuplicateDetector._config('DUPLICATE_MAX_BUCKET_SIZE', 200)
+
+        shared = EventSignatureBucket.objects.values('bucket').annotate(
+            size=Count('id')
+        ).filter(size__gt=1, size__lte=max_size).values('bucket')
+        rows = EventSignatureBucket.objects.filter(bucket__in=shared).order_by('bucket').values_list('bucket', 'event_id')
+
+        pairs = set()
+        current, members = None, []
+        for bucket, event_id in rows.iterator(chunk_size=batch_size):
+            if bucket != current:
+                current, members = bucket, []
+            for member in members:
+                pairs.add((member, event_id) if str(member) < str(event_id) else (event_id, member))
+            members.append(event_id)
+
+        pairs = list(pairs)
+        results = []
+        for start in range(0, len(pairs), batch_size):
+            results.extend(DuplicateDetector._verify(pairs[start:start + batch_size], threshold))
+        results.sort(key=lambda result: -result[2])
+        return results
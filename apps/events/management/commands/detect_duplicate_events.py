@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from apps.events.duplicates import DuplicateDetector
+from apps.events.models import Event
+
+class Command(BaseCommand):
+    help = 'Recherche les événements en double dans tout le catalogue (MinHash et LSH)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reindex', action='store_true', help='Recalcule d\'abord les signatures de tous les événements')
+        parser.add_argument('--threshold', type=float, help='Similarité minimale (par défaut EVENTS[\'DUPLICATE_THRESHOLD\'])')
+
+    def handle(self, *args, **options):
+        if options['reindex']:
+            changed = DuplicateDetector.reindex()
+            self.stdout.write(f"{changed} signature(s) mise(s) à jour")
+
+        pairs = DuplicateDetector.scan(threshold=options['threshold'])
+        titles = dict(Event.objects.filter(
+            pk__in={event_id for pair in pairs for event_id in pair[:2]}
+        ).values_list('pk', 'title'))
+
+        for first, second, similarity in pairs:
+            self.stdout.write(f"{similarity:.2f}  {titles.get(first)} ({first})  ~  {titles.get(second)} ({second})")
+        self.stdout.write(self.style.SUCCESS(f"{len(pairs)} paire(s) de doublons probables"))
@@ -0,0 +1,18 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.events.recommendations import RecommendationService
+
+class Command(BaseCommand):
+    help = 'Évaluation hors ligne des recommandations (taux de succès@k par exclusion de la dernière inscription)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('-k', type=int, default=10, help='Nombre de recommandations examinées')
+        parser.add_argument('--max-users', type=int, help='Nombre maximal d\'utilisateurs évalués')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        hit_rate, evaluated = RecommendationService.evaluate(k=options['k'], max_users=options['max_users'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Taux de succès@{options['k']}: {hit_rate:.3f} sur {evaluated} utilisateur(s) "
+            f"({time.perf_counter() - start:.1f} s)"
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from apps.events.trending import TrendingService
+
+class Command(BaseCommand):
+    help = 'Met à jour les scores des événements tendance à partir des compteurs relevés'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Efface d\'abord les scores et les relevés (après un changement de demi-vie)')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            TrendingService.reset()
+            self.stdout.write("Scores de tendance effacés")
+
+        updated = TrendingService.update()
+        if updated is None:
+            self.stdout.write(self.style.WARNING("Une mise à jour est déjà en cours"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{updated} score(s) de tendance mis à jour"))
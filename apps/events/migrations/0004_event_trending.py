@@ -0,0 +1,44 @@
+# Generated by Django 5.1.7 on 2026-10-19 06:32
+
+import django.db.models.deletion
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0003_user_recommendations'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventTrend',
+            fields=[
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trend', serialize=False, to='events.event')),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('registrations', models.PositiveIntegerField(default=0)),
+                ('rating_total', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='trend_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(models.OrderBy(models.F('trend_score'), descending=True), models.F('id'), name='event_trend_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(django.db.models.functions.text.Upper('location_city'), models.OrderBy(models.F('trend_score'), descending=True), models.F('id'), name='event_city_trend_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(models.F('category'), models.OrderBy(models.F('trend_score'), descending=True), models.F('id'), name='event_category_trend_idx'),
+        ),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Upper
 from django.utils.text import slugify
 from apps.accounts.models import User
 import uuid
@@ -69,6 +71,7 @@ class Event(models.Model):
     # Statistiques
     view_count = models.PositiveIntegerField(default=0)
     registration_count = models.PositiveIntegerField(default=0)
+    trend_score = models.FloatField(default=0)  # Score de tendance (voir TrendingService), 0 sans activité
     
     # Métadonnées
     created_at = models.DateTimeField(auto_now_add=True)
@@ -78,6 +81,14 @@ class Event(models.Model):
     form_storage_usage = models.FloatField(default=0.0)  # en MB
     form_active_days = models.PositiveIntegerField(default=0)  # jours d'activation du formulaire
     
+    class Meta:
+        indexes = [
+            # Classements des événements tendance: global, par ville et par catégorie
+            models.Index(F('trend_score').desc(), 'id', name='event_trend_idx'),
+            models.Index(Upper('location_city'), F('trend_score').desc(), 'id', name='event_city_trend_idx'),
+            models.Index(F('category'), F('trend_score').desc(), 'id', name='event_category_trend_idx'),
+        ]
+    
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
@@ -86,6 +97,48 @@ class Event(models.Model):
     def __str__(self):
         return self.title
 
+class EventSignature(models.Model):
+    """Signature MinHash du contenu d'un événement (voir DuplicateDetector)"""
+    event = models.OneToOneField(Event, on_delete=models.CASCADE, primary_key=True, related_name='signature')
+    minhash = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Signature de {self.event_id}"
+
+class EventSignatureBucket(models.Model):
+    """Compartiment LSH d'un événement: une ligne par bande de sa signature"""
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='signature_buckets')
+    bucket = models.BigIntegerField()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['bucket', 'event'], name='event_signature_bucket_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.event_id} - {self.bucket}"
+
+class EventTrend(models.Model):
+    """Compteurs d'un événement lors du dernier relevé de TrendingService.update"""
+    event = models.OneToOneField(Event, on_delete=models.CASCADE, primary_key=True, related_name='trend')
+    views = models.PositiveIntegerField(default=0)
+    registrations = models.PositiveIntegerField(default=0)
+    rating_total = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"Tendance de {self.event_id}"
+
+class UserRecommendations(models.Model):
+    """Recommandations d'événements d'un utilisateur, précalculées par RecommendationService.refresh"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='event_recommendations')
+    events = models.JSONField(default=list)  # [[event_id, score], ...] par score décroissant
+    computed_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"Recommandations de {self.user_id}"
+
 class EventTag(models.Model):
     name = models.CharField(max_length=100, unique=True)
     
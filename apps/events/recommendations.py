@@ -0,0 +1,353 @@
+# events/recommendations.py
+import math
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from .models import Event, UserRecommendations
+
+RECOMMENDABLE_STATUSES = ('published', 'validated')
+
+def _config(key, default):
+    return settings.EVENTS.get(key, default)
+
+def _expand(indptr, rows):
+    """
+    Lignes rows d'une matrice creuse au format CSR: retourne, pour chaque
+    élément non nul, (position de sa ligne dans rows, position de l'élément).
+    """
+    import numpy as np
+
+    counts = indptr[rows + 1] - indptr[rows]
+    owners = np.repeat(np.arange(len(rows)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owners, np.repeat(indptr[rows], counts) + offsets
+
+class AffinityModel:
+    """
+    Modèle de recommandation construit à partir des affinités utilisateur-événement.
+
+    Le score d'un événement candidat pour un utilisateur combine:
+    - le filtrage collaboratif article-article: similarité cosinus des
+      événements calculée sur les co-inscriptions (matrice creuse construite
+      avec NumPy, K plus proches voisins conservés par événement);
+    - le contenu: similarité cosinus entre le profil de l'utilisateur
+      (catégories et tags pondérés de ses événements) et le candidat;
+    - la popularité du candidat, pour départager.
+    """
+
+    def __init__(self, affinities, candidate_ids, features, popularity):
+        import numpy as np
+
+        self.candidate_ids = list(candidate_ids)
+        items = {event_id: index for index, event_id in enumerate(self.candidate_ids)}
+        for _, event_id in affinities:
+            items.setdefault(event_id, len(items))
+        self.user_ids = sorted({user_id for user_id, _ in affinities})
+        users = {user_id: index for index, user_id in enumerate(self.user_ids)}
+        n_items, n_candidates = len(items), len(self.candidate_ids)
+
+        # Interactions au format CSR par utilisateur, limitées aux plus fortes
+        max_history = _config('RECOMMENDATION_MAX_HISTORY', 100)
+        U = np.array([users[user_id] for user_id, _ in affinities], dtype=np.int64)
+        I = np.array([items[event_id] for _, event_id in affinities], dtype=np.int64)
+        W = np.array(list(affinities.values()), dtype=np.float64)
+        order = np.lexsort((-W, U))
+        U, I, W = U[order], I[order], W[order]
+        starts = np.searchsorted(U, U)
+        keep = np.arange(len(U)) - starts < max_history
+        U, I, W = U[keep], I[keep], W[keep]
+        self.user_indptr = np.searchsorted(U, np.arange(len(self.user_ids) + 1))
+        self.items, self.weights = I, W
+
+        # Co-occurrences source -> candidat, sommées sur les utilisateurs
+        sources, targets, values = [], [], []
+        for start, end in zip(self.user_indptr[:-1], self.user_indptr[1:]):
+            if end - start < 2:
+                continue
+            user_items, user_weights = I[start:end], W[start:end]
+            size = end - start
+            src = np.repeat(user_items, size)
+            dst = np.tile(user_items, size)
+            val = np.repeat(user_weights, size) * np.tile(user_weights, size)
+            mask = (dst < n_candidates) & (src != dst)
+            sources.append(src[mask])
+            targets.append(dst[mask])
+            values.append(val[mask])
+
+        norms = np.sqrt(np.bincount(I, weights=W ** 2, minlength=n_items))
+        if sources:
+            keys, inverse = np.unique(
+                np.concatenate(sources) * n_items + np.concatenate(targets),
+                return_inverse=True
+            )
+            co = np.bincount(inverse, weights=np.concatenate(values))
+            src, dst = keys // n_items, keys % n_items
+            sim = co / (norms[src] * norms[dst])
+
+            # K plus proches voisins par événement source
+            order = np.lexsort((-sim, src))
+            src, dst, sim = src[order], dst[order], sim[order]
+            keep = np.arange(len(src)) - np.searchsorted(src, src) < _config('RECOMMENDATION_NEIGHBORS', 50)
+            src, dst, sim = src[keep], dst[keep], sim[keep]
+        else:
+            src = dst = np.zeros(0, dtype=np.int64)
+            sim = np.zeros(0)
+        self.neighbor_indptr = np.searchsorted(src, np.arange(n_items + 1))
+        self.neighbors, self.similarities = dst, sim
+
+        # Caractéristiques (catégorie, tags) des événements au format CSR
+        vocabulary = {}
+        feature_rows, feature_cols = [], []
+        for event_id, index in items.items():
+            for feature in features.get(event_id, ()):
+                feature_rows.append(index)
+                feature_cols.append(vocabulary.setdefault(feature, len(vocabulary)))
+        feature_rows = np.array(feature_rows, dtype=np.int64)
+        feature_cols = np.array(feature_cols, dtype=np.int64)
+        order = np.argsort(feature_rows, kind='stable')
+        self.feature_indptr = np.searchsorted(feature_rows[order], np.arange(n_items + 1))
+        self.features = feature_cols[order]
+        self.n_features = len(vocabulary)
+
+        candidate_features = np.zeros((n_candidates, self.n_features))
+        mask = feature_rows < n_candidates
+        candidate_features[feature_rows[mask], feature_cols[mask]] = 1.0
+        lengths = np.linalg.norm(candidate_features, axis=1, keepdims=True)
+        self.candidate_features = np.divide(candidate_features, lengths, out=candidate_features, where=lengths > 0)
+
+        popularity = np.log1p(np.array([popularity.get(event_id, 0) for event_id in self.candidate_ids], dtype=np.float64))
+        self.popularity = popularity / popularity.max() if n_candidates and popularity.max() > 0 else popularity
+
+    def recommend(self, size, batch_size=1000):
+        """Génère (user_id, [(event_id, score)]) pour chaque utilisateur du modèle"""
+        import numpy as np
+
+        n_candidates = len(self.candidate_ids)
+        if not n_candidates:
+            for user_id in self.user_ids:
+                yield user_id, []
+            return
+
+        content_weight = _config('RECOMMENDATION_CONTENT_WEIGHT', 0.3)
+        popularity_weight = _config('RECOMMENDATION_POPULARITY_WEIGHT', 0.05)
+
+        for batch_start in range(0, len(self.user_ids), batch_size):
+            rows = np.arange(batch_start, min(batch_start + batch_size, len(self.user_ids)))
+            owners, positions = _expand(self.user_indptr, rows)
+            items, weights = self.items[positions], self.weights[positions]
+
+            # Filtrage collaboratif: Σ affinité × similarité des voisins
+            collaborative = np.zeros((len(rows), n_candidates))
+            neighbor_owners, neighbor_positions = _expand(self.neighbor_indptr, items)
+            np.add.at(
+                collaborative,
+                (owners[neighbor_owners], self.neighbors[neighbor_positions]),
+                weights[neighbor_owners] * self.similarities[neighbor_positions]
+            )
+            peaks = collaborative.max(axis=1, keepdims=True)
+            np.divide(collaborative, peaks, out=collaborative, where=peaks > 0)
+
+            # Contenu: profil des catégories et tags de l'utilisateur
+            profiles = np.zeros((len(rows), self.n_features))
+            feature_owners, feature_positions = _expand(self.feature_indptr, items)
+            np.add.at(profiles, (owners[feature_owners], self.features[feature_positions]), weights[feature_owners])
+            lengths = np.linalg.norm(profiles, axis=1, keepdims=True)
+            np.divide(profiles, lengths, out=profiles, where=lengths > 0)
+
+            scores = (
+                (1 - content_weight) * collaborative
+                + content_weight * profiles @ self.candidate_features.T
+                + popularity_weight * self.popularity
+            )
+
+            # Exclusion des événements auxquels l'utilisateur a déjà participé
+            seen = items < n_candidates
+            scores[owners[seen], items[seen]] = -np.inf
+
+            top = min(size, n_candidates)
+            best = np.argpartition(-scores, top - 1, axis=1)[:, :top]
+            for row, columns in zip(rows, best):
+                line = scores[row - batch_start]
+                columns = columns[np.argsort(-line[columns])]
+                yield self.user_ids[row], [
+                    (self.candidate_ids[column], round(float(line[column]), 4))
+                    for column in columns
+                    if line[column] > 0
+                ]
+
+class RecommendationService:
+    """
+    Recommandations d'événements pour les participants.
+
+    Le calcul complet (refresh) est effectué chaque nuit et enregistré dans
+    UserRecommendations; la consultation ne lit qu'une ligne par utilisateur.
+    Les utilisateurs sans historique reçoivent les événements populaires de la
+    ville ou de la catégorie demandée.
+    """
+
+    @staticmethod
+    def affinities(exclude=()):
+        """
+        Affinité utilisateur-événement {(user_id, event_id): poids}: 1 pour une
+        inscription non annulée, note / 2.5 pour un avis approuvé (la plus forte
+        des deux).
+        """
+        from apps.feedback.models import EventFeedback
+        from apps.registrations.models import Registration
+
+        exclude = set(exclude)
+        affinities = {}
+        for user_id, event_id in Registration.objects.exclude(status='cancelled').values_list(
+            'user_id', 'event_id'
+        ).iterator(chunk_size=5000):
+            if (user_id, event_id) not in exclude:
+                affinities[(user_id, event_id)] = 1.0
+        for user_id, event_id, rating in EventFeedback.objects.filter(is_approved=True).values_list(
+            'user_id', 'event_id', 'rating'
+        ).iterator(chunk_size=5000):
+            if (user_id, event_id) not in exclude:
+                affinities[(user_id, event_id)] = max(affinities.get((user_id, event_id), 0.0), rating / 2.5)
+        return affinities
+
+    @staticmethod
+    def build(affinities, candidates):
+        """Construit le modèle pour les événements candidats (queryset d'Event)"""
+        candidates = list(candidates.values_list('pk', 'category_id', 'registration_count'))
+        event_ids = {event_id for _, event_id in affinities} | {event_id for event_id, _, _ in candidates}
+
+        features = {}
+        for event_id, category_id in Event.objects.filter(pk__in=event_ids).values_list('pk', 'category_id'):
+            if category_id is not None:
+                features.setdefault(event_id, []).append(f"category:{category_id}")
+        for event_id, tag_id in Event.tags.through.objects.filter(event_id__in=event_ids).values_list('event_id', 'eventtag_id'):
+            features.setdefault(event_id, []).append(f"tag:{tag_id}")
+
+        return AffinityModel(
+            affinities,
+            [event_id for event_id, _, _ in candidates],
+            features,
+            {event_id: registration_count for event_id, _, registration_count in candidates}
+        )
+
+    @staticmethod
+    def candidates():
+        """Événements recommandables: publiés et à venir"""
+        return Event.objects.filter(status__in=RECOMMENDABLE_STATUSES, start_date__gt=timezone.now())
+
+    @staticmethod
+    def refresh():
+        """Recalcule et enregistre les recommandations de tous les utilisateurs; retourne leur nombre"""
+        now = timezone.now()
+        model = RecommendationService.build(RecommendationService.affinities(), RecommendationService.candidates())
+        batch_size = _config('RECOMMENDATION_BATCH_SIZE', 1000)
+
+        count = 0
+        batch = []
+        for user_id, recommendations in model.recommend(_config('RECOMMENDATIONS_SIZE', 20), batch_size):
+            batch.append(UserRecommendations(
+                user_id=user_id,
+                events=[[str(event_id), score] for event_id, score in recommendations],
+                computed_at=now
+            ))
+            if len(batch) >= batch_size:
+                RecommendationService._save(batch)
+                count += len(batch)
+                batch = []
+
+        with transaction.atomic():
+            if batch:
+                RecommendationService._save(batch)
+                count += len(batch)
+            # Utilisateurs sans historique: démarrage à froid
+            UserRecommendations.objects.filter(computed_at__lt=now).delete()
+        return count
+
+    @staticmethod
+    def _save(recommendations):
+        UserRecommendations.objects.bulk_create(
+            recommendations,
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['events', 'computed_at']
+        )
+
+    @staticmethod
+    def popular(city=None, category=None, limit=20):
+        """Identifiants des événements à venir les plus populaires (mis en cache)"""
+        cache_key = f"popular_events:{(city or '').lower()}:{category or ''}:{limit}"
+        event_ids = cache.get(cache_key)
+        if event_ids is None:
+            events = RecommendationService.candidates()
+            if city:
+                events = events.filter(location_city__iexact=city)
+            if category:
+                events = events.filter(category_id=category)
+            event_ids = list(events.order_by('-registration_count', '-view_count', 'start_date').values_list('pk', flat=True)[:limit])
+            cache.set(cache_key, event_ids, _config('POPULAR_EVENTS_CACHE_TIMEOUT', 3600))
+        return event_ids
+
+    @staticmethod
+    def recommend(user, limit=None, city=None, category=None):
+        """
+        Identifiants des événements recommandés à un utilisateur: les
+        recommandations précalculées encore valides, complétées par les
+        événements populaires (démarrage à froid).
+        """
+        from apps.registrations.models import Registration
+
+        limit = limit or _config('RECOMMENDATIONS_SIZE', 20)
+        stored = UserRecommendations.objects.filter(pk=user.pk).values_list('events', flat=True).first() or []
+        event_ids = [event_id for event_id, _ in stored]
+
+        if event_ids:
+            # Les événements annulés ou commencés depuis le calcul sont écartés
+            valid = RecommendationService.candidates().filter(pk__in=event_ids)
+            if city:
+                valid = valid.filter(location_city__iexact=city)
+            if category:
+                valid = valid.filter(category_id=category)
+            valid = {str(event_id) for event_id in valid.values_list('pk', flat=True)}
+            event_ids = [event_id for event_id in event_ids if event_id in valid][:limit]
+
+        if len(event_ids) < limit:
+            excluded = set(event_ids) | {
+                str(event_id) for event_id in Registration.objects.filter(user=user).values_list('event_id', flat=True)
+            }
+            event_ids += [
+                str(event_id) for event_id in RecommendationService.popular(city, category, limit * 2)
+                if str(event_id) not in excluded
+            ][:limit - len(event_ids)]
+        return event_ids
+
+    @staticmethod
+    def evaluate(k=10, max_users=None):
+        """
+        Évaluation hors ligne par exclusion: pour chaque utilisateur ayant au
+        moins deux inscriptions, la plus récente est retirée de l'historique;
+        retourne le taux de succès@k (proportion retrouvée dans les k
+        premières recommandations) et le nombre d'utilisateurs évalués.
+        """
+        from apps.registrations.models import Registration
+
+        held_out = {}
+        counts = {}
+        for user_id, event_id in Registration.objects.exclude(status='cancelled').order_by(
+            'user_id', 'created_at'
+        ).values_list('user_id', 'event_id').iterator(chunk_size=5000):
+            counts[user_id] = counts.get(user_id, 0) + 1
+            held_out[user_id] = event_id
+        held_out = {user_id: event_id for user_id, event_id in held_out.items() if counts[user_id] >= 2}
+        if max_users:
+            held_out = dict(list(held_out.items())[:max_users])
+
+        affinities = RecommendationService.affinities(exclude=held_out.items())
+        # Tous les événements sont candidats: l'événement retiré peut être passé
+        model = RecommendationService.build(affinities, Event.objects.exclude(status='draft'))
+
+        hits = evaluated = 0
+        for user_id, recommendations in model.recommend(k):
+            if user_id in held_out:
+                evaluated += 1
+                hits += held_out[user_id] in {event_id for event_id, _ in recommendations}
+        return (hits / evaluated if evaluated else math.nan), evaluated
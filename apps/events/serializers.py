@@ -1,7 +1,15 @@
+from django.core.exceptions import ObjectDoesNotExist
 from rest_framework import serializers
 from .models import Event, EventCategory, EventTag, EventImage, CustomFormField
 from apps.accounts.serializers import UserSerializer
 
+def rating_summary(event):
+    """Agrégats de notes de l'événement (à charger avec select_related('rating'))"""
+    try:
+        return event.rating.summary()
+    except ObjectDoesNotExist:
+        return None
+
 class EventTagSerializer(serializers.ModelSerializer):
     class Meta:
         model = EventTag
@@ -28,19 +36,23 @@ class EventListSerializer(serializers.ModelSerializer):
     organizer_name = serializers.SerializerMethodField()
     tags = EventTagSerializer(many=True, read_only=True)
     ticket_price_range = serializers.SerializerMethodField()
+    rating = serializers.SerializerMethodField()
     
     class Meta:
         model = Event
         fields = ['id', 'title', 'slug', 'short_description', 'event_type', 
                   'start_date', 'end_date', 'location_city', 'banner_image', 
                   'category', 'organizer_name', 'tags', 'ticket_price_range', 
-                  'status', 'is_featured', 'registration_count']
+                  'status', 'is_featured', 'registration_count', 'rating']
     
     def get_organizer_name(self, obj):
         if obj.organizer.organizer_type == 'organization' and obj.organizer.company_name:
             return obj.organizer.company_name
         return f"{obj.organizer.first_name} {obj.organizer.last_name}".strip() or obj.organizer.username
     
+    def get_rating(self, obj):
+        return rating_summary(obj)
+    
     def get_ticket_price_range(self, obj):
         if obj.event_type != 'billetterie' or not hasattr(obj, 'ticket_types'):
             return None
@@ -62,10 +74,14 @@ class EventDetailSerializer(serializers.ModelSerializer):
     tags = EventTagSerializer(many=True, read_only=True)
     gallery_images = EventImageSerializer(many=True, read_only=True)
     form_fields = CustomFormFieldSerializer(many=True, read_only=True)
+    rating = serializers.SerializerMethodField()
     
     class Meta:
         model = Event
         fields = '__all__'
+    
+    def get_rating(self, obj):
+        return rating_summary(obj)
 
 class EventSerializer(serializers.ModelSerializer):
     class Meta:
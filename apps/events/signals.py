@@ -0,0 +1,33 @@
+# events/signals.py
+import logging
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .duplicates import SIGNATURE_FIELDS
+from .models import Event
+
+logger = logging.getLogger('apps')
+
+@receiver(post_save, sender=Event)
+def index_event_signature(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Programme la mise à jour de la signature de détection des doublons lorsque
+    le contenu de l'événement change. Le calcul (numpy) a lieu dans un worker
+    Celery, après la validation de la transaction.
+    """
+    if raw:
+        return
+    if update_fields is not None and not set(update_fields) & set(SIGNATURE_FIELDS):
+        return
+
+    event_id = str(instance.pk)
+
+    def schedule():
+        from .tasks import index_event_signature as index_task
+        try:
+            index_task.delay(event_id)
+        except Exception as e:
+            # Rattrapé par detect_duplicate_events --reindex
+            logger.warning(f"Impossible de programmer l'indexation de l'événement {event_id}: {str(e)}")
+
+    transaction.on_commit(schedule)
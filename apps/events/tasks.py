@@ -0,0 +1,37 @@
+import logging
+from celery import shared_task
+from .duplicates import DuplicateDetector, SIGNATURE_FIELDS
+from .models import Event
+from .recommendations import RecommendationService
+from .trending import TrendingService
+
+logger = logging.getLogger('apps')
+
+@shared_task
+def index_event_signature(event_id):
+    """Met à jour la signature de détection des doublons d'un événement"""
+    event = Event.objects.filter(pk=event_id).only(*SIGNATURE_FIELDS).first()
+    if event is None:
+        return False
+    return DuplicateDetector.index(event)
+
+@shared_task
+def scan_duplicate_events(reindex=False):
+    """Recherche les paires d'événements en double dans tout le catalogue"""
+    if reindex:
+        DuplicateDetector.reindex()
+
+    pairs = DuplicateDetector.scan()
+    for first, second, similarity in pairs:
+        logger.info(f"Doublon probable: {first} / {second} (similarité {similarity:.2f})")
+    return len(pairs)
+
+@shared_task
+def refresh_recommendations():
+    """Recalcule les recommandations d'événements de tous les utilisateurs"""
+    return RecommendationService.refresh()
+
+@shared_task
+def update_trending_events():
+    """Ajoute aux scores de tendance l'activité relevée depuis la dernière mise à jour"""
+    return TrendingService.update()
@@ -0,0 +1,243 @@
+import math
+from datetime import timedelta
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.accounts.models import User
+from .duplicates import DuplicateDetector
+from apps.registrations.models import Registration
+from .models import Event, EventCategory, EventSignature, EventTrend, UserRecommendations
+from .recommendations import RecommendationService
+from .tasks import index_event_signature
+from .trending import TrendingService
+
+class DuplicateIndexingTests(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user(email='org@example.com', username='org', password='x', role='organizer')
+
+    def create_event(self, title='Festival de jazz de Douala', **kwargs):
+        now = timezone.now()
+        return Event.objects.create(**{
+            'title': title,
+            'description': 'Trois jours de concerts en plein air avec des artistes de toute la région',
+            'organizer': self.organizer,
+            'event_type': 'billetterie',
+            'start_date': now + timedelta(days=10),
+            'end_date': now + timedelta(days=12),
+            'location_name': 'Parc des expositions',
+            'location_address': 'Adresse',
+            'location_city': 'Douala',
+            **kwargs
+        })
+
+    @mock.patch('apps.events.tasks.index_event_signature.delay')
+    def test_indexing_deferred_to_task_after_commit(self, delay):
+        with self.captureOnCommitCallbacks() as callbacks:
+            event = self.create_event()
+        delay.assert_not_called()
+        self.assertFalse(EventSignature.objects.exists())
+
+        for callback in callbacks:
+            callback()
+        delay.assert_called_once_with(str(event.pk))
+
+    @mock.patch('apps.events.tasks.index_event_signature.delay')
+    def test_unrelated_update_not_indexed(self, delay):
+        event = self.create_event()
+        with self.captureOnCommitCallbacks(execute=True):
+            event.save(update_fields=['status'])
+        delay.assert_not_called()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            event.title = 'Festival de jazz'
+            event.save(update_fields=['title'])
+        delay.assert_called_once_with(str(event.pk))
+
+    @mock.patch('apps.events.tasks.index_event_signature.delay')
+    def test_task_indexes_signature(self, delay):
+        original = self.create_event()
+        copy = self.create_event(title='Festival de jazz de Douala 2e édition')
+        other = self.create_event(
+            title='Conférence sur la finance',
+            description='Une journée de présentations sur les marchés financiers',
+            location_name='Hôtel de ville',
+            location_city='Yaoundé'
+        )
+
+        for event in (original, copy, other):
+            self.assertTrue(index_event_signature(str(event.pk)))
+        # Signature inchangée: pas de nouvelle écriture
+        self.assertFalse(index_event_signature(str(original.pk)))
+
+        matches = [event_id for event_id, _ in DuplicateDetector.likely_duplicates(original.pk)]
+        self.assertEqual(matches, [copy.pk])
+
+    def test_task_ignores_deleted_event(self):
+        self.assertFalse(index_event_signature('00000000-0000-0000-0000-000000000000'))
+
+class TrendingTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.organizer = User.objects.create_user(email='org@example.com', username='org', password='x', role='organizer')
+        self.concerts = EventCategory.objects.create(name='Concerts')
+
+    def create_event(self, title, city='Douala', end=timedelta(days=2), **kwargs):
+        return Event.objects.create(
+            title=title, description='Description', organizer=self.organizer, event_type='billetterie',
+            start_date=self.now + end - timedelta(days=1), end_date=self.now + end,
+            location_name='Salle', location_address='Adresse', location_city=city, status='published', **kwargs
+        )
+
+    def activity(self, event, views=0, registrations=0):
+        Event.objects.filter(pk=event.pk).update(view_count=views, registration_count=registrations)
+
+    def update(self, at):
+        with mock.patch('apps.events.trending.timezone.now', return_value=at):
+            return TrendingService.update()
+
+    def score(self, event):
+        return Event.objects.values_list('trend_score', flat=True).get(pk=event.pk)
+
+    def test_score_decay(self):
+        half_life = timedelta(hours=24)
+        # Une activité vaut deux fois moins qu'une activité identique une demi-vie plus tard
+        self.assertAlmostEqual(
+            TrendingService.add(0, 2, self.now),
+            TrendingService.add(0, 1, self.now + half_life)
+        )
+        self.assertAlmostEqual(
+            TrendingService.add(0, 1, self.now + half_life) - TrendingService.add(0, 1, self.now),
+            math.log(2)
+        )
+        # Les contributions s'additionnent
+        self.assertAlmostEqual(
+            TrendingService.add(TrendingService.add(0, 1, self.now), 3, self.now),
+            TrendingService.add(0, 4, self.now)
+        )
+
+    def test_only_snapshot_deltas_added(self):
+        event = self.create_event('Concert')
+        self.activity(event, views=20, registrations=1)
+        self.assertEqual(self.update(self.now), 1)
+        first = self.score(event)
+        self.assertAlmostEqual(first, TrendingService.add(0, TrendingService.weight(20, 1, 0), self.now))
+        trend = EventTrend.objects.get(event=event)
+        self.assertEqual((trend.views, trend.registrations, trend.rating_total), (20, 1, 0))
+
+        # Aucun changement: rien à relever
+        self.assertEqual(self.update(self.now + timedelta(minutes=5)), 0)
+        self.assertEqual(self.score(event), first)
+
+        later = self.now + timedelta(hours=1)
+        self.activity(event, views=20, registrations=3)
+        self.assertEqual(self.update(later), 1)
+        self.assertAlmostEqual(self.score(event), TrendingService.add(first, 2, later))
+
+        # Une baisse déplace seulement le relevé
+        self.activity(event, views=10, registrations=3)
+        self.assertEqual(self.update(later + timedelta(minutes=5)), 0)
+        self.assertAlmostEqual(self.score(event), TrendingService.add(first, 2, later))
+        self.assertEqual(EventTrend.objects.get(event=event).views, 10)
+
+    def test_ordering_and_filters(self):
+        recent = self.create_event('Récent', city='Kribi', category=self.concerts)
+        older = self.create_event('Ancien')
+        busy = self.create_event('Populaire', category=self.concerts)
+        idle = self.create_event('Sans activité')
+        past = self.create_event('Passé', end=timedelta(days=-1))
+
+        self.activity(older, registrations=2)
+        self.activity(past, registrations=50)
+        self.update(self.now - timedelta(hours=48))
+        # Même activité, deux demi-vies plus tard: compte quatre fois plus
+        self.activity(recent, registrations=2)
+        self.activity(busy, registrations=10)
+        self.update(self.now)
+
+        self.assertEqual(list(TrendingService.trending()), [busy, recent, older])
+        self.assertNotIn(idle, TrendingService.trending())
+        self.assertEqual(list(TrendingService.trending(city='kribi')), [recent])
+        self.assertEqual(list(TrendingService.trending(category=self.concerts.pk)), [busy, recent])
+
+        client = APIClient()
+        response = client.get('/api/events/trending/', {'category': self.concerts.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.data['results']], [str(busy.pk), str(recent.pk)])
+        self.assertEqual(client.get('/api/events/trending/', {'category': 'abc'}).status_code, 400)
+
+    def test_concurrent_update_skipped(self):
+        with mock.patch('apps.events.trending.cache.add', return_value=False):
+            self.assertIsNone(TrendingService.update())
+
+class RecommendationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+        organizer = User.objects.create_user(email='org@example.com', username='org', password='x', role='organizer')
+        self.concerts = EventCategory.objects.create(name='Concerts')
+        self.jazz, self.rock, self.opera, self.theatre = [
+            Event.objects.create(
+                title=title, description='Description', organizer=organizer, event_type='inscription',
+                start_date=self.now + timedelta(days=10), end_date=self.now + timedelta(days=11),
+                location_name='Salle', location_address='Adresse', location_city='Douala', status='published',
+                registration_count=popularity, category=self.concerts if title != 'Théâtre' else None
+            )
+            for title, popularity in (('Jazz', 5), ('Rock', 3), ('Opéra', 1), ('Théâtre', 50))
+        ]
+        self.client = APIClient()
+
+    def user(self, name):
+        return User.objects.create_user(email=f'{name}@example.com', username=name, password='x')
+
+    def register(self, user, *events):
+        # Inscriptions dans l'ordre chronologique donné
+        for index, event in enumerate(events):
+            registration = Registration.objects.create(event=event, user=user, registration_type='inscription', status='confirmed')
+            Registration.objects.filter(pk=registration.pk).update(created_at=self.now - timedelta(hours=len(events) - index))
+
+    def test_co_registrations_recommended(self):
+        for index in range(4):
+            self.register(self.user(f'fan{index}'), self.jazz, self.rock)
+        target = self.user('target')
+        self.register(target, self.jazz)
+        RecommendationService.refresh()
+
+        recommended = [event_id for event_id, _ in UserRecommendations.objects.get(user=target).events]
+        self.assertEqual(recommended[0], str(self.rock.pk))
+        self.assertNotIn(str(self.jazz.pk), recommended)
+        self.assertEqual(RecommendationService.recommend(target, limit=1), [str(self.rock.pk)])
+
+        # Complété par les événements populaires, sans ceux où l'utilisateur est inscrit
+        event_ids = RecommendationService.recommend(target, limit=10)
+        self.assertEqual(event_ids[0], str(self.rock.pk))
+        self.assertNotIn(str(self.jazz.pk), event_ids)
+        self.assertEqual(len(event_ids), len(set(event_ids)))
+
+    def test_cold_start_gets_popular_events(self):
+        newcomer = self.user('newcomer')
+        RecommendationService.refresh()
+        self.assertFalse(UserRecommendations.objects.filter(user=newcomer).exists())
+        self.assertEqual(
+            RecommendationService.recommend(newcomer, limit=3),
+            [str(self.theatre.pk), str(self.jazz.pk), str(self.rock.pk)]
+        )
+        self.assertEqual(
+            RecommendationService.recommend(newcomer, limit=3, category=self.concerts.pk),
+            [str(self.jazz.pk), str(self.rock.pk), str(self.opera.pk)]
+        )
+
+    def test_offline_hit_rate(self):
+        # Chaque groupe a pour dernière inscription l'événement que l'autre groupe associe au jazz
+        for index in range(4):
+            self.register(self.user(f'a{index}'), self.opera, self.jazz, self.rock)
+            self.register(self.user(f'b{index}'), self.rock, self.jazz, self.opera)
+        self.assertEqual(RecommendationService.evaluate(k=1), (1.0, 8))
+
+    def test_recommended_endpoint(self):
+        self.client.force_authenticate(self.user('newcomer'))
+        response = self.client.get('/api/events/recommended/', {'limit': 0, 'category': self.concerts.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.data], [str(self.jazz.pk)])
+        self.assertEqual(self.client.get('/api/events/recommended/', {'category': 'abc'}).status_code, 400)
@@ -0,0 +1,149 @@
+# events/trending.py
+import math
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Coalesce, Upper
+from django.utils import timezone
+from .models import Event, EventTrend
+
+TRENDING_STATUSES = ('published', 'validated')
+
+class TrendingService:
+    """
+    Classement des événements tendance.
+
+    Chaque nouvelle inscription, vue ou note ajoute au score de l'événement un
+    poids décroissant avec l'âge. Le score est stocké sous la forme
+    log(Σ poids × e^(λ·t)), comme la priorité des dossiers de modération:
+    l'ordre ainsi obtenu est celui des sommes décroissantes, sans recalcul
+    périodique de tous les événements. Les compteurs des événements
+    (view_count, registration_count, notes) sont relevés toutes les quelques
+    minutes et seules leurs variations depuis le relevé précédent (EventTrend)
+    sont ajoutées au score indexé Event.trend_score. Un score nul signifie
+    qu'aucune activité n'a encore été relevée.
+    """
+
+    ORDERING = ('-trend_score', 'id')
+    LOCK_KEY = 'trending_events:update'
+
+    @staticmethod
+    def _config(key, default):
+        return settings.EVENTS.get(key, default)
+
+    @staticmethod
+    def _decay_rate():
+        return math.log(2) / (TrendingService._config('TRENDING_HALF_LIFE_HOURS', 24) * 3600)
+
+    @staticmethod
+    def _log_add(a, b):
+        """log(e^a + e^b) sans dépassement"""
+        high, low = max(a, b), min(a, b)
+        return high + math.log1p(math.exp(low - high))
+
+    @staticmethod
+    def weight(views, registrations, stars):
+        """Poids d'une activité: nouvelles vues, inscriptions et étoiles reçues"""
+        return (
+            max(views, 0) * TrendingService._config('TRENDING_VIEW_WEIGHT', 0.05)
+            + max(registrations, 0) * TrendingService._config('TRENDING_REGISTRATION_WEIGHT', 1.0)
+            + max(stars, 0) / 5 * TrendingService._config('TRENDING_RATING_WEIGHT', 1.0)
+        )
+
+    @staticmethod
+    def add(score, weight, when):
+        """Score après l'ajout d'une activité de poids weight à la date when"""
+        contribution = math.log(weight) + TrendingService._decay_rate() * when.timestamp()
+        if score <= 0:
+            return contribution
+        return TrendingService._log_add(score, contribution)
+
+    @staticmethod
+    def trending(city=None, category=None):
+        """Événements tendance à venir ou en cours, dans l'ordre du classement (parcours de l'index)"""
+        events = Event.objects.filter(
+            status__in=TRENDING_STATUSES,
+            end_date__gt=timezone.now(),
+            trend_score__gt=0
+        )
+        if city:
+            events = events.alias(city_key=Upper('location_city')).filter(city_key=city.upper())
+        if category:
+            events = events.filter(category_id=category)
+        return events.order_by(*TrendingService.ORDERING)
+
+    @staticmethod
+    def _changed(now):
+        """Événements dont les compteurs ont changé depuis le dernier relevé"""
+        return Event.objects.filter(
+            status__in=TRENDING_STATUSES,
+            end_date__gt=now
+        ).annotate(
+            rating_total=Coalesce('rating__rating_total', 0),
+            seen_views=Coalesce('trend__views', 0),
+            seen_registrations=Coalesce('trend__registrations', 0),
+            seen_rating_total=Coalesce('trend__rating_total', 0)
+        ).filter(
+            ~Q(view_count=F('seen_views'))
+            | ~Q(registration_count=F('seen_registrations'))
+            | ~Q(rating_total=F('seen_rating_total'))
+        ).values_list(
+            'pk', 'trend_score',
+            'view_count', 'registration_count', 'rating_total',
+            'seen_views', 'seen_registrations', 'seen_rating_total'
+        ).order_by()
+
+    @staticmethod
+    def update(batch_size=1000):
+        """
+        Ajoute aux scores l'activité relevée depuis la dernière mise à jour;
+        retourne le nombre d'événements dont le score a changé (None si une
+        mise à jour est déjà en cours).
+        """
+        if not cache.add(TrendingService.LOCK_KEY, 1, TrendingService._config('TRENDING_LOCK_TIMEOUT', 600)):
+            return None
+
+        try:
+            now = timezone.now()
+            scores, snapshots = [], []
+            for (event_id, score, views, registrations, rating_total,
+                 seen_views, seen_registrations, seen_rating_total) in TrendingService._changed(now).iterator(chunk_size=5000):
+                # Les baisses (annulations, avis retirés) ne font que déplacer le relevé
+                weight = TrendingService.weight(
+                    views - seen_views,
+                    registrations - seen_registrations,
+                    rating_total - seen_rating_total
+                )
+                if weight > 0:
+                    scores.append(Event(pk=event_id, trend_score=TrendingService.add(score, weight, now)))
+                snapshots.append(EventTrend(
+                    event_id=event_id,
+                    views=views,
+                    registrations=registrations,
+                    rating_total=rating_total,
+                    updated_at=now
+                ))
+
+            with transaction.atomic():
+                Event.objects.bulk_update(scores, ['trend_score'], batch_size=batch_size)
+                EventTrend.objects.bulk_create(
+                    snapshots,
+                    batch_size=batch_size,
+                    update_conflicts=True,
+                    unique_fields=['event'],
+                    update_fields=['views', 'registrations', 'rating_total', 'updated_at']
+                )
+            return len(scores)
+        finally:
+            cache.delete(TrendingService.LOCK_KEY)
+
+    @staticmethod
+    def reset():
+        """
+        Efface les scores et les relevés, par exemple après un changement de
+        demi-vie: la mise à jour suivante repart des compteurs complets.
+        """
+        with transaction.atomic():
+            EventTrend.objects.all().delete()
+            Event.objects.filter(trend_score__gt=0).update(trend_score=0)
@@ -1,6 +1,8 @@
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from django.db.models import F
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Event, EventCategory, EventTag, EventImage, CustomFormField
 from .serializers import (
@@ -13,9 +15,22 @@ from .serializers import (
     EventDetailSerializer
 )
 from apps.core.permissions import IsOrganizerOrReadOnly, IsOwnerOrReadOnly
+from .duplicates import DuplicateDetector
+from .recommendations import RecommendationService
+from .trending import TrendingService
+
+def category_param(request):
+    """Identifiant de catégorie du paramètre ?category= (None si absent)"""
+    category = request.query_params.get('category')
+    if not category:
+        return None
+    try:
+        return int(category)
+    except ValueError:
+        raise ValidationError({'category': 'Identifiant de catégorie invalide.'})
 
 class EventViewSet(viewsets.ModelViewSet):
-    queryset = Event.objects.all()
+    queryset = Event.objects.select_related('organizer', 'rating')
     serializer_class = EventSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOrganizerOrReadOnly]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -33,6 +48,12 @@ class EventViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(organizer=self.request.user)
     
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        # Compteur relevé par TrendingService.update
+        Event.objects.filter(pk=kwargs['pk']).update(view_count=F('view_count') + 1)
+        return response
+    
     @action(detail=True, methods=['post'])
     def upload_images(self, request, pk=None):
         event = self.get_object()
@@ -82,9 +103,67 @@ class EventViewSet(viewsets.ModelViewSet):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=True, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def duplicates(self, request, pk=None):
+        """Doublons probables de l'événement, par similarité décroissante"""
+        event = self.get_object()
+        matches = DuplicateDetector.likely_duplicates(event.pk)
+        events = Event.objects.only(
+            'id', 'title', 'slug', 'start_date', 'location_city', 'status'
+        ).in_bulk([event_id for event_id, _ in matches])
+        
+        return Response([
+            {
+                'id': str(event_id),
+                'title': events[event_id].title,
+                'slug': events[event_id].slug,
+                'start_date': events[event_id].start_date,
+                'location_city': events[event_id].location_city,
+                'status': events[event_id].status,
+                'similarity': round(similarity, 3)
+            }
+            for event_id, similarity in matches
+            if event_id in events
+        ])
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def recommended(self, request):
+        """Événements recommandés à l'utilisateur (filtrables par ville et catégorie)"""
+        try:
+            limit = max(min(int(request.query_params.get('limit', 20)), 50), 1)
+        except ValueError:
+            limit = 20
+        
+        event_ids = RecommendationService.recommend(
+            request.user,
+            limit=limit,
+            city=request.query_params.get('city'),
+            category=category_param(request)
+        )
+        events = {
+            str(event.pk): event
+            for event in Event.objects.select_related('organizer', 'rating', 'category').prefetch_related(
+                'tags', 'ticket_types'
+            ).filter(pk__in=event_ids)
+        }
+        serializer = EventListSerializer([events[event_id] for event_id in event_ids if event_id in events], many=True)
+        return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def trending(self, request):
+        """Événements tendance, paginés (filtrables par ville et catégorie)"""
+        events = TrendingService.trending(
+            city=request.query_params.get('city'),
+            category=category_param(request)
+        ).select_related('organizer', 'rating', 'category').prefetch_related('tags', 'ticket_types')
+        
+        page = self.paginate_queryset(events)
+        serializer = EventListSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+    
     @action(detail=False, methods=['get'])
     def featured(self, request):
-        featured_events = Event.objects.filter(is_featured=True, status='validated')
+        featured_events = Event.objects.select_related('organizer', 'rating').filter(is_featured=True, status='validated')
         serializer = EventListSerializer(featured_events, many=True)
         return Response(serializer.data)
     
@@ -96,7 +175,7 @@ class EventViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_401_UNAUTHORIZED
             )
         
-        events = Event.objects.filter(organizer=request.user)
+        events = Event.objects.select_related('organizer', 'rating').filter(organizer=request.user)
         serializer = EventListSerializer(events, many=True)
         return Response(serializer.data)
 
@@ -108,7 +187,7 @@ class EventCategoryViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'])
     def events(self, request, pk=None):
         category = self.get_object()
-        events = Event.objects.filter(category=category, status='validated')
+        events = Event.objects.select_related('organizer', 'rating').filter(category=category, status='validated')
         serializer = EventListSerializer(events, many=True)
         return Response(serializer.data)
 
@@ -1,31 +1,42 @@
 from django.contrib import admin
-from .models import EventFeedback, EventFlag, EventValidation
+from .models import EventFeedback, EventFlag, EventValidation, EventRating, OrganizerRating, ModerationCase
+from .moderation import ModerationService
+from .ranking import ReviewRanking
+from .ratings import RatingService
 
 class EventFeedbackAdmin(admin.ModelAdmin):
     list_display = ('id', 'event', 'user', 'rating', 'is_approved', 'is_featured', 'created_at')
     list_filter = ('rating', 'is_approved', 'is_featured')
     search_fields = ('event__title', 'user__email', 'comment')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('created_at', 'updated_at', 'rank_score')
     actions = ['approve_feedbacks', 'feature_feedbacks']
     
     def approve_feedbacks(self, request, queryset):
+        event_ids = set(queryset.values_list('event_id', flat=True))
         queryset.update(is_approved=True)
+        # La mise à jour en masse contourne les signaux: recalcul des agrégats concernés
+        RatingService.recompute(event_ids)
+        ReviewRanking.invalidate(event_ids)
     approve_feedbacks.short_description = "Approuver les commentaires sélectionnés"
     
     def feature_feedbacks(self, request, queryset):
         queryset.update(is_featured=True)
+        ReviewRanking.refresh(EventFeedback.objects.filter(pk__in=queryset.values('pk')))
     feature_feedbacks.short_description = "Mettre en avant les commentaires sélectionnés"
 
 class EventFlagAdmin(admin.ModelAdmin):
-    list_display = ('id', 'event', 'user', 'reason', 'is_resolved', 'created_at')
-    list_filter = ('reason', 'is_resolved')
+    list_display = ('id', 'event', 'user', 'reason', 'is_resolved', 'outcome', 'created_at')
+    list_filter = ('reason', 'is_resolved', 'outcome')
     search_fields = ('event__title', 'user__email', 'description')
-    readonly_fields = ('created_at',)
+    readonly_fields = ('created_at', 'trust')
     actions = ['resolve_flags']
     
     def resolve_flags(self, request, queryset):
         from django.utils import timezone
+        event_ids = set(queryset.values_list('event_id', flat=True))
         queryset.update(is_resolved=True, resolved_at=timezone.now(), resolved_by=request.user)
+        # La mise à jour en masse contourne les signaux: recalcul des dossiers concernés
+        ModerationService.rebuild(event_ids)
     resolve_flags.short_description = "Marquer les signalements comme résolus"
 
 class EventValidationAdmin(admin.ModelAdmin):
@@ -33,6 +44,27 @@ class EventValidationAdmin(admin.ModelAdmin):
     search_fields = ('event__title', 'user__email', 'notes')
     readonly_fields = ('created_at',)
 
+class RatingAggregateAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'rating_count', 'bayesian_rating', 'updated_at')
+    readonly_fields = ('rating_count', 'rating_total', 'stars_1', 'stars_2', 'stars_3', 'stars_4', 'stars_5',
+                       'bayesian_rating', 'updated_at')
+    actions = ['recompute']
+    
+    def recompute(self, request, queryset):
+        RatingService.recompute()
+        self.message_user(request, "Agrégats de notes recalculés.")
+    recompute.short_description = "Recalculer tous les agrégats de notes"
+
+class ModerationCaseAdmin(admin.ModelAdmin):
+    list_display = ('event', 'open_count', 'priority', 'first_flagged_at', 'last_flagged_at')
+    list_filter = ('is_open',)
+    search_fields = ('event__title',)
+    ordering = ('-is_open', '-priority')
+    readonly_fields = [field.name for field in ModerationCase._meta.fields]
+    
 admin.site.register(EventFeedback, EventFeedbackAdmin)
 admin.site.register(EventFlag, EventFlagAdmin)
-admin.site.register(EventValidation, EventValidationAdmin)
\ No newline at end of file
+admin.site.register(EventValidation, EventValidationAdmin)
+admin.site.register(EventRating, RatingAggregateAdmin)
+admin.site.register(OrganizerRating, RatingAggregateAdmin)
+admin.site.register(ModerationCase, ModerationCaseAdmin)
\ No newline at end of file
@@ -0,0 +1,11 @@
+# apps/feedback/apps.py
+from django.apps import AppConfig
+
+
+class FeedbackConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.feedback'
+    verbose_name = "Avis et signalements"
+
+    def ready(self):
+        import apps.feedback.signals
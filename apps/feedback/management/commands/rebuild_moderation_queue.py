@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from apps.feedback.moderation import ModerationService
+
+class Command(BaseCommand):
+    help = 'Recalcule les dossiers de la file de modération à partir des signalements non résolus'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--event', action='append', dest='events', help='Identifiant d\'événement (répétable; tous par défaut)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Nombre de dossiers écrits par requête')
+
+    def handle(self, *args, **options):
+        opened = ModerationService.rebuild(options['events'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{opened} dossier(s) de modération ouvert(s)"))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from apps.feedback.ratings import RatingService
+
+class Command(BaseCommand):
+    help = 'Recalcule les agrégats de notes des événements et des organisateurs à partir des avis approuvés'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--event', action='append', dest='events', help='Identifiant d\'événement (répétable; tous par défaut)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Nombre d\'agrégats écrits par requête')
+
+    def handle(self, *args, **options):
+        events, organizers = RatingService.recompute(options['events'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Agrégats recalculés: {events} événement(s), {organizers} organisateur(s)"
+        ))
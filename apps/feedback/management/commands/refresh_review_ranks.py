@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from apps.feedback.models import EventFeedback
+from apps.feedback.ranking import ReviewRanking
+
+class Command(BaseCommand):
+    help = 'Recalcule les scores de classement des avis (après une modification des paramètres FEEDBACK)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--event', action='append', dest='events', help='Identifiant d\'événement (répétable; tous par défaut)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Nombre d\'avis mis à jour par requête')
+
+    def handle(self, *args, **options):
+        queryset = EventFeedback.objects.all()
+        if options['events']:
+            queryset = queryset.filter(event_id__in=options['events'])
+
+        updated = ReviewRanking.refresh(queryset, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{updated} score(s) de classement mis à jour"))
@@ -0,0 +1,97 @@
+# Generated by Django 5.1.7 on 2026-10-19 06:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+
+def backfill_ratings(apps, schema_editor):
+    """Agrégats initiaux calculés à partir des avis approuvés existants"""
+    EventFeedback = apps.get_model('feedback', 'EventFeedback')
+    EventRating = apps.get_model('feedback', 'EventRating')
+    OrganizerRating = apps.get_model('feedback', 'OrganizerRating')
+    OrganizerProfile = apps.get_model('accounts', 'OrganizerProfile')
+
+    mean = float(settings.FEEDBACK.get('RATING_PRIOR_MEAN', 3.5))
+    weight = float(settings.FEEDBACK.get('RATING_PRIOR_WEIGHT', 10))
+    now = timezone.now()
+
+    def aggregates(group_by):
+        return EventFeedback.objects.filter(is_approved=True).values(group_by).order_by().annotate(
+            count=Count('id'),
+            total=Sum('rating'),
+            **{f'stars_{stars}': Count('id', filter=Q(rating=stars)) for stars in range(1, 6)}
+        )
+
+    def build(model, key, group_by, row):
+        return model(**{
+            key: row[group_by],
+            'rating_count': row['count'],
+            'rating_total': row['total'],
+            'bayesian_rating': (mean * weight + row['total']) / (weight + row['count']),
+            'updated_at': now,
+            **{f'stars_{stars}': row[f'stars_{stars}'] for stars in range(1, 6)}
+        })
+
+    EventRating.objects.bulk_create(
+        [build(EventRating, 'event_id', 'event', row) for row in aggregates('event')],
+        batch_size=1000
+    )
+    organizer_ratings = [
+        build(OrganizerRating, 'organizer_id', 'event__organizer', row) for row in aggregates('event__organizer')
+    ]
+    OrganizerRating.objects.bulk_create(organizer_ratings, batch_size=1000)
+
+    for rating in organizer_ratings:
+        OrganizerProfile.objects.filter(user_id=rating.organizer_id).update(rating=round(rating.bayesian_rating, 2))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_passwordresettoken'),
+        ('events', '0001_initial'),
+        ('feedback', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventRating',
+            fields=[
+                ('rating_count', models.PositiveIntegerField(default=0)),
+                ('rating_total', models.PositiveIntegerField(default=0)),
+                ('stars_1', models.PositiveIntegerField(default=0)),
+                ('stars_2', models.PositiveIntegerField(default=0)),
+                ('stars_3', models.PositiveIntegerField(default=0)),
+                ('stars_4', models.PositiveIntegerField(default=0)),
+                ('stars_5', models.PositiveIntegerField(default=0)),
+                ('bayesian_rating', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rating', serialize=False, to='events.event')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='OrganizerRating',
+            fields=[
+                ('rating_count', models.PositiveIntegerField(default=0)),
+                ('rating_total', models.PositiveIntegerField(default=0)),
+                ('stars_1', models.PositiveIntegerField(default=0)),
+                ('stars_2', models.PositiveIntegerField(default=0)),
+                ('stars_3', models.PositiveIntegerField(default=0)),
+                ('stars_4', models.PositiveIntegerField(default=0)),
+                ('stars_5', models.PositiveIntegerField(default=0)),
+                ('bayesian_rating', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('organizer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='organizer_rating', serialize=False, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.7 on 2026-10-19 06:15
+
+from django.conf import settings
+from django.db import migrations, models
+from apps.feedback.models import rank_score
+
+
+def backfill_rank_scores(apps, schema_editor):
+    """Score de classement des avis existants"""
+    EventFeedback = apps.get_model('feedback', 'EventFeedback')
+
+    batch = []
+    for feedback in EventFeedback.objects.only(
+        'id', 'rating', 'comment', 'is_featured', 'created_at'
+    ).iterator(chunk_size=2000):
+        feedback.rank_score = rank_score(feedback.rating, feedback.comment, feedback.is_featured, feedback.created_at)
+        batch.append(feedback)
+        if len(batch) >= 1000:
+            EventFeedback.objects.bulk_update(batch, ['rank_score'])
+            batch = []
+
+    if batch:
+        EventFeedback.objects.bulk_update(batch, ['rank_score'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0001_initial'),
+        ('feedback', '0002_rating_aggregates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventfeedback',
+            name='rank_score',
+            field=models.FloatField(default=0.0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='eventfeedback',
+            index=models.Index(fields=['event', 'is_approved', '-rank_score', '-id'], name='feedback_event_rank_idx'),
+        ),
+        migrations.RunPython(backfill_rank_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.1.7 on 2026-10-19 06:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0001_initial'),
+        ('feedback', '0003_feedback_rank_score'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModerationCase',
+            fields=[
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='moderation_case', serialize=False, to='events.event')),
+                ('is_open', models.BooleanField(default=False)),
+                ('open_count', models.PositiveIntegerField(default=0)),
+                ('inappropriate_count', models.PositiveIntegerField(default=0)),
+                ('misleading_count', models.PositiveIntegerField(default=0)),
+                ('scam_count', models.PositiveIntegerField(default=0)),
+                ('duplicate_count', models.PositiveIntegerField(default=0)),
+                ('other_count', models.PositiveIntegerField(default=0)),
+                ('velocity_log', models.FloatField(default=0.0)),
+                ('priority', models.FloatField(default=0.0)),
+                ('first_flagged_at', models.DateTimeField(blank=True, null=True)),
+                ('last_flagged_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='eventflag',
+            name='outcome',
+            field=models.CharField(blank=True, choices=[('upheld', 'Fondé'), ('dismissed', 'Rejeté')], max_length=20),
+        ),
+        migrations.AddField(
+            model_name='eventflag',
+            name='trust',
+            field=models.FloatField(default=1.0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='eventflag',
+            index=models.Index(fields=['event', 'is_resolved'], name='flag_event_resolved_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventflag',
+            index=models.Index(fields=['user', 'is_resolved'], name='flag_user_resolved_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='moderationcase',
+            index=models.Index(fields=['is_open', '-priority', 'event'], name='moderation_queue_idx'),
+        ),
+    ]
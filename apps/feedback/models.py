@@ -1,7 +1,27 @@
+import math
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 from apps.accounts.models import User
 from apps.events.models import Event
 
+def rank_score(rating, comment, is_featured, created_at):
+    """
+    Score de classement d'un avis.
+    
+    log(qualité) + t·ln(2)/demi-vie: trier par ce score revient à trier par
+    qualité × 2^(-âge/demi-vie) à n'importe quel instant, sans recalcul
+    périodique. La qualité combine la note, la longueur du commentaire et la
+    mise en avant.
+    """
+    config = settings.FEEDBACK
+    length_cap = config.get('RANKING_COMMENT_LENGTH', 280)
+    quality = rating * (1 + config.get('RANKING_COMMENT_WEIGHT', 1.0) * min(len(comment.strip()), length_cap) / length_cap)
+    if is_featured:
+        quality *= config.get('RANKING_FEATURED_BOOST', 3.0)
+    half_life = config.get('RANKING_HALF_LIFE_DAYS', 30) * 86400
+    return math.log(quality) + created_at.timestamp() * math.log(2) / half_life
+
 class EventFeedback(models.Model):
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='feedbacks')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='feedbacks')
@@ -18,11 +38,23 @@ class EventFeedback(models.Model):
     is_approved = models.BooleanField(default=True)
     is_featured = models.BooleanField(default=False)
     
+    # Classement des meilleurs avis (voir rank_score)
+    rank_score = models.FloatField(default=0.0, editable=False)
+    
     class Meta:
         unique_together = ('event', 'user')
+        indexes = [
+            models.Index(fields=['event', 'is_approved', '-rank_score', '-id'], name='feedback_event_rank_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.event.title} - {self.rating}★"
+    
+    def save(self, *args, **kwargs):
+        self.rank_score = rank_score(self.rating, self.comment, self.is_featured, self.created_at or timezone.now())
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'rank_score'}
+        super().save(*args, **kwargs)
 
 class EventFlag(models.Model):
     FLAG_REASON_CHOICES = (
@@ -39,14 +71,27 @@ class EventFlag(models.Model):
     reason = models.CharField(max_length=20, choices=FLAG_REASON_CHOICES)
     description = models.TextField(blank=True)
     
+    OUTCOME_CHOICES = (
+        ('upheld', 'Fondé'),
+        ('dismissed', 'Rejeté'),
+    )
+    
     created_at = models.DateTimeField(auto_now_add=True)
     is_resolved = models.BooleanField(default=False)
     resolved_at = models.DateTimeField(null=True, blank=True)
     resolved_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='resolved_flags')
     resolution_notes = models.TextField(blank=True)
+    outcome = models.CharField(max_length=20, choices=OUTCOME_CHOICES, blank=True)
+    
+    # Confiance accordée à l'auteur lors du signalement (voir ModerationService.reporter_trust)
+    trust = models.FloatField(default=1.0, editable=False)
     
     class Meta:
         unique_together = ('event', 'user')
+        indexes = [
+            models.Index(fields=['event', 'is_resolved'], name='flag_event_resolved_idx'),
+            models.Index(fields=['user', 'is_resolved'], name='flag_user_resolved_idx'),
+        ]
     
     def __str__(self):
         return f"Signalement pour {self.event.title} - {self.get_reason_display()}"
@@ -62,4 +107,86 @@ class EventValidation(models.Model):
         unique_together = ('event', 'user')
     
     def __str__(self):
-        return f"Validation pour {self.event.title} par {self.user.username}"
\ No newline at end of file
+        return f"Validation pour {self.event.title} par {self.user.username}"
+
+class RatingAggregate(models.Model):
+    """
+    Agrégats des notes approuvées (nombre, somme, répartition par étoiles et
+    moyenne bayésienne), tenus à jour à chaque écriture sur EventFeedback.
+    """
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_total = models.PositiveIntegerField(default=0)
+    stars_1 = models.PositiveIntegerField(default=0)
+    stars_2 = models.PositiveIntegerField(default=0)
+    stars_3 = models.PositiveIntegerField(default=0)
+    stars_4 = models.PositiveIntegerField(default=0)
+    stars_5 = models.PositiveIntegerField(default=0)
+    bayesian_rating = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        abstract = True
+    
+    @property
+    def average_rating(self):
+        return self.rating_total / self.rating_count if self.rating_count else None
+    
+    @property
+    def histogram(self):
+        return {stars: getattr(self, f'stars_{stars}') for stars in range(1, 6)}
+    
+    def summary(self):
+        """Représentation exposée par l'API"""
+        return {
+            'count': self.rating_count,
+            'average': round(self.average_rating, 2) if self.rating_count else None,
+            'bayesian': round(self.bayesian_rating, 2),
+            'histogram': self.histogram,
+        }
+
+class EventRating(RatingAggregate):
+    event = models.OneToOneField(Event, on_delete=models.CASCADE, primary_key=True, related_name='rating')
+    
+    def __str__(self):
+        return f"Notes de {self.event_id} ({self.rating_count})"
+
+class OrganizerRating(RatingAggregate):
+    organizer = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='organizer_rating')
+    
+    def __str__(self):
+        return f"Notes de l'organisateur {self.organizer_id} ({self.rating_count})"
+
+class ModerationCase(models.Model):
+    """
+    Signalements non résolus d'un événement, regroupés pour la file de
+    modération et tenus à jour à chaque signalement (voir ModerationService).
+    """
+    event = models.OneToOneField(Event, on_delete=models.CASCADE, primary_key=True, related_name='moderation_case')
+    
+    is_open = models.BooleanField(default=False)
+    open_count = models.PositiveIntegerField(default=0)
+    inappropriate_count = models.PositiveIntegerField(default=0)
+    misleading_count = models.PositiveIntegerField(default=0)
+    scam_count = models.PositiveIntegerField(default=0)
+    duplicate_count = models.PositiveIntegerField(default=0)
+    other_count = models.PositiveIntegerField(default=0)
+    
+    # log(Σ confiance × e^(λ·t)) des signalements ouverts: vitesse de signalement pondérée
+    velocity_log = models.FloatField(default=0.0)
+    priority = models.FloatField(default=0.0)
+    
+    first_flagged_at = models.DateTimeField(null=True, blank=True)
+    last_flagged_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_open', '-priority', 'event'], name='moderation_queue_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Modération de {self.event_id} ({self.open_count} signalement(s))"
+    
+    @property
+    def reason_counts(self):
+        return {reason: getattr(self, f'{reason}_count') for reason, _ in EventFlag.FLAG_REASON_CHOICES}
@@ -0,0 +1,171 @@
+# feedback/moderation.py
+import math
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from apps.accounts.models import User
+from apps.events.models import Event
+from .models import EventFlag, ModerationCase
+
+class ModerationService:
+    """
+    File de modération des signalements, regroupés par événement.
+
+    La priorité d'un dossier combine la vitesse de signalement pondérée par la
+    confiance accordée aux auteurs, log(Σ confiance × e^(λ·t)), et la
+    popularité de l'événement. Comme pour le classement des avis, trier par
+    cette valeur revient à trier par la somme des poids décroissant avec l'âge
+    des signalements: elle n'est mise à jour qu'à l'arrivée d'un signalement.
+    """
+
+    # État d'un dossier sans signalement ouvert
+    CLOSED = dict(
+        is_open=False,
+        open_count=0,
+        velocity_log=0.0,
+        priority=0.0,
+        first_flagged_at=None,
+        last_flagged_at=None,
+        **{f'{reason}_count': 0 for reason, _ in EventFlag.FLAG_REASON_CHOICES}
+    )
+
+    @staticmethod
+    def _decay_rate():
+        return math.log(2) / (settings.FEEDBACK.get('MODERATION_VELOCITY_HALF_LIFE_HOURS', 6) * 3600)
+
+    @staticmethod
+    def _flag_weight(trust, created_at):
+        return math.log(trust) + ModerationService._decay_rate() * created_at.timestamp()
+
+    @staticmethod
+    def _log_add(a, b):
+        """log(e^a + e^b) sans dépassement"""
+        high, low = max(a, b), min(a, b)
+        return high + math.log1p(math.exp(low - high))
+
+    @staticmethod
+    def _popularity(registration_count, view_count):
+        """Facteur de popularité (>= 1) de l'événement signalé"""
+        return math.log(math.e + registration_count + view_count / 100)
+
+    @staticmethod
+    def reporter_trust(user_id):
+        """
+        Confiance accordée à un auteur de signalements: proportion lissée de ses
+        signalements jugés fondés (1 pour un nouvel utilisateur, entre 0 et 2),
+        majorée pour les utilisateurs vérifiés.
+        """
+        history = User.objects.filter(pk=user_id).annotate(
+            upheld=Count('flags', filter=Q(flags__outcome='upheld')),
+            dismissed=Count('flags', filter=Q(flags__outcome='dismissed'))
+        ).values('is_verified', 'upheld', 'dismissed').first()
+        if history is None:
+            return 1.0
+
+        trust = 2 * (1 + history['upheld']) / (2 + history['upheld'] + history['dismissed'])
+        if history['is_verified']:
+            trust *= settings.FEEDBACK.get('MODERATION_VERIFIED_REPORTER_BOOST', 1.5)
+        return trust
+
+    @staticmethod
+    def flag_created(flag):
+        """Ajoute un nouveau signalement au dossier de son événement"""
+        if flag.is_resolved:
+            return
+
+        with transaction.atomic():
+            ModerationCase.objects.get_or_create(event_id=flag.event_id)
+            case = ModerationCase.objects.select_for_update().get(pk=flag.event_id)
+            event = Event.objects.filter(pk=flag.event_id).values('registration_count', 'view_count').first()
+
+            weight = ModerationService._flag_weight(flag.trust, flag.created_at)
+            if case.is_open:
+                case.velocity_log = ModerationService._log_add(case.velocity_log, weight)
+            else:
+                for field, value in ModerationService.CLOSED.items():
+                    setattr(case, field, value)
+                case.is_open = True
+                case.velocity_log = weight
+                case.first_flagged_at = flag.created_at
+
+            case.open_count += 1
+            setattr(case, f'{flag.reason}_count', getattr(case, f'{flag.reason}_count') + 1)
+            case.last_flagged_at = flag.created_at
+            case.priority = case.velocity_log + math.log(
+                ModerationService._popularity(event['registration_count'], event['view_count'])
+            )
+            case.save()
+
+    @staticmethod
+    def rebuild(event_ids=None, batch_size=1000):
+        """
+        Recalcule les dossiers des événements indiqués (tous par défaut) à
+        partir de leurs signalements non résolus. Retourne le nombre de dossiers
+        ouverts.
+        """
+        flags = EventFlag.objects.filter(is_resolved=False)
+        scope = ModerationCase.objects.filter(is_open=True)
+        if event_ids is not None:
+            event_ids = list(event_ids)
+            flags = flags.filter(event_id__in=event_ids)
+            scope = scope.filter(event_id__in=event_ids)
+
+        cases = {}
+        for event_id, reason, trust, created_at in flags.values_list(
+            'event_id', 'reason', 'trust', 'created_at'
+        ).order_by().iterator(chunk_size=5000):
+            weight = ModerationService._flag_weight(trust, created_at)
+            case = cases.get(event_id)
+            if case is None:
+                case = cases[event_id] = ModerationCase(
+                    event_id=event_id,
+                    **dict(ModerationService.CLOSED, is_open=True, velocity_log=weight,
+                           first_flagged_at=created_at, last_flagged_at=created_at)
+                )
+            else:
+                case.velocity_log = ModerationService._log_add(case.velocity_log, weight)
+                case.first_flagged_at = min(case.first_flagged_at, created_at)
+                case.last_flagged_at = max(case.last_flagged_at, created_at)
+            case.open_count += 1
+            setattr(case, f'{reason}_count', getattr(case, f'{reason}_count') + 1)
+
+        event_list = list(cases)
+        for start in range(0, len(event_list), batch_size):
+            for event_id, registration_count, view_count in Event.objects.filter(
+                pk__in=event_list[start:start + batch_size]
+            ).values_list('pk', 'registration_count', 'view_count'):
+                case = cases[event_id]
+                case.priority = case.velocity_log + math.log(
+                    ModerationService._popularity(registration_count, view_count)
+                )
+
+        now = timezone.now()
+        for case in cases.values():
+            case.updated_at = now
+
+        with transaction.atomic():
+            scope.update(updated_at=now, **ModerationService.CLOSED)
+            ModerationCase.objects.bulk_create(
+                cases.values(),
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=['event'],
+                update_fields=[*ModerationService.CLOSED, 'updated_at']
+            )
+        return len(cases)
+
+    @staticmethod
+    def resolve_event(event_id, resolved_by, resolution_notes='', outcome=''):
+        """Résout en une requête tous les signalements ouverts d'un événement et ferme son dossier"""
+        now = timezone.now()
+        with transaction.atomic():
+            resolved = EventFlag.objects.filter(event_id=event_id, is_resolved=False).update(
+                is_resolved=True,
+                resolved_at=now,
+                resolved_by=resolved_by,
+                resolution_notes=resolution_notes,
+                outcome=outcome
+            )
+            ModerationCase.objects.filter(pk=event_id).update(updated_at=now, **ModerationService.CLOSED)
+        return resolved
@@ -0,0 +1,80 @@
+# feedback/ranking.py
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from .models import EventFeedback, rank_score
+
+class ReviewRanking:
+    """
+    Meilleurs avis par événement.
+
+    Le score de chaque avis est calculé à l'enregistrement (EventFeedback.save)
+    et indexé avec l'événement, ce qui permet de paginer dans l'ordre du
+    classement; les N premiers avis de chaque événement sont mis en cache et
+    invalidés à chaque modification d'un avis de l'événement.
+    """
+
+    ORDERING = ('-rank_score', '-id')
+
+    @staticmethod
+    def _cache_key(event_id):
+        return f"top_reviews:{event_id}"
+
+    @staticmethod
+    def ranked(queryset):
+        """Avis approuvés dans l'ordre du classement (parcours de l'index)"""
+        return queryset.filter(is_approved=True).order_by(*ReviewRanking.ORDERING)
+
+    @staticmethod
+    def top(event_id):
+        """Représentation des meilleurs avis approuvés d'un événement"""
+        from .serializers import EventFeedbackSerializer
+
+        cache_key = ReviewRanking._cache_key(event_id)
+        data = cache.get(cache_key)
+        if data is None:
+            feedbacks = ReviewRanking.ranked(
+                EventFeedbackSerializer.setup_queryset(EventFeedback.objects.filter(event_id=event_id))
+            )[:settings.FEEDBACK.get('TOP_REVIEWS_SIZE', 10)]
+            data = EventFeedbackSerializer(feedbacks, many=True).data
+            cache.set(cache_key, data, settings.FEEDBACK.get('TOP_REVIEWS_CACHE_TIMEOUT', 600))
+        return data
+
+    @staticmethod
+    def invalidate(event_ids):
+        """Supprime les listes en cache après la validation de la transaction"""
+        keys = [ReviewRanking._cache_key(event_id) for event_id in set(event_ids)]
+        if keys:
+            transaction.on_commit(lambda: cache.delete_many(keys))
+
+    @staticmethod
+    def refresh(queryset=None, batch_size=1000):
+        """
+        Recalcule les scores des avis (tous par défaut), par exemple après une
+        mise à jour en masse ou un changement des paramètres de classement.
+        Retourne le nombre d'avis mis à jour.
+        """
+        if queryset is None:
+            queryset = EventFeedback.objects.all()
+
+        updated = 0
+        event_ids = set()
+        batch = []
+        for feedback in queryset.only(
+            'id', 'event', 'rating', 'comment', 'is_featured', 'created_at', 'rank_score'
+        ).iterator(chunk_size=batch_size):
+            score = rank_score(feedback.rating, feedback.comment, feedback.is_featured, feedback.created_at)
+            if score == feedback.rank_score:
+                continue
+            feedback.rank_score = score
+            batch.append(feedback)
+            event_ids.add(feedback.event_id)
+            if len(batch) >= batch_size:
+                updated += EventFeedback.objects.bulk_update(batch, ['rank_score'])
+                batch = []
+
+        if batch:
+            updated += EventFeedback.objects.bulk_update(batch, ['rank_score'])
+
+        ReviewRanking.invalidate(event_ids)
+        return updated
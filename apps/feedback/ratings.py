@@ -0,0 +1,179 @@
+# feedback/ratings.py
+from collections import defaultdict
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, FloatField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+from apps.accounts.models import OrganizerProfile
+from apps.events.models import Event
+from .models import EventFeedback, EventRating, OrganizerRating
+
+class RatingService:
+    """
+    Maintien des agrégats de notes par événement et par organisateur.
+
+    Seuls les avis approuvés sont comptés. Les écritures unitaires appliquent
+    des variations (F()) aux agrégats; les modifications en masse qui
+    contournent les signaux (queryset.update) passent par recompute.
+    """
+
+    @staticmethod
+    def prior():
+        """(note a priori, poids a priori) de la moyenne bayésienne"""
+        return (
+            float(settings.FEEDBACK.get('RATING_PRIOR_MEAN', 3.5)),
+            float(settings.FEEDBACK.get('RATING_PRIOR_WEIGHT', 10))
+        )
+
+    @staticmethod
+    def bayesian(count, total):
+        mean, weight = RatingService.prior()
+        return (mean * weight + total) / (weight + count)
+
+    @staticmethod
+    def _updates(changes):
+        """Variations des champs d'agrégat pour une liste de (note, +1/-1)"""
+        deltas = defaultdict(int)
+        for rating, sign in changes:
+            deltas['rating_count'] += sign
+            deltas['rating_total'] += sign * rating
+            deltas[f'stars_{rating}'] += sign
+
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return None
+
+        mean, weight = RatingService.prior()
+        # Les expressions SET sont évaluées sur les valeurs précédentes de la ligne
+        updates = {field: F(field) + delta for field, delta in deltas.items()}
+        updates['bayesian_rating'] = ExpressionWrapper(
+            (Cast(F('rating_total'), FloatField()) + Value(deltas.get('rating_total', 0) + mean * weight))
+            / (Cast(F('rating_count'), FloatField()) + Value(deltas.get('rating_count', 0) + weight)),
+            output_field=FloatField()
+        )
+        updates['updated_at'] = timezone.now()
+        return updates, any(delta > 0 for delta in deltas.values())
+
+    @staticmethod
+    def _apply(model, key, pk, changes):
+        result = RatingService._updates(changes)
+        if result is None:
+            return False
+        updates, creates = result
+
+        # Une ligne n'est créée que pour un ajout: lors d'une suppression en
+        # cascade, l'agrégat peut déjà avoir été supprimé avec son événement
+        if creates:
+            model.objects.get_or_create(**{key: pk})
+        return model.objects.filter(pk=pk).update(**updates) > 0
+
+    @staticmethod
+    def apply(event_id, changes, organizer_id=None):
+        """
+        Applique des changements [(note, +1 ou -1)] aux agrégats d'un événement
+        et de son organisateur.
+        """
+        if not changes:
+            return
+        if organizer_id is None:
+            organizer_id = Event.objects.filter(pk=event_id).values_list('organizer_id', flat=True).first()
+
+        with transaction.atomic():
+            RatingService._apply(EventRating, 'event_id', event_id, changes)
+            if organizer_id is not None and RatingService._apply(OrganizerRating, 'organizer_id', organizer_id, changes):
+                RatingService._sync_profiles(OrganizerProfile.objects.filter(user_id=organizer_id))
+
+    @staticmethod
+    def _sync_profiles(profiles):
+        """Reporte la moyenne bayésienne sur OrganizerProfile.rating (0 sans avis approuvé)"""
+        rating = OrganizerRating.objects.filter(
+            organizer=OuterRef('user'),
+            rating_count__gt=0
+        ).values('bayesian_rating')[:1]
+        profiles.update(rating=Coalesce(
+            Cast(Subquery(rating), DecimalField(max_digits=3, decimal_places=2)),
+            Value(Decimal('0'))
+        ))
+
+    @staticmethod
+    def _aggregate(feedbacks, group_by):
+        """Agrégats exacts des avis approuvés regroupés par group_by"""
+        return feedbacks.filter(is_approved=True).values(group_by).order_by().annotate(
+            count=Count('id'),
+            total=Sum('rating'),
+            **{f'stars_{stars}': Count('id', filter=Q(rating=stars)) for stars in range(1, 6)}
+        )
+
+    @staticmethod
+    def _rebuild(model, key, scope, rows, batch_size):
+        """Remet les agrégats de scope à zéro puis écrit les valeurs recalculées"""
+        now = timezone.now()
+        mean, _ = RatingService.prior()
+        scope.update(
+            rating_count=0, rating_total=0, stars_1=0, stars_2=0, stars_3=0, stars_4=0, stars_5=0,
+            bayesian_rating=mean, updated_at=now
+        )
+
+        fields = ['rating_count', 'rating_total', 'stars_1', 'stars_2', 'stars_3', 'stars_4', 'stars_5',
+                  'bayesian_rating', 'updated_at']
+        objects = [
+            model(**{
+                key: pk,
+                'rating_count': row['count'],
+                'rating_total': row['total'],
+                'bayesian_rating': RatingService.bayesian(row['count'], row['total']),
+                'updated_at': now,
+                **{f'stars_{stars}': row[f'stars_{stars}'] for stars in range(1, 6)}
+            })
+            for pk, row in rows
+        ]
+        model.objects.bulk_create(
+            objects,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=[key.removesuffix('_id')],
+            update_fields=fields
+        )
+        return len(objects)
+
+    @staticmethod
+    def recompute(event_ids=None, batch_size=1000):
+        """
+        Recalcule les agrégats exacts des événements indiqués (tous par défaut)
+        et de leurs organisateurs. Retourne (événements, organisateurs) recalculés.
+        """
+        feedbacks = EventFeedback.objects.all()
+        event_scope = EventRating.objects.all()
+        organizer_ids = None
+
+        if event_ids is not None:
+            event_ids = list(event_ids)
+            organizer_ids = list(
+                Event.objects.filter(pk__in=event_ids).values_list('organizer_id', flat=True).distinct()
+            )
+            feedbacks = feedbacks.filter(event_id__in=event_ids)
+            event_scope = event_scope.filter(event_id__in=event_ids)
+
+        organizer_feedbacks = EventFeedback.objects.all()
+        organizer_scope = OrganizerRating.objects.all()
+        profiles = OrganizerProfile.objects.all()
+        if organizer_ids is not None:
+            organizer_feedbacks = organizer_feedbacks.filter(event__organizer_id__in=organizer_ids)
+            organizer_scope = organizer_scope.filter(organizer_id__in=organizer_ids)
+            profiles = profiles.filter(user_id__in=organizer_ids)
+
+        with transaction.atomic():
+            events = RatingService._rebuild(
+                EventRating, 'event_id', event_scope,
+                ((row['event'], row) for row in RatingService._aggregate(feedbacks, 'event')),
+                batch_size
+            )
+            organizers = RatingService._rebuild(
+                OrganizerRating, 'organizer_id', organizer_scope,
+                ((row['event__organizer'], row) for row in RatingService._aggregate(organizer_feedbacks, 'event__organizer')),
+                batch_size
+            )
+            RatingService._sync_profiles(profiles)
+        return events, organizers
@@ -1,10 +1,30 @@
 from rest_framework import serializers
-from .models import EventFeedback, EventFlag, EventValidation
+from .models import EventFeedback, EventFlag, EventValidation, ModerationCase
 from apps.events.serializers import EventListSerializer
 
+class UserNameField(serializers.ReadOnlyField):
+    """Nom complet de l'utilisateur source, ou son nom d'utilisateur"""
+    
+    def to_representation(self, user):
+        return user.get_full_name() or user.username
+
+class FeedbackEventSerializer(serializers.Serializer):
+    title = serializers.CharField()
+    slug = serializers.CharField()
+    start_date = serializers.DateTimeField()
+
+class FlagEventSerializer(serializers.Serializer):
+    title = serializers.CharField()
+    slug = serializers.CharField()
+    organizer = serializers.CharField(source='organizer.username')
+
+class ValidationEventSerializer(serializers.Serializer):
+    title = serializers.CharField()
+    slug = serializers.CharField()
+
 class EventFeedbackSerializer(serializers.ModelSerializer):
-    user_name = serializers.SerializerMethodField()
-    event_details = serializers.SerializerMethodField()
+    user_name = UserNameField(source='user')
+    event_details = FeedbackEventSerializer(source='event', read_only=True)
     
     class Meta:
         model = EventFeedback
@@ -14,41 +34,59 @@ class EventFeedbackSerializer(serializers.ModelSerializer):
         read_only_fields = ['user', 'created_at', 'updated_at', 'is_approved', 
                            'is_featured']
     
-    def get_user_name(self, obj):
-        return f"{obj.user.first_name} {obj.user.last_name}".strip() or obj.user.username
-    
-    def get_event_details(self, obj):
-        return {
-            'title': obj.event.title,
-            'slug': obj.event.slug,
-            'start_date': obj.event.start_date
-        }
+    @staticmethod
+    def setup_queryset(queryset):
+        """Jointures et colonnes nécessaires à la sérialisation"""
+        return queryset.select_related('user', 'event').only(
+            'id', 'event', 'user', 'rating', 'comment', 'created_at', 'updated_at',
+            'is_approved', 'is_featured',
+            'user__first_name', 'user__last_name', 'user__username',
+            'event__title', 'event__slug', 'event__start_date'
+        )
 
 class EventFlagSerializer(serializers.ModelSerializer):
-    user_name = serializers.SerializerMethodField()
-    event_details = serializers.SerializerMethodField()
+    user_name = UserNameField(source='user')
+    event_details = FlagEventSerializer(source='event', read_only=True)
     
     class Meta:
         model = EventFlag
         fields = ['id', 'event', 'user', 'user_name', 'reason', 'description', 
                   'created_at', 'is_resolved', 'resolved_at', 'resolved_by', 
-                  'resolution_notes', 'event_details']
+                  'resolution_notes', 'outcome', 'event_details']
         read_only_fields = ['user', 'created_at', 'is_resolved', 'resolved_at', 
-                           'resolved_by', 'resolution_notes']
+                           'resolved_by', 'resolution_notes', 'outcome']
     
-    def get_user_name(self, obj):
-        return f"{obj.user.first_name} {obj.user.last_name}".strip() or obj.user.username
+    @staticmethod
+    def setup_queryset(queryset):
+        """Jointures et colonnes nécessaires à la sérialisation"""
+        return queryset.select_related('user', 'event__organizer').only(
+            'id', 'event', 'user', 'reason', 'description', 'created_at', 'is_resolved',
+            'resolved_at', 'resolved_by', 'resolution_notes', 'outcome',
+            'user__first_name', 'user__last_name', 'user__username',
+            'event__title', 'event__slug', 'event__organizer__username'
+        )
+
+class ModerationCaseSerializer(serializers.ModelSerializer):
+    event_details = FlagEventSerializer(source='event', read_only=True)
+    reason_counts = serializers.ReadOnlyField()
     
-    def get_event_details(self, obj):
-        return {
-            'title': obj.event.title,
-            'slug': obj.event.slug,
-            'organizer': obj.event.organizer.username
-        }
+    class Meta:
+        model = ModerationCase
+        fields = ['event', 'event_details', 'open_count', 'reason_counts', 'priority',
+                  'first_flagged_at', 'last_flagged_at']
+    
+    @staticmethod
+    def setup_queryset(queryset):
+        """Jointures et colonnes nécessaires à la sérialisation"""
+        return queryset.select_related('event__organizer').only(
+            'event', 'open_count', 'inappropriate_count', 'misleading_count', 'scam_count',
+            'duplicate_count', 'other_count', 'priority', 'first_flagged_at', 'last_flagged_at',
+            'event__title', 'event__slug', 'event__organizer__username'
+        )
 
 class EventValidationSerializer(serializers.ModelSerializer):
-    user_name = serializers.SerializerMethodField()
-    event_details = serializers.SerializerMethodField()
+    user_name = UserNameField(source='user')
+    event_details = ValidationEventSerializer(source='event', read_only=True)
     
     class Meta:
         model = EventValidation
@@ -56,11 +94,11 @@ class EventValidationSerializer(serializers.ModelSerializer):
                   'event_details']
         read_only_fields = ['user', 'created_at']
     
-    def get_user_name(self, obj):
-        return f"{obj.user.first_name} {obj.user.last_name}".strip() or obj.user.username
-    
-    def get_event_details(self, obj):
-        return {
-            'title': obj.event.title,
-            'slug': obj.event.slug
-        }
\ No newline at end of file
+    @staticmethod
+    def setup_queryset(queryset):
+        """Jointures et colonnes nécessaires à la sérialisation"""
+        return queryset.select_related('user', 'event').only(
+            'id', 'event', 'user', 'created_at', 'notes',
+            'user__first_name', 'user__last_name', 'user__username',
+            'event__title', 'event__slug'
+        )
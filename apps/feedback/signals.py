@@ -0,0 +1,66 @@
+# feedback/signals.py
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import EventFeedback, EventFlag
+from .moderation import ModerationService
+from .ranking import ReviewRanking
+from .ratings import RatingService
+
+@receiver(pre_save, sender=EventFeedback)
+def remember_feedback_rating(sender, instance, raw=False, **kwargs):
+    """Conserve l'état enregistré de l'avis pour calculer la variation des agrégats"""
+    instance._previous_rating = None
+    if raw or instance.pk is None:
+        return
+    instance._previous_rating = EventFeedback.objects.filter(pk=instance.pk).values(
+        'event_id', 'rating', 'is_approved'
+    ).first()
+
+@receiver(post_save, sender=EventFeedback)
+def update_rating_aggregates(sender, instance, created, raw=False, **kwargs):
+    """Applique la création, la modification ou la modération d'un avis aux agrégats et aux meilleurs avis"""
+    if raw:
+        return
+    
+    previous = getattr(instance, '_previous_rating', None)
+    changes = {}
+    if previous and previous['is_approved']:
+        changes.setdefault(previous['event_id'], []).append((previous['rating'], -1))
+    if instance.is_approved:
+        changes.setdefault(instance.event_id, []).append((instance.rating, 1))
+    
+    for event_id, event_changes in changes.items():
+        # Un avis approuvé dont ni la note ni l'événement ne changent est sans effet
+        if sorted(event_changes) != [(instance.rating, -1), (instance.rating, 1)]:
+            RatingService.apply(event_id, event_changes)
+    
+    ReviewRanking.invalidate([instance.event_id] + ([previous['event_id']] if previous else []))
+
+@receiver(post_delete, sender=EventFeedback)
+def remove_deleted_rating(sender, instance, **kwargs):
+    """Retire l'avis supprimé des agrégats et des meilleurs avis"""
+    if instance.is_approved:
+        RatingService.apply(instance.event_id, [(instance.rating, -1)])
+        ReviewRanking.invalidate([instance.event_id])
+
+@receiver(pre_save, sender=EventFlag)
+def set_reporter_trust(sender, instance, raw=False, **kwargs):
+    """Fixe la confiance accordée à l'auteur au moment du signalement"""
+    if not raw and instance.pk is None:
+        instance.trust = ModerationService.reporter_trust(instance.user_id)
+
+@receiver(post_save, sender=EventFlag)
+def update_moderation_case(sender, instance, created, raw=False, **kwargs):
+    """Ajoute le signalement à la file de modération, ou recalcule le dossier après modification"""
+    if raw:
+        return
+    if created:
+        ModerationService.flag_created(instance)
+    else:
+        ModerationService.rebuild([instance.event_id])
+
+@receiver(post_delete, sender=EventFlag)
+def remove_deleted_flag(sender, instance, **kwargs):
+    """Retire le signalement supprimé de la file de modération"""
+    if not instance.is_resolved:
+        ModerationService.rebuild([instance.event_id])
@@ -0,0 +1,384 @@
+import warnings
+from datetime import timedelta
+from django.core.cache import cache
+from django.core.paginator import UnorderedObjectListWarning
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.accounts.models import OrganizerProfile, User
+from apps.core.testing import query_budget
+from apps.events.models import Event
+from .models import EventFeedback, EventFlag, EventRating, EventValidation, ModerationCase, OrganizerRating
+from .moderation import ModerationService
+from .ranking import ReviewRanking
+from .ratings import RatingService
+
+class FeedbackQueryBudgetTests(TestCase):
+    """Nombre de requêtes constant par page, quel que soit le nombre de lignes"""
+
+    rows = 25
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.admin = User.objects.create_user(email='admin@example.com', username='admin', password='x', is_staff=True)
+        cls.users = [
+            User.objects.create_user(
+                email=f'user{index}@example.com', username=f'user{index}', password='x',
+                first_name=f'Prénom{index}', role='organizer'
+            )
+            for index in range(cls.rows)
+        ]
+        cls.events = [
+            Event.objects.create(
+                title=f'Événement {index}', description='Description', organizer=user, event_type='billetterie',
+                start_date=now - timedelta(days=2), end_date=now - timedelta(days=1),
+                location_name='Salle', location_address='Adresse', location_city='Douala', status='published'
+            )
+            for index, user in enumerate(cls.users)
+        ]
+        for index, user in enumerate(cls.users):
+            event = cls.events[index]
+            other = cls.events[(index + 1) % cls.rows]
+            EventFeedback.objects.create(event=event, user=user, rating=index % 5 + 1, comment='Très bien')
+            EventFeedback.objects.create(event=other, user=user, rating=3, comment='Correct')
+            EventFlag.objects.create(event=other, user=user, reason='misleading', description='Description')
+            EventValidation.objects.create(event=other, user=user, notes='Valide')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    @query_budget(2)
+    def test_feedback_list(self):
+        data = self.get('/api/feedbacks/')
+        self.assertEqual(len(data['results']), 20)
+        self.assertTrue(all(item['user_name'].startswith('Prénom') for item in data['results']))
+        self.assertTrue(all(item['event_details']['title'] for item in data['results']))
+
+    @query_budget(2)
+    def test_feedback_list_for_event(self):
+        data = self.get('/api/feedbacks/', event=str(self.events[0].pk))
+        self.assertEqual(data['count'], 2)
+
+    @query_budget(1)
+    def test_my_feedback(self):
+        self.client.force_authenticate(self.users[0])
+        self.assertEqual(len(self.get('/api/feedbacks/my_feedback/')), 2)
+
+    @query_budget(2)
+    def test_flag_list(self):
+        data = self.get('/api/flags/')
+        self.assertEqual(data['count'], self.rows)
+        self.assertTrue(all(item['event_details']['organizer'].startswith('user') for item in data['results']))
+
+    @query_budget(2)
+    def test_unresolved_flags(self):
+        data = self.get('/api/flags/unresolved/')
+        self.assertEqual(data['count'], self.rows)
+
+    @query_budget(2)
+    def test_moderation_queue(self):
+        data = self.get('/api/flags/queue/')
+        self.assertEqual(data['count'], self.rows)
+
+    @query_budget(2)
+    def test_validation_list(self):
+        data = self.get('/api/validations/')
+        self.assertEqual(data['count'], self.rows)
+        self.assertTrue(all(item['user_name'] for item in data['results']))
+
+class ReviewRankingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        organizer = User.objects.create_user(email='org@example.com', username='org', password='x', role='organizer')
+        self.event, self.other_event = [
+            Event.objects.create(
+                title=title, description='Description', organizer=organizer, event_type='billetterie',
+                start_date=now - timedelta(days=2), end_date=now - timedelta(days=1),
+                location_name='Salle', location_address='Adresse', location_city='Douala', status='published'
+            )
+            for title in ('Concert', 'Festival')
+        ]
+        self.users = [
+            User.objects.create_user(email=f'user{index}@example.com', username=f'user{index}', password='x')
+            for index in range(5)
+        ]
+        self.client = APIClient()
+
+    def review(self, user, rating, comment='', **kwargs):
+        return EventFeedback.objects.create(event=self.event, user=user, rating=rating, comment=comment, **kwargs)
+
+    def top_ids(self):
+        return [item['id'] for item in ReviewRanking.top(self.event.pk)]
+
+    def test_rank_score_ordering(self):
+        short = self.review(self.users[0], 4)
+        detailed = self.review(self.users[1], 4, comment='x' * 280)
+        featured = self.review(self.users[2], 2, is_featured=True)
+        old = self.review(self.users[3], 5, comment='x' * 280)
+        hidden = self.review(self.users[4], 5, is_approved=False)
+
+        # Deux demi-vies: le poids de l'avis est divisé par quatre
+        EventFeedback.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=60))
+        ReviewRanking.refresh()
+
+        # Qualités: 4 × 2 = 8, 2 × 3 = 6, 4, 5 × 2 / 4 = 2.5
+        expected = [detailed.pk, featured.pk, short.pk, old.pk]
+        self.assertEqual(self.top_ids(), expected)
+        self.assertNotIn(hidden.pk, self.top_ids())
+        self.assertEqual(
+            list(ReviewRanking.ranked(EventFeedback.objects.all()).values_list('pk', flat=True)),
+            expected
+        )
+
+        response = self.client.get('/api/feedbacks/', {'event': str(self.event.pk)})
+        self.assertEqual([item['id'] for item in response.data['results']], expected)
+
+    def test_review_changes_invalidate_cache(self):
+        first = self.review(self.users[0], 5)
+        second = self.review(self.users[1], 3)
+        self.assertEqual(self.top_ids(), [first.pk, second.pk])
+        with self.assertNumQueries(0):
+            self.top_ids()
+
+        # Invalidation à la validation de la transaction seulement
+        with self.captureOnCommitCallbacks() as callbacks:
+            second.rating = 5
+            second.comment = 'Excellent concert, très bonne organisation'
+            second.save()
+        self.assertEqual(self.top_ids(), [first.pk, second.pk])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.top_ids(), [second.pk, first.pk])
+
+        # Avis déplacé vers un autre événement: les deux listes sont invalidées
+        ReviewRanking.top(self.other_event.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            second.event = self.other_event
+            second.save()
+        self.assertEqual(self.top_ids(), [first.pk])
+        self.assertEqual([item['id'] for item in ReviewRanking.top(self.other_event.pk)], [second.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(self.top_ids(), [])
+
+    def test_invalid_event_rejected(self):
+        self.assertEqual(self.client.get('/api/feedbacks/top/', {'event': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/feedbacks/', {'event': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/feedbacks/top/').status_code, 400)
+
+        self.review(self.users[0], 5)
+        response = self.client.get('/api/feedbacks/top/', {'event': str(self.event.pk).upper()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+
+class RatingAggregateTests(TestCase):
+    """Les variations appliquées à chaque écriture donnent les mêmes agrégats que le recalcul complet"""
+
+    FIELDS = ('rating_count', 'rating_total', 'stars_1', 'stars_2', 'stars_3', 'stars_4', 'stars_5', 'bayesian_rating')
+
+    def setUp(self):
+        now = timezone.now()
+        self.organizers = [
+            User.objects.create_user(email=f'org{index}@example.com', username=f'org{index}', password='x', role='organizer')
+            for index in range(2)
+        ]
+        for organizer in self.organizers:
+            OrganizerProfile.objects.create(user=organizer)
+        self.concert, self.festival, self.salon = [
+            Event.objects.create(
+                title=title, description='Description', organizer=organizer, event_type='billetterie',
+                start_date=now - timedelta(days=2), end_date=now - timedelta(days=1),
+                location_name='Salle', location_address='Adresse', location_city='Douala', status='published'
+            )
+            for title, organizer in (
+                ('Concert', self.organizers[0]), ('Festival', self.organizers[1]), ('Salon', self.organizers[0])
+            )
+        ]
+        self.users = [
+            User.objects.create_user(email=f'user{index}@example.com', username=f'user{index}', password='x')
+            for index in range(6)
+        ]
+
+    def snapshot(self):
+        def rows(model, key):
+            return {
+                getattr(row, key): tuple(round(getattr(row, field), 9) for field in self.FIELDS)
+                for row in model.objects.all()
+            }
+        return (
+            rows(EventRating, 'event_id'),
+            rows(OrganizerRating, 'organizer_id'),
+            dict(OrganizerProfile.objects.values_list('user_id', 'rating'))
+        )
+
+    def assert_matches_recompute(self):
+        incremental = self.snapshot()
+        RatingService.recompute()
+        self.assertEqual(incremental, self.snapshot())
+
+    def review(self, user, event, rating, **kwargs):
+        return EventFeedback.objects.create(user=self.users[user], event=event, rating=rating, **kwargs)
+
+    def test_incremental_aggregates_match_recompute(self):
+        reviews = [
+            self.review(0, self.concert, 5),
+            self.review(1, self.concert, 3),
+            self.review(2, self.festival, 4),
+            self.review(3, self.salon, 2),
+        ]
+        pending = self.review(4, self.concert, 1, is_approved=False)
+        self.assert_matches_recompute()
+        self.assertEqual(EventRating.objects.get(event=self.concert).rating_count, 2)
+
+        # Modification de la note
+        reviews[1].rating = 4
+        reviews[1].save()
+        self.assert_matches_recompute()
+
+        # Modification sans effet sur les agrégats
+        reviews[0].comment = 'Superbe soirée'
+        with self.assertNumQueries(2):
+            reviews[0].save()
+        self.assert_matches_recompute()
+
+        # Désapprobation, puis nouvelle approbation
+        reviews[2].is_approved = False
+        reviews[2].save()
+        self.assert_matches_recompute()
+        self.assertEqual(EventRating.objects.get(event=self.festival).rating_count, 0)
+        reviews[2].is_approved = True
+        reviews[2].save()
+        pending.is_approved = True
+        pending.save()
+        self.assert_matches_recompute()
+
+        # Avis déplacé vers un événement d'un autre organisateur, avec ou sans changement de note
+        reviews[3].event = self.festival
+        reviews[3].save()
+        self.assert_matches_recompute()
+        reviews[1].event = self.salon
+        reviews[1].rating = 1
+        reviews[1].save()
+        self.assert_matches_recompute()
+
+        # Suppressions, y compris d'un avis non approuvé et en cascade avec l'événement
+        reviews[0].delete()
+        unapproved = self.review(5, self.concert, 2, is_approved=False)
+        unapproved.delete()
+        self.assert_matches_recompute()
+        self.salon.delete()
+        self.assert_matches_recompute()
+
+        self.assertEqual(
+            EventRating.objects.get(event=self.festival).histogram,
+            {1: 0, 2: 1, 3: 0, 4: 1, 5: 0}
+        )
+
+class ModerationQueueTests(TestCase):
+    CASE_FIELDS = ('is_open', 'open_count', 'inappropriate_count', 'misleading_count', 'scam_count',
+                   'duplicate_count', 'other_count', 'first_flagged_at', 'last_flagged_at')
+
+    def setUp(self):
+        now = timezone.now()
+        self.admin = User.objects.create_user(email='admin@example.com', username='admin', password='x', is_staff=True)
+        organizer = User.objects.create_user(email='org@example.com', username='org', password='x', role='organizer')
+        self.quiet, self.popular, self.past = [
+            Event.objects.create(
+                title=title, description='Description', organizer=organizer, event_type='billetterie',
+                start_date=now + timedelta(days=2), end_date=now + timedelta(days=3),
+                location_name='Salle', location_address='Adresse', location_city='Douala', status='published',
+                registration_count=registrations
+            )
+            for title, registrations in (('Calme', 0), ('Populaire', 500), ('Ancien', 0))
+        ]
+        self.reporters = [
+            User.objects.create_user(email=f'user{index}@example.com', username=f'user{index}', password='x')
+            for index in range(4)
+        ]
+        # Historique des auteurs: signalements fondés ou rejetés, utilisateur vérifié
+        EventFlag.objects.bulk_create([
+            EventFlag(event=self.past, user=self.reporters[0], reason='scam', is_resolved=True, outcome='upheld'),
+            EventFlag(event=self.past, user=self.reporters[1], reason='other', is_resolved=True, outcome='dismissed'),
+        ])
+        User.objects.filter(pk=self.reporters[2].pk).update(is_verified=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def flag(self, reporter, event, reason):
+        return EventFlag.objects.create(event=event, user=self.reporters[reporter], reason=reason, description='Description')
+
+    def cases(self):
+        return {
+            case.event_id: case
+            for case in ModerationCase.objects.filter(event__in=[self.quiet, self.popular])
+        }
+
+    def test_rebuild_matches_incremental_cases(self):
+        for reporter, event, reason in (
+            (0, self.quiet, 'scam'), (1, self.quiet, 'misleading'), (2, self.quiet, 'scam'),
+            (3, self.popular, 'inappropriate'), (2, self.popular, 'duplicate'),
+        ):
+            self.flag(reporter, event, reason)
+        trusts = dict(EventFlag.objects.filter(event=self.quiet).values_list('user_id', 'trust'))
+        self.assertGreater(trusts[self.reporters[0].pk], trusts[self.reporters[1].pk])
+        self.assertEqual(trusts[self.reporters[2].pk], 1.5)
+
+        incremental = self.cases()
+        self.assertEqual(ModerationService.rebuild(), 2)
+        rebuilt = self.cases()
+        for event_id, case in incremental.items():
+            self.assertEqual(
+                [getattr(case, field) for field in self.CASE_FIELDS],
+                [getattr(rebuilt[event_id], field) for field in self.CASE_FIELDS]
+            )
+            self.assertAlmostEqual(case.velocity_log, rebuilt[event_id].velocity_log, places=6)
+            self.assertAlmostEqual(case.priority, rebuilt[event_id].priority, places=6)
+        self.assertEqual((rebuilt[self.quiet.pk].open_count, rebuilt[self.quiet.pk].scam_count), (3, 2))
+
+        # Trois signalements contre deux, mais la popularité l'emporte
+        response = self.client.get('/api/flags/queue/')
+        self.assertEqual([item['event'] for item in response.data['results']], [self.popular.pk, self.quiet.pk])
+
+    def test_resolve_event_closes_case(self):
+        self.flag(0, self.quiet, 'scam')
+        self.flag(1, self.quiet, 'other')
+        self.flag(2, self.popular, 'scam')
+
+        response = self.client.post('/api/flags/resolve_event/', {'event': str(self.quiet.pk), 'outcome': 'upheld'}, format='json')
+        self.assertEqual((response.status_code, response.data['resolved']), (200, 2))
+        self.assertFalse(EventFlag.objects.filter(event=self.quiet, is_resolved=False).exists())
+
+        case = ModerationCase.objects.get(event=self.quiet)
+        self.assertEqual(
+            [getattr(case, field) for field in ('is_open', 'open_count', 'scam_count', 'velocity_log', 'priority')],
+            [False, 0, 0, 0.0, 0.0]
+        )
+        queue = self.client.get('/api/flags/queue/').data['results']
+        self.assertEqual([item['event'] for item in queue], [self.popular.pk])
+
+        # Un nouveau signalement rouvre le dossier
+        self.flag(3, self.quiet, 'misleading')
+        case.refresh_from_db()
+        self.assertEqual((case.is_open, case.open_count, case.misleading_count), (True, 1, 1))
+
+        self.assertEqual(self.client.post('/api/flags/resolve_event/', {'event': 'abc'}, format='json').status_code, 400)
+
+    def test_flag_and_validation_lists_ordered(self):
+        flags = [self.flag(index, self.quiet, 'other') for index in range(3)]
+        validations = [EventValidation.objects.create(event=self.quiet, user=user) for user in self.reporters[:3]]
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', UnorderedObjectListWarning)
+            flag_ids = [item['id'] for item in self.client.get('/api/flags/').data['results']]
+            validation_ids = [item['id'] for item in self.client.get('/api/validations/').data['results']]
+        self.assertEqual(flag_ids[:3], [flag.pk for flag in reversed(flags)])
+        self.assertEqual(validation_ids, [validation.pk for validation in reversed(validations)])
@@ -1,26 +1,50 @@
+import uuid
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from .models import EventFeedback, EventFlag, EventValidation
-from .serializers import EventFeedbackSerializer, EventFlagSerializer, EventValidationSerializer
+from .models import EventFeedback, EventFlag, EventValidation, ModerationCase
+from .serializers import EventFeedbackSerializer, EventFlagSerializer, EventValidationSerializer, ModerationCaseSerializer
+from .moderation import ModerationService
+from .ranking import ReviewRanking
 from apps.core.permissions import IsOwnerOrReadOnly
 from django.shortcuts import get_object_or_404
 from apps.events.models import Event
-from django.db.models import Count, Avg
+from apps.events.serializers import rating_summary
+from django.db.models import F, Func, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
+def count_subquery(queryset):
+    """Sous-requête COUNT(*) sans regroupement"""
+    return Coalesce(Subquery(queryset.order_by().annotate(
+        count=Func(F('pk'), function='COUNT', output_field=IntegerField())
+    ).values('count')), 0)
+
+def event_param(request):
+    """Identifiant d'événement du paramètre ?event= (None si absent)"""
+    event_id = request.query_params.get('event')
+    if not event_id:
+        return None
+    try:
+        return uuid.UUID(event_id)
+    except ValueError:
+        raise ValidationError({'event': "Identifiant d'événement invalide."})
+
 class EventFeedbackViewSet(viewsets.ModelViewSet):
     queryset = EventFeedback.objects.all()
     serializer_class = EventFeedbackSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
     filter_backends = [filters.OrderingFilter]
-    ordering_fields = ['created_at', 'rating']
+    ordering_fields = ['created_at', 'rating', 'rank_score']
+    ordering = ReviewRanking.ORDERING
     
     def get_queryset(self):
-        event_id = self.request.query_params.get('event')
+        queryset = EventFeedbackSerializer.setup_queryset(EventFeedback.objects.filter(is_approved=True))
+        event_id = event_param(self.request)
         if event_id:
-            return EventFeedback.objects.filter(event__id=event_id, is_approved=True)
-        return EventFeedback.objects.filter(is_approved=True)
+            return queryset.filter(event__id=event_id)
+        return queryset
     
     def perform_create(self, serializer):
         event_id = self.request.data.get('event')
@@ -35,9 +59,20 @@ class EventFeedbackViewSet(viewsets.ModelViewSet):
         
         serializer.save(user=self.request.user)
     
+    @action(detail=False, methods=['get'])
+    def top(self, request):
+        """Meilleurs avis d'un événement (liste mise en cache)"""
+        event_id = event_param(request)
+        if not event_id:
+            return Response(
+                {'detail': 'Veuillez spécifier un événement.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(ReviewRanking.top(event_id))
+    
     @action(detail=False, methods=['get'])
     def my_feedback(self, request):
-        feedback = EventFeedback.objects.filter(user=request.user)
+        feedback = EventFeedbackSerializer.setup_queryset(EventFeedback.objects.filter(user=request.user))
         serializer = self.get_serializer(feedback, many=True)
         return Response(serializer.data)
 
@@ -46,6 +81,9 @@ class EventFlagViewSet(viewsets.ModelViewSet):
     serializer_class = EventFlagSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly]
     
+    def get_queryset(self):
+        return EventFlagSerializer.setup_queryset(EventFlag.objects.all()).order_by('-created_at', '-id')
+    
     def perform_create(self, serializer):
         event_id = self.request.data.get('event')
         event = get_object_or_404(Event, id=event_id)
@@ -70,10 +108,15 @@ class EventFlagViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
+        outcome = request.data.get('outcome', '')
+        if outcome not in ('', *dict(EventFlag.OUTCOME_CHOICES)):
+            return Response({'detail': 'Décision invalide.'}, status=status.HTTP_400_BAD_REQUEST)
+        
         flag.is_resolved = True
         flag.resolved_at = timezone.now()
         flag.resolved_by = request.user
         flag.resolution_notes = request.data.get('resolution_notes', '')
+        flag.outcome = outcome
         flag.save()
         
         return Response({
@@ -90,15 +133,61 @@ class EventFlagViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        flags = EventFlag.objects.filter(is_resolved=False)
-        serializer = self.get_serializer(flags, many=True)
-        return Response(serializer.data)
+        flags = self.get_queryset().filter(is_resolved=False).order_by('-created_at', '-id')
+        page = self.paginate_queryset(flags)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def queue(self, request):
+        """File de modération: événements signalés par priorité décroissante"""
+        if not request.user.is_staff:
+            return Response(
+                {'detail': 'Accès non autorisé.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        cases = ModerationCaseSerializer.setup_queryset(
+            ModerationCase.objects.filter(is_open=True)
+        ).order_by('-priority', 'event')
+        page = self.paginate_queryset(cases)
+        serializer = ModerationCaseSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+    
+    @action(detail=False, methods=['post'])
+    def resolve_event(self, request):
+        """Résout tous les signalements ouverts d'un événement"""
+        if not request.user.is_staff:
+            return Response(
+                {'detail': 'Seuls les administrateurs peuvent résoudre les signalements.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        try:
+            event_id = uuid.UUID(str(request.data.get('event')))
+        except ValueError:
+            return Response({'detail': "Identifiant d'événement invalide."}, status=status.HTTP_400_BAD_REQUEST)
+        event = get_object_or_404(Event.objects.only('id'), id=event_id)
+        outcome = request.data.get('outcome', '')
+        if outcome not in ('', *dict(EventFlag.OUTCOME_CHOICES)):
+            return Response({'detail': 'Décision invalide.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        resolved = ModerationService.resolve_event(
+            event.id,
+            request.user,
+            resolution_notes=request.data.get('resolution_notes', ''),
+            outcome=outcome
+        )
+        return Response({'success': True, 'resolved': resolved})
 
 class EventValidationViewSet(viewsets.ModelViewSet):
     queryset = EventValidation.objects.all()
     serializer_class = EventValidationSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly]
     
+    def get_queryset(self):
+        return EventValidationSerializer.setup_queryset(EventValidation.objects.all()).order_by('-created_at', '-id')
+    
     def perform_create(self, serializer):
         event_id = self.request.data.get('event')
         event = get_object_or_404(Event, id=event_id)
@@ -114,28 +203,30 @@ class EventValidationViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def event_stats(self, request):
-        event_id = request.query_params.get('event')
+        event_id = event_param(request)
         if not event_id:
             return Response(
                 {'detail': 'Veuillez spécifier un événement.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        event = get_object_or_404(Event, id=event_id)
-        
-        # Récupérer les statistiques
-        validations_count = EventValidation.objects.filter(event=event).count()
-        flags_count = EventFlag.objects.filter(event=event).count()
-        feedback_stats = EventFeedback.objects.filter(event=event).aggregate(
-            avg_rating=Avg('rating'),
-            count=Count('id')
+        # Compteurs et agrégats de notes en une seule requête
+        event = get_object_or_404(
+            Event.objects.select_related('rating').annotate(
+                validations_count=count_subquery(EventValidation.objects.filter(event=OuterRef('pk'))),
+                flags_count=count_subquery(EventFlag.objects.filter(event=OuterRef('pk')))
+            ),
+            id=event_id
         )
+        rating = rating_summary(event) or {'count': 0, 'average': None, 'bayesian': None, 'histogram': {}}
         
         return Response({
             'event_id': str(event.id),
             'event_title': event.title,
-            'validations_count': validations_count,
-            'flags_count': flags_count,
-            'feedback_count': feedback_stats['count'],
-            'average_rating': feedback_stats['avg_rating']
-        })
\ No newline at end of file
+            'validations_count': event.validations_count,
+            'flags_count': event.flags_count,
+            'feedback_count': rating['count'],
+            'average_rating': rating['average'],
+            'bayesian_rating': rating['bayesian'],
+            'rating_histogram': rating['histogram']
+        })
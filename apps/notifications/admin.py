@@ -2,31 +2,44 @@ from django.contrib import admin
 from .models import Notification, NotificationTemplate
 
 class NotificationAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user', 'notification_type', 'channel', 'is_read', 'is_sent', 'created_at')
-    list_filter = ('notification_type', 'channel', 'is_read', 'is_sent')
+    list_display = ('id', 'user', 'notification_type', 'channel', 'is_read', 'is_sent', 'delivery_status', 'attempts', 'created_at')
+    list_filter = ('notification_type', 'channel', 'is_read', 'is_sent', 'delivery_status')
     search_fields = ('user__email', 'title', 'message')
-    readonly_fields = ('created_at', 'sent_at', 'read_at')
+    readonly_fields = ('created_at', 'sent_at', 'read_at', 'attempts', 'last_error')
     fieldsets = (
         ('Destinataire', {'fields': ('user',)}),
         ('Contenu', {'fields': ('title', 'message', 'notification_type')}),
         ('Référence', {'fields': ('related_object_id', 'related_object_type')}),
         ('Livraison', {'fields': ('channel', 'is_sent', 'is_read')}),
+        ('File d\'envoi', {'fields': ('delivery_status', 'attempts', 'next_attempt_at', 'last_error')}),
         ('Métadonnées', {'fields': ('created_at', 'scheduled_for', 'sent_at', 'read_at')}),
         ('Email', {'fields': ('email_subject',)}),
         ('SMS', {'fields': ('phone_number',)}),
         ('Données supplémentaires', {'fields': ('extra_data',)})
     )
-    actions = ['mark_as_read', 'mark_as_sent']
+    actions = ['mark_as_read', 'mark_as_sent', 'requeue']
     
     def mark_as_read(self, request, queryset):
         from django.utils import timezone
+        from .badges import BadgeService
+        user_ids = set(queryset.values_list('user_id', flat=True))
         queryset.update(is_read=True, read_at=timezone.now())
+        BadgeService.reconcile(user_ids)
     mark_as_read.short_description = "Marquer comme lues"
     
     def mark_as_sent(self, request, queryset):
         from django.utils import timezone
-        queryset.update(is_sent=True, sent_at=timezone.now())
+        queryset.update(is_sent=True, sent_at=timezone.now(), delivery_status='sent')
     mark_as_sent.short_description = "Marquer comme envoyées"
+    
+    def requeue(self, request, queryset):
+        from django.utils import timezone
+        queryset.exclude(channel='in_app').exclude(delivery_status='sent').update(
+            delivery_status='pending',
+            attempts=0,
+            next_attempt_at=timezone.now()
+        )
+    requeue.short_description = "Relancer l'envoi"
 
 class NotificationTemplateAdmin(admin.ModelAdmin):
     list_display = ('name', 'notification_type')
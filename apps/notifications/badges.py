@@ -0,0 +1,191 @@
+# notifications/badges.py
+from collections import Counter
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Func, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from .models import Notification, UnreadCounter
+
+class BadgeService:
+    """
+    Compteurs de non-lus (notifications in-app et messages) par utilisateur.
+
+    Les compteurs sont stockés dans UnreadCounter et mis à jour par les
+    opérations d'écriture; la lecture passe par un cache par utilisateur puis
+    par une lecture sur clé primaire. Une réconciliation périodique recalcule
+    les valeurs exactes en cas de dérive (mises à jour en masse, admin).
+    Les notifications de nouveau message ne sont comptées que par le badge des
+    messages: un message non lu ne compte qu'une fois dans le total.
+    """
+
+    FIELDS = ('notifications', 'messages')
+
+    # Notifications déjà comptées par le badge des messages
+    MESSAGE_NOTIFICATION_TYPES = ('new_message',)
+
+    @staticmethod
+    def _cache_key(user_id):
+        return f"badges:{user_id}"
+
+    @staticmethod
+    def _invalidate(user_ids):
+        """Supprime les compteurs en cache après la validation de la transaction"""
+        keys = [BadgeService._cache_key(user_id) for user_id in user_ids]
+        if keys:
+            transaction.on_commit(lambda: cache.delete_many(keys))
+
+    @staticmethod
+    def get_counts(user_id):
+        """Retourne les compteurs de non-lus d'un utilisateur"""
+        cache_key = BadgeService._cache_key(user_id)
+        counts = cache.get(cache_key)
+        if counts is not None:
+            return counts
+
+        counts = UnreadCounter.objects.filter(pk=user_id).values(*BadgeService.FIELDS).first()
+        if counts is None:
+            counts = BadgeService.reconcile([user_id]).get(user_id, {'notifications': 0, 'messages': 0})
+
+        counts = dict(counts, total=counts['notifications'] + counts['messages'])
+        cache.set(cache_key, counts, settings.NOTIFICATIONS.get('BADGE_CACHE_TIMEOUT', 300))
+        return counts
+
+    @staticmethod
+    def adjust(field, amounts):
+        """
+        Applique des variations {user_id: delta} à un compteur.
+
+        Les utilisateurs sans compteur sont initialisés par réconciliation: la
+        valeur calculée inclut déjà les écritures de la transaction courante.
+        """
+        amounts = {user_id: delta for user_id, delta in amounts.items() if delta}
+        if not amounts:
+            return
+
+        # Une requête UPDATE par valeur de variation distincte
+        by_delta = {}
+        for user_id, delta in amounts.items():
+            by_delta.setdefault(delta, []).append(user_id)
+
+        updated = 0
+        for delta, user_ids in by_delta.items():
+            updated += UnreadCounter.objects.filter(user_id__in=user_ids).update(
+                **{field: Greatest(F(field) + delta, Value(0))}
+            )
+
+        if updated < len(amounts):
+            existing = set(UnreadCounter.objects.filter(user_id__in=amounts).values_list('user_id', flat=True))
+            BadgeService.reconcile([user_id for user_id in amounts if user_id not in existing])
+
+        BadgeService._invalidate(amounts)
+
+    @staticmethod
+    def counted(queryset):
+        """Notifications du queryset comptées par le badge des notifications"""
+        return queryset.filter(channel='in_app').exclude(
+            notification_type__in=BadgeService.MESSAGE_NOTIFICATION_TYPES
+        )
+
+    @staticmethod
+    def is_counted(notification):
+        """Indique si la notification non lue compte dans le badge des notifications"""
+        return (
+            notification.channel == 'in_app'
+            and not notification.is_read
+            and notification.notification_type not in BadgeService.MESSAGE_NOTIFICATION_TYPES
+        )
+
+    @staticmethod
+    def notifications_created(notifications):
+        """Compte les nouvelles notifications in-app non lues"""
+        BadgeService.adjust('notifications', Counter(
+            notification.user_id for notification in notifications
+            if BadgeService.is_counted(notification)
+        ))
+
+    @staticmethod
+    def _count(queryset):
+        """Sous-requête COUNT(*) sans regroupement"""
+        return Subquery(queryset.order_by().annotate(
+            count=Func(F('pk'), function='COUNT', output_field=IntegerField())
+        ).values('count'))
+
+    @staticmethod
+    def _unread_messages():
+        """Sous-requête: nombre de messages non lus de l'utilisateur OuterRef('pk')"""
+        from apps.user_messages.models import ConversationReadState, Message
+
+        # Repère de lecture de l'utilisateur dans la conversation du message
+        read_watermark = ConversationReadState.objects.filter(
+            conversation=OuterRef('conversation'),
+            user=OuterRef(OuterRef('pk'))
+        ).values('last_read_message_id')[:1]
+
+        return BadgeService._count(
+            Message.objects.filter(
+                conversation__participants=OuterRef('pk')
+            ).exclude(
+                sender=OuterRef('pk')
+            ).filter(
+                id__gt=Coalesce(Subquery(read_watermark), 0)
+            )
+        )
+
+    @staticmethod
+    def reconcile(user_ids=None, batch_size=1000):
+        """
+        Recalcule les compteurs exacts des utilisateurs indiqués (tous par défaut).
+        Retourne {user_id: {'notifications': n, 'messages': m}}.
+        """
+        from django.contrib.auth import get_user_model
+
+        users = get_user_model().objects.order_by('pk')
+        if user_ids is not None:
+            if not user_ids:
+                return {}
+            users = users.filter(pk__in=user_ids)
+
+        unread_notifications = BadgeService._count(
+            BadgeService.counted(Notification.objects.filter(user=OuterRef('pk'), is_read=False))
+        )
+
+        rows = users.annotate(
+            unread_notifications=Coalesce(unread_notifications, 0),
+            unread_messages=Coalesce(BadgeService._unread_messages(), 0)
+        ).values_list('pk', 'unread_notifications', 'unread_messages')
+
+        now = timezone.now()
+        counts = {}
+        batch = []
+
+        for user_id, notifications, messages in rows.iterator(chunk_size=batch_size):
+            counts[user_id] = {'notifications': notifications, 'messages': messages}
+            batch.append(UnreadCounter(
+                user_id=user_id,
+                notifications=notifications,
+                messages=messages,
+                reconciled_at=now
+            ))
+            if len(batch) >= batch_size:
+                BadgeService._save_counters(batch)
+                batch = []
+
+        if batch:
+            BadgeService._save_counters(batch)
+
+        if user_ids is None:
+            cache.delete_many([BadgeService._cache_key(user_id) for user_id in counts])
+        else:
+            BadgeService._invalidate(counts)
+        return counts
+
+    @staticmethod
+    def _save_counters(counters):
+        UnreadCounter.objects.bulk_create(
+            counters,
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['notifications', 'messages', 'reconciled_at']
+        )
@@ -0,0 +1,227 @@
+# notifications/dispatcher.py
+import logging
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import Notification
+
+logger = logging.getLogger('apps')
+
+class OutboxDispatcher:
+    """
+    Vidage de la file d'envoi des notifications (email, SMS, push).
+
+    Les notifications sont créées à l'état 'pending' dans la transaction de
+    l'opération qui les déclenche. Chaque worker réserve un lot par canal
+    (SELECT ... FOR UPDATE SKIP LOCKED), le transmet au transport du canal puis
+    enregistre le résultat: envoyée, nouvelle tentative différée
+    exponentiellement, ou abandonnée après le nombre maximal de tentatives.
+
+    Une réservation a une durée limitée (next_attempt_at sert d'échéance):
+    les lots d'un worker interrompu redeviennent disponibles à son expiration.
+    """
+
+    CHANNELS = ('email', 'sms', 'push')
+
+    _transports = {}
+
+    @staticmethod
+    def _option(name, default):
+        return settings.NOTIFICATIONS.get(name, default)
+
+    @staticmethod
+    def _channel_config(channel):
+        """Taille de lot et nombre maximal d'envois simultanés du canal"""
+        config = OutboxDispatcher._option('OUTBOX_CHANNELS', {}).get(channel, {})
+        return config.get('BATCH_SIZE', 100), config.get('MAX_IN_FLIGHT', 200)
+
+    @staticmethod
+    def get_transport(channel):
+        """Instance du transport configuré pour le canal (une par processus)"""
+        if channel not in OutboxDispatcher._transports:
+            path = OutboxDispatcher._option('TRANSPORTS', {}).get(
+                channel,
+                'apps.notifications.transports.ConsoleTransport'
+            )
+            OutboxDispatcher._transports[channel] = import_string(path)()
+        return OutboxDispatcher._transports[channel]
+
+    @staticmethod
+    def retry_delay(attempts):
+        """Délai avant la tentative suivante: base * 2^(tentatives - 1), plafonné"""
+        base = OutboxDispatcher._option('OUTBOX_RETRY_BASE_DELAY', 60)
+        maximum = OutboxDispatcher._option('OUTBOX_RETRY_MAX_DELAY', 3600)
+        return timezone.timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), maximum))
+
+    @staticmethod
+    def schedule():
+        """Déclenche un vidage de la file après la validation de la transaction courante"""
+        def trigger():
+            from .tasks import dispatch_notifications
+            try:
+                dispatch_notifications.delay()
+            except Exception as e:
+                # La tâche périodique prendra le relais
+                logger.warning(f"Impossible de programmer l'envoi des notifications: {str(e)}")
+
+        transaction.on_commit(trigger)
+
+    @staticmethod
+    def claim_batch(channel):
+        """Réserve un lot de notifications prêtes à être envoyées sur le canal"""
+        batch_size, max_in_flight = OutboxDispatcher._channel_config(channel)
+        now = timezone.now()
+        lease = timezone.timedelta(seconds=OutboxDispatcher._option('OUTBOX_LEASE_TIMEOUT', 300))
+
+        with transaction.atomic():
+            in_flight = Notification.objects.filter(
+                channel=channel,
+                delivery_status='sending',
+                next_attempt_at__gt=now
+            ).count()
+            limit = min(batch_size, max_in_flight - in_flight)
+            if limit <= 0:
+                return []
+
+            ids = list(
+                Notification.objects.select_for_update(skip_locked=True).filter(
+                    channel=channel,
+                    delivery_status__in=('pending', 'sending'),
+                    next_attempt_at__lte=now
+                ).order_by('next_attempt_at').values_list('id', flat=True)[:limit]
+            )
+            if not ids:
+                return []
+
+            Notification.objects.filter(id__in=ids).update(
+                delivery_status='sending',
+                attempts=F('attempts') + 1,
+                next_attempt_at=now + lease
+            )
+
+        return list(Notification.objects.filter(id__in=ids).select_related('user'))
+
+    @staticmethod
+    def deliver_batch(channel, notifications):
+        """Envoie un lot réservé et enregistre le résultat de chaque notification"""
+        started = time.monotonic()
+        try:
+            errors = OutboxDispatcher.get_transport(channel).send_messages(notifications)
+        except Exception as e:
+            errors = [str(e)] * len(notifications)
+        elapsed = time.monotonic() - started
+
+        now = timezone.now()
+        max_attempts = OutboxDispatcher._option('OUTBOX_MAX_ATTEMPTS', 5)
+        sent_ids = []
+        failed = []
+        dead = 0
+
+        for notification, error in zip(notifications, errors):
+            if error is None:
+                sent_ids.append(notification.id)
+                continue
+
+            notification.last_error = error[:1000]
+            if notification.attempts >= max_attempts:
+                notification.delivery_status = 'dead'
+                notification.next_attempt_at = None
+                dead += 1
+                logger.error(f"Notification {notification.id} abandonnée après {notification.attempts} tentatives: {error}")
+            else:
+                notification.delivery_status = 'pending'
+                notification.next_attempt_at = now + OutboxDispatcher.retry_delay(notification.attempts)
+            failed.append(notification)
+
+        if sent_ids:
+            Notification.objects.filter(id__in=sent_ids).update(
+                delivery_status='sent',
+                is_sent=True,
+                sent_at=now,
+                next_attempt_at=None,
+                last_error=''
+            )
+        if failed:
+            Notification.objects.bulk_update(failed, ['delivery_status', 'next_attempt_at', 'last_error'])
+
+        OutboxDispatcher._record_metrics(channel, len(sent_ids), len(failed) - dead, dead, elapsed)
+        return len(sent_ids)
+
+    @staticmethod
+    def dispatch(channels=None, time_limit=None):
+        """
+        Vide la file des canaux indiqués jusqu'à épuisement ou expiration du temps alloué.
+
+        :return: Nombre de notifications envoyées par canal
+        """
+        channels = channels or OutboxDispatcher.CHANNELS
+        if time_limit is None:
+            time_limit = OutboxDispatcher._option('OUTBOX_DISPATCH_TIME_LIMIT', 50)
+        deadline = time.monotonic() + time_limit
+
+        sent = {channel: 0 for channel in channels}
+        active = list(channels)
+
+        # Alterner les canaux pour qu'un canal chargé ne retarde pas les autres
+        while active and time.monotonic() < deadline:
+            for channel in list(active):
+                batch = OutboxDispatcher.claim_batch(channel)
+                if not batch:
+                    active.remove(channel)
+                    continue
+                sent[channel] += OutboxDispatcher.deliver_batch(channel, batch)
+
+        return sent
+
+    @staticmethod
+    def _metrics_key(channel, name):
+        return f"notifications:outbox:{channel}:{name}"
+
+    @staticmethod
+    def _record_metrics(channel, sent, failed, dead, elapsed):
+        """Cumule les compteurs d'envoi du canal en cache"""
+        counters = {'sent': sent, 'failed': failed, 'dead': dead, 'elapsed_ms': int(elapsed * 1000)}
+        for name, value in counters.items():
+            if not value:
+                continue
+            key = OutboxDispatcher._metrics_key(channel, name)
+            if not cache.add(key, value, None):
+                try:
+                    cache.incr(key, value)
+                except ValueError:
+                    cache.set(key, value, None)
+
+    @staticmethod
+    def get_metrics():
+        """État de la file et débit d'envoi par canal"""
+        backlog = {
+            (row['channel'], row['delivery_status']): row['count']
+            for row in Notification.objects.filter(
+                channel__in=OutboxDispatcher.CHANNELS
+            ).exclude(delivery_status='sent').values('channel', 'delivery_status').annotate(count=Count('id'))
+        }
+
+        metrics = {}
+        for channel in OutboxDispatcher.CHANNELS:
+            counters = cache.get_many([
+                OutboxDispatcher._metrics_key(channel, name)
+                for name in ('sent', 'failed', 'dead', 'elapsed_ms')
+            ])
+            sent = counters.get(OutboxDispatcher._metrics_key(channel, 'sent'), 0)
+            elapsed_ms = counters.get(OutboxDispatcher._metrics_key(channel, 'elapsed_ms'), 0)
+
+            metrics[channel] = {
+                'pending': backlog.get((channel, 'pending'), 0),
+                'sending': backlog.get((channel, 'sending'), 0),
+                'dead': backlog.get((channel, 'dead'), 0),
+                'sent_total': sent,
+                'failed_attempts': counters.get(OutboxDispatcher._metrics_key(channel, 'failed'), 0),
+                'dead_lettered': counters.get(OutboxDispatcher._metrics_key(channel, 'dead'), 0),
+                'throughput_per_second': round(sent / (elapsed_ms / 1000), 2) if elapsed_ms else None,
+            }
+
+        return metrics
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from apps.notifications.models import Notification
+from apps.notifications.registry import template_registry
+
+class Command(BaseCommand):
+    help = 'Convertit les notifications existantes au stockage compact (référence au template + paramètres)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Nombre de notifications mises à jour par requête')
+        parser.add_argument('--dry-run', action='store_true', help='Affiche le résultat sans modifier la base')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+
+        queryset = Notification.objects.filter(
+            template__isnull=True,
+            channel__in=Notification.CHANNEL_TEMPLATE_FIELDS.keys()
+        ).exclude(title='').only(
+            'id', 'channel', 'notification_type', 'title', 'message', 'email_subject', 'extra_data'
+        )
+
+        examined = 0
+        compacted = 0
+        saved_bytes = 0
+        batch = []
+
+        for notification in queryset.iterator(chunk_size=batch_size):
+            examined += 1
+            template = template_registry.get(notification.notification_type)
+
+            # Seules les notifications dont le texte est reproduit à l'identique sont compactées
+            if not notification.is_compactable(template):
+                continue
+
+            saved_bytes += sum(
+                len(text.encode('utf-8'))
+                for text in (notification.title, notification.message, notification.email_subject)
+            )
+            notification.template_id = template.id
+            notification.title = ''
+            notification.message = ''
+            notification.email_subject = ''
+            batch.append(notification)
+            compacted += 1
+
+            if len(batch) >= batch_size:
+                if not dry_run:
+                    Notification.objects.bulk_update(batch, ['template', 'title', 'message', 'email_subject'])
+                batch = []
+
+        if batch and not dry_run:
+            Notification.objects.bulk_update(batch, ['template', 'title', 'message', 'email_subject'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{compacted}/{examined} notifications compactées "
+            f"({saved_bytes / (1024 * 1024):.2f} MB de texte supprimés)"
+            + (" [simulation]" if dry_run else "")
+        ))
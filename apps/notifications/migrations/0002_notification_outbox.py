@@ -0,0 +1,46 @@
+# Generated by Django 5.1.7 on 2026-10-19 05:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_existing_as_sent(apps, schema_editor):
+    """Les notifications déjà envoyées ne doivent pas repasser par la file d'envoi"""
+    Notification = apps.get_model('notifications', 'Notification')
+    Notification.objects.filter(is_sent=True).update(delivery_status='sent')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='delivery_status',
+            field=models.CharField(choices=[('pending', 'En attente'), ('sending', "En cours d'envoi"), ('sent', 'Envoyée'), ('dead', 'Abandonnée')], default='pending', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='last_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['channel', 'delivery_status', 'next_attempt_at'], name='notificatio_channel_6eb3ef_idx'),
+        ),
+        migrations.RunPython(mark_existing_as_sent, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-19 06:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_unreadcounter'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('event_update', "Mise à jour d'événement"), ('registration_confirmation', "Confirmation d'inscription"), ('payment_confirmation', 'Confirmation de paiement'), ('event_reminder', "Rappel d'événement"), ('system_message', 'Message système'), ('custom_message', 'Message personnalisé'), ('new_message', 'Nouveau message')], max_length=30),
+        ),
+        migrations.AlterField(
+            model_name='notificationtemplate',
+            name='notification_type',
+            field=models.CharField(choices=[('event_update', "Mise à jour d'événement"), ('registration_confirmation', "Confirmation d'inscription"), ('payment_confirmation', 'Confirmation de paiement'), ('event_reminder', "Rappel d'événement"), ('system_message', 'Message système'), ('custom_message', 'Message personnalisé'), ('new_message', 'Nouveau message')], max_length=30),
+        ),
+    ]
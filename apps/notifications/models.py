@@ -1,4 +1,5 @@
 from django.db import models
+from django.core.exceptions import ValidationError
 from apps.accounts.models import User
 import uuid
 
@@ -10,6 +11,7 @@ class Notification(models.Model):
         ('event_reminder', 'Rappel d\'événement'),
         ('system_message', 'Message système'),
         ('custom_message', 'Message personnalisé'),
+        ('new_message', 'Nouveau message'),
     )
     
     CHANNEL_CHOICES = (
@@ -19,6 +21,21 @@ class Notification(models.Model):
         ('in_app', 'Dans l\'application'),
     )
     
+    DELIVERY_STATUS_CHOICES = (
+        ('pending', 'En attente'),
+        ('sending', 'En cours d\'envoi'),
+        ('sent', 'Envoyée'),
+        ('dead', 'Abandonnée'),
+    )
+    
+    # Champs du template utilisés par canal (titre, message)
+    CHANNEL_TEMPLATE_FIELDS = {
+        'in_app': ('in_app_title', 'in_app_body'),
+        'email': ('email_subject', 'email_body'),
+        'sms': (None, 'sms_body'),
+        'push': ('push_title', 'push_body'),
+    }
+    
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
     
@@ -36,6 +53,12 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     is_sent = models.BooleanField(default=False)
     
+    # File d'envoi (outbox)
+    delivery_status = models.CharField(max_length=10, choices=DELIVERY_STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    
     # Métadonnées
     created_at = models.DateTimeField(auto_now_add=True)
     scheduled_for = models.DateTimeField(null=True, blank=True)
@@ -48,11 +71,100 @@ class Notification(models.Model):
     # Pour les SMS
     phone_number = models.CharField(max_length=20, blank=True)
     
-    # Pour les notifications personnalisées
+    # Stockage compact: lorsque le template est renseigné, le titre et le message
+    # vides sont rendus à la lecture à partir du template et de extra_data
+    template = models.ForeignKey('NotificationTemplate', on_delete=models.SET_NULL, null=True, blank=True, related_name='notifications')
+    
+    # Paramètres du template et données personnalisées
     extra_data = models.JSONField(default=dict, blank=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['channel', 'delivery_status', 'next_attempt_at']),
+        ]
+    
+    def render_with(self, template, context=None, strict=False):
+        """
+        Rend le couple (titre, message) de la notification avec un template compilé
+        (contexte par défaut: extra_data). Hors mode strict, une variable manquante
+        laisse le texte source.
+        """
+        title_field, body_field = self.CHANNEL_TEMPLATE_FIELDS[self.channel]
+        if context is None:
+            context = self.extra_data or {}
+        
+        def render(field):
+            try:
+                return template.render(field, context)
+            except (KeyError, AttributeError, IndexError, ValueError):
+                if strict:
+                    raise
+                return template.texts[field].source
+        
+        if title_field and template.has(title_field):
+            title = render(title_field)
+        else:
+            title = 'SMS Notification' if self.channel == 'sms' else template.name
+        message = render(body_field) if template.has(body_field) else ''
+        return title, message
+    
+    def _rendered(self):
+        """Textes rendus à la lecture, conservés sur l'instance"""
+        from .registry import template_registry
+        
+        if not hasattr(self, '_rendered_texts'):
+            template = template_registry.get_by_id(self.template_id)
+            self._rendered_texts = self.render_with(template) if template else ('', '')
+        return self._rendered_texts
+    
+    def get_title(self):
+        """Titre de la notification (rendu à la demande pour le stockage compact)"""
+        if self.title or not self.template_id:
+            return self.title
+        return self._rendered()[0]
+    
+    def get_message(self):
+        """Message de la notification (rendu à la demande pour le stockage compact)"""
+        if self.message or not self.template_id:
+            return self.message
+        return self._rendered()[1]
+    
+    def get_email_subject(self):
+        return self.email_subject or self.get_title()
+    
+    def is_compactable(self, template):
+        """Indique si le titre et le message stockés sont exactement ceux que produit le template"""
+        if template is None or self.channel not in self.CHANNEL_TEMPLATE_FIELDS:
+            return False
+        title, message = self.render_with(template)
+        return title == self.title and message == self.message and self.email_subject in ('', title)
+    
+    @staticmethod
+    def materialize_for_template(template, batch_size=1000):
+        """
+        Réécrit en clair le titre et le message des notifications compactes d'un
+        template, avant que celui-ci ne soit modifié ou supprimé
+        """
+        from .registry import CompiledNotificationTemplate
+        
+        compiled = CompiledNotificationTemplate(template)
+        queryset = Notification.objects.filter(
+            models.Q(title='') | models.Q(message=''),
+            template_id=template.id
+        ).only('id', 'channel', 'template_id', 'extra_data', 'title', 'message')
+        
+        batch = []
+        for notification in queryset.iterator(chunk_size=batch_size):
+            notification.title, notification.message = notification.render_with(compiled)
+            batch.append(notification)
+            if len(batch) >= batch_size:
+                Notification.objects.bulk_update(batch, ['title', 'message'])
+                batch = []
+        if batch:
+            Notification.objects.bulk_update(batch, ['title', 'message'])
+    
     def __str__(self):
-        return f"{self.notification_type} pour {self.user.email} - {self.title}"
+        return f"{self.notification_type} pour {self.user.email} - {self.get_title()}"
 
 class NotificationTemplate(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -73,5 +185,26 @@ class NotificationTemplate(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    def clean(self):
+        """Vérifie que les textes n'utilisent que les variables déclarées"""
+        from .registry import TEMPLATE_FIELDS, validate_template_texts
+        
+        errors = validate_template_texts(
+            {field: getattr(self, field) for field in TEMPLATE_FIELDS},
+            self.available_variables
+        )
+        if errors:
+            raise ValidationError(errors)
+    
+    def __str__(self):
+        return self.name
+
+class UnreadCounter(models.Model):
+    """Compteurs de badges d'un utilisateur, maintenus à l'écriture (voir badges.BadgeService)"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='unread_counter')
+    notifications = models.PositiveIntegerField(default=0)
+    messages = models.PositiveIntegerField(default=0)
+    reconciled_at = models.DateTimeField(null=True, blank=True)
+    
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return f"Non lus de {self.user_id}: {self.notifications} notifications, {self.messages} messages"
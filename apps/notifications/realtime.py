@@ -0,0 +1,261 @@
+# notifications/realtime.py
+import asyncio
+import json
+import logging
+import threading
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger('apps')
+
+
+class Subscription:
+    """
+    Connexion temps réel d'un utilisateur, consommée dans la boucle asyncio du
+    serveur ASGI.
+
+    La file est bornée: si le client ne lit pas assez vite, les événements en
+    attente sont remplacés par un unique événement 'resync' invitant le client
+    à recharger ses données, sans jamais bloquer les producteurs.
+    """
+
+    def __init__(self, user_id, loop, maxsize):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+        self.closed = False
+
+    def _drain(self):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+    def push(self, message):
+        """Ajoute un événement (à appeler dans la boucle de la connexion)"""
+        if self.closed:
+            return
+        if self.queue.full():
+            self._drain()
+            message = {'event': 'resync', 'data': {}}
+        self.queue.put_nowait(message)
+
+    def close(self):
+        """Termine la connexion (à appeler dans la boucle de la connexion)"""
+        if not self.closed:
+            self.closed = True
+            self._drain()
+            self.queue.put_nowait(None)
+
+    async def get(self, timeout):
+        """Attend le prochain événement; None signifie la fin de la connexion"""
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class InMemoryBroker:
+    """
+    Publication/abonnement dans la mémoire du processus.
+
+    Suffit pour un serveur ASGI unique et pour les tests: les événements publiés
+    par un autre processus (worker Celery, autre nœud) ne sont pas reçus. Une
+    publication depuis un processus qui n'a jamais servi de flux est signalée
+    en erreur: elle ne peut atteindre aucun client.
+    """
+
+    def __init__(self):
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+        self._serving = False
+        self._warned = False
+
+    def subscribe(self, user_id):
+        """Ouvre une connexion; les plus anciennes au-delà de la limite par utilisateur sont fermées"""
+        user_id = str(user_id)
+        subscription = Subscription(
+            user_id,
+            asyncio.get_running_loop(),
+            settings.NOTIFICATIONS.get('REALTIME_QUEUE_SIZE', 100)
+        )
+        limit = settings.NOTIFICATIONS.get('REALTIME_MAX_CONNECTIONS_PER_USER', 5)
+
+        with self._lock:
+            self._serving = True
+            subscriptions = self._subscriptions.setdefault(user_id, [])
+            subscriptions.append(subscription)
+            excess = subscriptions[:-limit]
+            del subscriptions[:-limit]
+
+        for old in excess:
+            self._call(old, old.close)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id, [])
+            if subscription in subscriptions:
+                subscriptions.remove(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.user_id, None)
+
+    def connection_count(self):
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    @staticmethod
+    def _call(subscription, callback, *args):
+        try:
+            subscription.loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            # Boucle fermée: la connexion est déjà terminée
+            pass
+
+    def deliver(self, messages):
+        """Distribue des couples (user_id, événement) aux connexions locales"""
+        with self._lock:
+            targets = [
+                (subscription, message)
+                for user_id, message in messages
+                for subscription in self._subscriptions.get(str(user_id), ())
+            ]
+        for subscription, message in targets:
+            self._call(subscription, subscription.push, message)
+
+    def publish(self, messages):
+        if not self._serving and not self._warned:
+            self._warned = True
+            logger.error(
+                "Publication temps réel avec InMemoryBroker depuis un processus sans flux ouvert "
+                "(worker Celery, serveur WSGI): les événements sont perdus. Utilisez RedisBroker."
+            )
+        self.deliver(messages)
+
+
+class RedisBroker(InMemoryBroker):
+    """
+    Publication via Redis pour plusieurs processus ou nœuds.
+
+    Chaque processus ASGI s'abonne une seule fois au motif des canaux
+    utilisateurs et redistribue les événements reçus à ses connexions locales.
+    """
+
+    CHANNEL_PREFIX = 'realtime:user:'
+
+    def __init__(self):
+        super().__init__()
+        self._client = None
+        self._listeners = {}
+
+    def _redis(self):
+        if self._client is None:
+            import redis
+            self._client = redis.Redis.from_url(settings.NOTIFICATIONS.get('REALTIME_REDIS_URL', 'redis://localhost:6379/0'))
+        return self._client
+
+    def publish(self, messages):
+        pipeline = self._redis().pipeline(transaction=False)
+        for user_id, message in messages:
+            pipeline.publish(f"{self.CHANNEL_PREFIX}{user_id}", json.dumps(message, cls=DjangoJSONEncoder))
+        pipeline.execute()
+
+    def subscribe(self, user_id):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            listener = self._listeners.get(loop)
+            if listener is None or listener.done():
+                self._listeners[loop] = loop.create_task(self._listen())
+        return super().subscribe(user_id)
+
+    async def _listen(self):
+        import redis.asyncio as aioredis
+
+        while True:
+            client = pubsub = None
+            try:
+                client = aioredis.Redis.from_url(settings.NOTIFICATIONS.get('REALTIME_REDIS_URL', 'redis://localhost:6379/0'))
+                pubsub = client.pubsub()
+                await pubsub.psubscribe(f"{self.CHANNEL_PREFIX}*")
+                async for item in pubsub.listen():
+                    if item['type'] != 'pmessage':
+                        continue
+                    user_id = item['channel'].decode()[len(self.CHANNEL_PREFIX):]
+                    self.deliver([(user_id, json.loads(item['data']))])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Connexion Redis temps réel interrompue: {str(e)}")
+                await asyncio.sleep(1)
+            finally:
+                # Libérer l'abonnement et le pool de connexions avant de se reconnecter
+                await self._close(pubsub, client)
+
+    @staticmethod
+    async def _close(*resources):
+        for resource in resources:
+            if resource is None:
+                continue
+            try:
+                await resource.aclose()
+            except Exception as e:
+                logger.warning(f"Erreur lors de la fermeture de la connexion Redis temps réel: {str(e)}")
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Broker configuré par NOTIFICATIONS['REALTIME_BROKER'] (un par processus)"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.NOTIFICATIONS.get(
+                    'REALTIME_BROKER',
+                    'apps.notifications.realtime.RedisBroker'
+                ))()
+    return _broker
+
+
+def publish_events(events):
+    """
+    Publie des événements (user_id, type, données) après la validation de la
+    transaction courante. Un échec de publication n'affecte pas l'appelant.
+    """
+    messages = [(str(user_id), {'event': event, 'data': data}) for user_id, event, data in events]
+    if not messages:
+        return
+
+    def send():
+        try:
+            get_broker().publish(messages)
+        except Exception as e:
+            logger.warning(f"Erreur lors de la publication temps réel: {str(e)}")
+
+    transaction.on_commit(send)
+
+
+def publish(user_ids, event, data):
+    """Publie un même événement à plusieurs utilisateurs"""
+    publish_events([(user_id, event, data) for user_id in user_ids])
+
+
+def publish_notifications(notifications):
+    """Publie les nouvelles notifications in-app à leurs destinataires"""
+    publish_events(
+        (notification.user_id, 'notification', {
+            'id': str(notification.id),
+            'notification_type': notification.notification_type,
+            'title': notification.get_title(),
+            'message': notification.get_message(),
+            'related_object_id': notification.related_object_id,
+            'related_object_type': notification.related_object_type,
+            'created_at': notification.created_at,
+        })
+        for notification in notifications
+        if notification.channel == 'in_app'
+    )
+
+
+def format_event(event, data):
+    """Formate un événement Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
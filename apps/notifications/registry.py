@@ -0,0 +1,170 @@
+# apps/notifications/registry.py
+import re
+import threading
+import time
+import uuid
+from string import Formatter
+from django.conf import settings
+from django.core.cache import cache
+
+# Champs textuels d'un template de notification
+TEMPLATE_FIELDS = (
+    'email_subject', 'email_body', 'sms_body',
+    'push_title', 'push_body', 'in_app_title', 'in_app_body',
+)
+
+# Variables toujours disponibles dans le contexte de rendu
+BUILTIN_VARIABLES = {'object'}
+
+
+def parse_available_variables(available_variables):
+    """Extrait les noms de variables déclarés (séparés par des virgules, espaces ou retours à la ligne)"""
+    return {name for name in re.split(r'[\s,;{}]+', available_variables or '') if name}
+
+
+def template_placeholders(source):
+    """Retourne les noms racines des variables utilisées dans un texte au format str.format"""
+    names = set()
+    for _, field_name, _, _ in Formatter().parse(source or ''):
+        if field_name:
+            names.add(re.split(r'[.\[]', field_name, maxsplit=1)[0])
+    return names
+
+
+def validate_template_texts(texts, available_variables):
+    """
+    Vérifie la syntaxe des textes d'un template et, si des variables sont
+    déclarées, que chaque variable utilisée en fait partie.
+    Retourne un dictionnaire {champ: message d'erreur}.
+    """
+    declared = parse_available_variables(available_variables)
+    errors = {}
+
+    for field, source in texts.items():
+        try:
+            used = template_placeholders(source)
+        except ValueError as e:
+            errors[field] = f"Syntaxe de template invalide: {str(e)}"
+            continue
+
+        unknown = used - declared - BUILTIN_VARIABLES
+        if declared and unknown:
+            errors[field] = f"Variables non déclarées: {', '.join(sorted(unknown))}"
+
+    return errors
+
+
+class CompiledText:
+    """Texte de template analysé une seule fois"""
+    __slots__ = ('source', 'is_static', 'variables')
+
+    def __init__(self, source):
+        self.source = source or ''
+        # Détecte les textes sans variable (une syntaxe invalide échouera au rendu)
+        try:
+            parts = list(Formatter().parse(self.source))
+            self.variables = template_placeholders(self.source)
+        except ValueError:
+            parts = [(None, self.source, None, None)]
+            self.variables = None
+        self.is_static = all(field_name is None for _, field_name, _, _ in parts)
+        if self.is_static:
+            # Les accolades doublées ({{ }}) sont déjà résolues par l'analyse
+            self.source = ''.join(literal for literal, _, _, _ in parts)
+
+    def render(self, context):
+        if self.is_static:
+            return self.source
+        return self.source.format_map(context)
+
+
+class CompiledNotificationTemplate:
+    """Template de notification dont chaque canal est précompilé"""
+
+    def __init__(self, template):
+        self.id = template.id
+        self.name = template.name
+        self.notification_type = template.notification_type
+        self.texts = {field: CompiledText(getattr(template, field)) for field in TEMPLATE_FIELDS}
+
+    def has(self, field):
+        return bool(self.texts[field].source)
+
+    def render(self, field, context):
+        return self.texts[field].render(context)
+
+    def can_render_from(self, field, params):
+        """Indique si le texte peut être rendu plus tard à partir des seuls paramètres stockés"""
+        variables = self.texts[field].variables
+        return variables is not None and variables <= set(params)
+
+
+class NotificationTemplateRegistry:
+    """
+    Registre des templates de notification compilés, chargé une fois par processus.
+
+    Une version partagée dans le cache est incrémentée à chaque modification
+    d'un template: les autres processus rechargent leur registre dès qu'ils
+    constatent le changement (au plus tard après
+    NOTIFICATIONS['TEMPLATE_VERSION_CHECK_INTERVAL'] secondes). La version
+    n'est vue par les autres processus (workers Celery notamment) que si
+    CACHES['default'] est un cache partagé (Redis par défaut): avec un cache
+    local au processus, un template modifié reste servi par les autres
+    processus jusqu'à leur redémarrage.
+    """
+    VERSION_CACHE_KEY = 'notifications:templates_version'
+
+    def __init__(self):
+        self._templates = None
+        self._templates_by_id = {}
+        self._version = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    def _shared_version(self):
+        return cache.get_or_set(self.VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+
+    def _load(self):
+        from .models import NotificationTemplate
+
+        templates = {}
+        templates_by_id = {}
+        for template in NotificationTemplate.objects.order_by('-id'):
+            compiled = CompiledNotificationTemplate(template)
+            # En cas de doublon pour un type, le template le plus ancien l'emporte
+            templates[template.notification_type] = compiled
+            templates_by_id[template.id] = compiled
+        return templates, templates_by_id
+
+    def _ensure_loaded(self):
+        now = time.monotonic()
+        interval = settings.NOTIFICATIONS.get('TEMPLATE_VERSION_CHECK_INTERVAL', 5)
+
+        if self._templates is not None and now - self._checked_at < interval:
+            return
+
+        with self._lock:
+            version = self._shared_version()
+            if self._templates is None or version != self._version:
+                self._templates, self._templates_by_id = self._load()
+                self._version = version
+            self._checked_at = now
+
+    def get(self, notification_type):
+        """Retourne le template compilé d'un type de notification (ou None)"""
+        self._ensure_loaded()
+        return self._templates.get(notification_type)
+
+    def get_by_id(self, template_id):
+        """Retourne le template compilé d'après son identifiant (ou None)"""
+        self._ensure_loaded()
+        return self._templates_by_id.get(template_id)
+
+    def invalidate(self):
+        """Invalide le registre local et signale la modification aux autres processus"""
+        with self._lock:
+            self._templates = None
+            cache.set(self.VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+
+
+template_registry = NotificationTemplateRegistry()
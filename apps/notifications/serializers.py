@@ -1,15 +1,38 @@
 # notifications/serializers.py
 from rest_framework import serializers
 from .models import Notification, NotificationTemplate
+from .registry import TEMPLATE_FIELDS, validate_template_texts
 
 class NotificationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notification
         fields = '__all__'
-        read_only_fields = ['user', 'created_at', 'sent_at', 'read_at']
+        read_only_fields = ['user', 'created_at', 'sent_at', 'read_at', 'delivery_status', 'attempts', 'next_attempt_at', 'last_error']
+    
+    def to_representation(self, instance):
+        # Les notifications compactes sont rendues à partir de leur template
+        data = super().to_representation(instance)
+        data['title'] = instance.get_title()
+        data['message'] = instance.get_message()
+        return data
 
 class NotificationTemplateSerializer(serializers.ModelSerializer):
     class Meta:
         model = NotificationTemplate
         fields = '__all__'
-        read_only_fields = ['created_at', 'updated_at']
\ No newline at end of file
+        read_only_fields = ['created_at', 'updated_at']
+    
+    def validate(self, data):
+        # Vérifier les variables utilisées par rapport aux variables déclarées
+        def current(field):
+            if field in data:
+                return data[field]
+            return getattr(self.instance, field, '') if self.instance else ''
+        
+        errors = validate_template_texts(
+            {field: current(field) for field in TEMPLATE_FIELDS},
+            current('available_variables')
+        )
+        if errors:
+            raise serializers.ValidationError(errors)
+        return data
\ No newline at end of file
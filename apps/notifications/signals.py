@@ -0,0 +1,48 @@
+# apps/notifications/signals.py
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete
+from django.dispatch import receiver
+from apps.accounts.models import User
+from .badges import BadgeService
+from .models import Notification, NotificationTemplate, UnreadCounter
+from .realtime import publish_notifications
+from .registry import TEMPLATE_FIELDS, template_registry
+
+@receiver(post_save, sender=NotificationTemplate)
+@receiver(post_delete, sender=NotificationTemplate)
+def invalidate_template_registry(sender, instance, **kwargs):
+    """Invalide les templates compilés après une modification"""
+    template_registry.invalidate()
+
+@receiver(pre_save, sender=NotificationTemplate)
+def materialize_before_template_change(sender, instance, raw=False, **kwargs):
+    """Fige le texte des notifications compactes avant la modification de leur template"""
+    if raw or instance.pk is None:
+        return
+    
+    previous = NotificationTemplate.objects.filter(pk=instance.pk).first()
+    if previous and any(getattr(previous, field) != getattr(instance, field) for field in TEMPLATE_FIELDS + ('name',)):
+        Notification.materialize_for_template(previous)
+
+@receiver(pre_delete, sender=NotificationTemplate)
+def materialize_before_template_delete(sender, instance, **kwargs):
+    """Fige le texte des notifications compactes avant la suppression de leur template"""
+    Notification.materialize_for_template(instance)
+
+@receiver(post_save, sender=User)
+def create_unread_counter(sender, instance, created, raw=False, **kwargs):
+    """Crée les compteurs de non-lus des nouveaux utilisateurs"""
+    if created and not raw:
+        UnreadCounter.objects.get_or_create(user=instance)
+
+@receiver(post_save, sender=Notification)
+def count_created_notification(sender, instance, created, raw=False, **kwargs):
+    """Met à jour le badge et publie la notification créée (bulk_create est traité par l'appelant)"""
+    if created and not raw:
+        BadgeService.notifications_created([instance])
+        publish_notifications([instance])
+
+@receiver(post_delete, sender=Notification)
+def uncount_deleted_notification(sender, instance, **kwargs):
+    """Retire du badge une notification non lue supprimée"""
+    if BadgeService.is_counted(instance):
+        BadgeService.adjust('notifications', {instance.user_id: -1})
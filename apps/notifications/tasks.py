@@ -0,0 +1,13 @@
+from celery import shared_task
+from .badges import BadgeService
+from .dispatcher import OutboxDispatcher
+
+@shared_task
+def dispatch_notifications(channel=None):
+    """Envoie les notifications en attente (tous les canaux par défaut)"""
+    return OutboxDispatcher.dispatch(channels=[channel] if channel else None)
+
+@shared_task
+def reconcile_unread_counters():
+    """Recalcule les compteurs de non-lus de tous les utilisateurs"""
+    return len(BadgeService.reconcile())
@@ -0,0 +1,488 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+from django.conf import settings
+from io import StringIO
+from django.core import mail
+from django.core.management import call_command
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.accounts.models import User
+from . import transports
+from apps.user_messages.models import Conversation, ConversationReadState, Message
+from apps.user_messages.tasks import notify_message_recipients
+from .badges import BadgeService
+from .dispatcher import OutboxDispatcher
+from .models import Notification, NotificationTemplate, UnreadCounter
+from .realtime import InMemoryBroker, RedisBroker
+from .registry import NotificationTemplateRegistry
+
+REALTIME = {
+    'REALTIME_QUEUE_SIZE': 100,
+    'REALTIME_MAX_CONNECTIONS_PER_USER': 5,
+}
+
+@override_settings(NOTIFICATIONS=REALTIME)
+class RealtimeBrokerLoadTests(SimpleTestCase):
+    users = 500
+    connections_per_user = 2
+    events_per_user = 20
+
+    def test_fan_out_from_publisher_thread(self):
+        # Publication depuis un autre thread (comme une tâche) vers 1000 connexions ouvertes
+        broker = InMemoryBroker()
+        expected = self.events_per_user
+
+        async def run():
+            subscriptions = [
+                broker.subscribe(user_id)
+                for user_id in range(self.users)
+                for _ in range(self.connections_per_user)
+            ]
+
+            def publish():
+                for index in range(self.events_per_user):
+                    broker.publish([
+                        (user_id, {'event': 'notification', 'data': {'index': index}})
+                        for user_id in range(self.users)
+                    ])
+
+            started = time.perf_counter()
+            publisher = threading.Thread(target=publish)
+            publisher.start()
+
+            async def consume(subscription):
+                received = []
+                while len(received) < expected:
+                    received.append((await subscription.get(5))['data']['index'])
+                return received
+
+            results = await asyncio.gather(*(consume(subscription) for subscription in subscriptions))
+            publisher.join()
+            return results, time.perf_counter() - started, broker.connection_count()
+
+        results, elapsed, connections = asyncio.run(run())
+        self.assertEqual(connections, self.users * self.connections_per_user)
+        self.assertTrue(all(received == list(range(expected)) for received in results))
+        # 20 000 livraisons
+        self.assertLess(elapsed, 10)
+
+    def test_slow_consumer_resynchronized(self):
+        broker = InMemoryBroker()
+
+        async def run():
+            subscription = broker.subscribe(1)
+            broker.publish([(1, {'event': 'notification', 'data': {'index': index}}) for index in range(250)])
+            await asyncio.sleep(0)
+            return [await subscription.get(1) for _ in range(subscription.queue.qsize())]
+
+        received = asyncio.run(run())
+        self.assertLessEqual(len(received), REALTIME['REALTIME_QUEUE_SIZE'])
+        self.assertIn({'event': 'resync', 'data': {}}, received)
+
+    def test_connections_limited_per_user(self):
+        broker = InMemoryBroker()
+
+        async def run():
+            subscriptions = [broker.subscribe(1) for _ in range(7)]
+            await asyncio.sleep(0)
+            return subscriptions
+
+        subscriptions = asyncio.run(run())
+        self.assertEqual(broker.connection_count(), 5)
+        self.assertEqual([subscription.closed for subscription in subscriptions], [True, True] + [False] * 5)
+
+    def test_publish_without_open_stream_logged(self):
+        with self.assertLogs('apps', level='ERROR'):
+            InMemoryBroker().publish([(1, {'event': 'notification', 'data': {}})])
+
+    def test_redis_listener_closes_connections_on_reconnect(self):
+        clients = []
+
+        def connect(url):
+            client = mock.Mock(aclose=mock.AsyncMock())
+            client.pubsub.return_value = pubsub = mock.Mock(aclose=mock.AsyncMock())
+            if clients:
+                # Deuxième connexion: abonnement en attente jusqu'à l'annulation
+                pubsub.psubscribe = mock.AsyncMock(side_effect=lambda pattern: asyncio.Event().wait())
+            else:
+                pubsub.psubscribe = mock.AsyncMock(side_effect=ConnectionError('connexion perdue'))
+            clients.append(client)
+            return client
+
+        async def run():
+            task = asyncio.ensure_future(RedisBroker()._listen())
+            while len(clients) < 2:
+                await asyncio.sleep(0.05)
+            await asyncio.sleep(0)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        with mock.patch('redis.asyncio.Redis.from_url', side_effect=connect), self.assertLogs('apps', level='WARNING'):
+            asyncio.run(asyncio.wait_for(run(), 5))
+
+        self.assertEqual(len(clients), 2)
+        for client in clients:
+            client.pubsub.return_value.aclose.assert_awaited_once()
+            client.aclose.assert_awaited_once()
+
+class TemplateRegistryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.template = NotificationTemplate.objects.create(
+            name='Mise à jour',
+            notification_type='event_update',
+            in_app_title='Événement modifié',
+            in_app_body='{event_title} a été modifié.',
+            available_variables='event_title'
+        )
+        # Registre d'un autre processus: seul le cache est partagé
+        self.registry = NotificationTemplateRegistry()
+
+    def render(self):
+        template = self.registry.get('event_update')
+        return template.render('in_app_body', {'event_title': 'Concert'}) if template else None
+
+    def test_loaded_once(self):
+        self.assertEqual(self.render(), 'Concert a été modifié.')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.render(), 'Concert a été modifié.')
+
+    def test_stale_template_evicted_after_check_interval(self):
+        self.assertEqual(self.render(), 'Concert a été modifié.')
+        self.template.in_app_body = '{event_title} change de date.'
+        self.template.save()
+
+        # Version vérifiée au plus une fois par intervalle
+        self.assertEqual(self.render(), 'Concert a été modifié.')
+        with override_settings(NOTIFICATIONS=dict(settings.NOTIFICATIONS, TEMPLATE_VERSION_CHECK_INTERVAL=0)):
+            self.assertEqual(self.render(), 'Concert change de date.')
+
+    def test_deleted_template_evicted(self):
+        self.assertIsNotNone(self.registry.get('event_update'))
+        self.template.delete()
+        with override_settings(NOTIFICATIONS=dict(settings.NOTIFICATIONS, TEMPLATE_VERSION_CHECK_INTERVAL=0)):
+            self.assertIsNone(self.registry.get('event_update'))
+            self.assertIsNone(self.registry.get_by_id(self.template.id))
+
+OUTBOX = dict(
+    settings.NOTIFICATIONS,
+    OUTBOX_CHANNELS={'sms': {'BATCH_SIZE': 2, 'MAX_IN_FLIGHT': 3}},
+    OUTBOX_MAX_ATTEMPTS=3,
+    OUTBOX_RETRY_BASE_DELAY=60,
+    OUTBOX_RETRY_MAX_DELAY=200,
+    TRANSPORTS={
+        'email': 'apps.notifications.transports.EmailTransport',
+        'sms': 'apps.notifications.transports.LocMemTransport',
+        'push': 'apps.notifications.transports.ConsoleTransport',
+    },
+)
+
+class FailingTransport(transports.BaseTransport):
+    def send_messages(self, notifications):
+        return ['Passerelle indisponible'] * len(notifications)
+
+@override_settings(NOTIFICATIONS=OUTBOX, EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class OutboxDispatcherTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        OutboxDispatcher._transports.clear()
+        transports.outbox.clear()
+        self.addCleanup(OutboxDispatcher._transports.clear)
+        self.user = User.objects.create_user(email='user@example.com', username='user', password='x')
+        self.now = timezone.now()
+
+    def queue(self, channel='sms', count=1, **fields):
+        fields.setdefault('next_attempt_at', self.now - timedelta(seconds=1))
+        fields.setdefault('delivery_status', 'pending')
+        return Notification.objects.bulk_create([
+            Notification(
+                user=self.user, channel=channel, notification_type='system_message',
+                title=f'Titre {index}', message=f'Message {index}', phone_number='+237600000000', **fields
+            )
+            for index in range(count)
+        ])
+
+    def test_claim_batch(self):
+        due = self.queue(count=2)
+        self.queue(next_attempt_at=self.now + timedelta(hours=1))
+        self.queue(delivery_status='sent', next_attempt_at=None)
+
+        claimed = OutboxDispatcher.claim_batch('sms')
+        self.assertEqual({notification.id for notification in claimed}, {notification.id for notification in due})
+        for notification in claimed:
+            self.assertEqual((notification.delivery_status, notification.attempts), ('sending', 1))
+            self.assertGreater(notification.next_attempt_at, self.now)
+
+        # Lot réservé: il n'est pas proposé à un autre worker avant l'expiration de la réservation
+        self.assertEqual(OutboxDispatcher.claim_batch('sms'), [])
+
+    def test_claim_limited_by_batch_size_and_in_flight(self):
+        self.queue(count=6)
+        self.assertEqual(len(OutboxDispatcher.claim_batch('sms')), 2)
+        # 2 envois en cours, 3 au maximum
+        self.assertEqual(len(OutboxDispatcher.claim_batch('sms')), 1)
+        self.assertEqual(OutboxDispatcher.claim_batch('sms'), [])
+
+    def test_expired_lease_reclaimed(self):
+        self.queue()
+        OutboxDispatcher.claim_batch('sms')
+        Notification.objects.update(next_attempt_at=self.now - timedelta(seconds=1))
+        claimed = OutboxDispatcher.claim_batch('sms')
+        self.assertEqual([notification.attempts for notification in claimed], [2])
+
+    def test_retry_delay_exponential(self):
+        self.assertEqual(
+            [OutboxDispatcher.retry_delay(attempts).total_seconds() for attempts in range(1, 5)],
+            [60, 120, 200, 200]
+        )
+
+    def test_failed_delivery_retried_then_dead_lettered(self):
+        notification, = self.queue()
+        OutboxDispatcher._transports['sms'] = FailingTransport()
+
+        for attempt in range(1, 3):
+            claimed = OutboxDispatcher.claim_batch('sms')
+            self.assertEqual(OutboxDispatcher.deliver_batch('sms', claimed), 0)
+            notification.refresh_from_db()
+            self.assertEqual((notification.delivery_status, notification.attempts), ('pending', attempt))
+            self.assertEqual(notification.last_error, 'Passerelle indisponible')
+            delay = notification.next_attempt_at - timezone.now()
+            self.assertAlmostEqual(delay.total_seconds(), OutboxDispatcher.retry_delay(attempt).total_seconds(), delta=5)
+            # Prochaine tentative échue
+            Notification.objects.update(next_attempt_at=self.now)
+
+        with self.assertLogs('apps', level='ERROR'):
+            OutboxDispatcher.deliver_batch('sms', OutboxDispatcher.claim_batch('sms'))
+        notification.refresh_from_db()
+        self.assertEqual((notification.delivery_status, notification.attempts), ('dead', 3))
+        self.assertIsNone(notification.next_attempt_at)
+        self.assertEqual(OutboxDispatcher.claim_batch('sms'), [])
+
+        metrics = OutboxDispatcher.get_metrics()['sms']
+        self.assertEqual((metrics['dead'], metrics['failed_attempts'], metrics['dead_lettered']), (1, 2, 1))
+
+    def test_dispatch_through_stand_in_transports(self):
+        self.queue('sms', count=3)
+        self.queue('email', count=2)
+        self.queue('push')
+
+        with self.assertLogs('apps', level='INFO') as logs:
+            sent = OutboxDispatcher.dispatch()
+        self.assertEqual(sent, {'email': 2, 'sms': 3, 'push': 1})
+        self.assertFalse(Notification.objects.exclude(delivery_status='sent').exists())
+        self.assertTrue(all(Notification.objects.values_list('is_sent', flat=True)))
+
+        # SMS factices en mémoire, emails par le backend local, push dans les journaux
+        self.assertEqual(sorted(message['message'] for message in transports.outbox), ['Message 0', 'Message 1', 'Message 2'])
+        self.assertTrue(all(message['phone_number'] == '+237600000000' for message in transports.outbox))
+        self.assertEqual([message.to for message in mail.outbox], [['user@example.com']] * 2)
+        self.assertTrue(any('[push]' in line for line in logs.output))
+
+    def test_file_transport(self):
+        notifications = self.queue(count=2)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'notifications.log')
+            with override_settings(NOTIFICATIONS=dict(OUTBOX, TRANSPORT_FILE_PATH=path)):
+                self.assertEqual(transports.FileTransport().send_messages(notifications), [None, None])
+                transports.FileTransport().send_messages(notifications[:1])
+            with open(path, encoding='utf-8') as stream:
+                lines = [json.loads(line) for line in stream]
+        self.assertEqual([line['title'] for line in lines], ['Titre 0', 'Titre 1', 'Titre 0'])
+        self.assertTrue(all(line['channel'] == 'sms' and line['sent_at'] for line in lines))
+
+    def test_schedule_after_commit(self):
+        with mock.patch('apps.notifications.tasks.dispatch_notifications.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                OutboxDispatcher.schedule()
+                delay.assert_not_called()
+            delay.assert_called_once_with()
+
+class BadgeCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='user@example.com', username='user', password='x')
+        self.contact = User.objects.create_user(email='contact@example.com', username='contact', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def notify(self, count=1, **fields):
+        fields = dict({'channel': 'in_app', 'notification_type': 'system_message'}, **fields)
+        return [
+            Notification.objects.create(user=self.user, title='Titre', message='Message', **fields)
+            for _ in range(count)
+        ]
+
+    def counters(self):
+        counter = UnreadCounter.objects.get(user=self.user)
+        return {'notifications': counter.notifications, 'messages': counter.messages}
+
+    def assert_counters(self, notifications, messages):
+        counters = self.counters()
+        self.assertEqual(counters, {'notifications': notifications, 'messages': messages})
+        # Les compteurs maintenus à l'écriture égalent le recalcul complet
+        self.assertEqual(BadgeService.reconcile([self.user.pk])[self.user.pk], counters)
+
+    def test_notification_counter(self):
+        first, second, third = self.notify(3)
+        self.notify(channel='email')
+        self.notify(is_read=True)
+        self.assert_counters(3, 0)
+
+        for _ in range(2):
+            self.assertEqual(self.client.post(f'/api/notifications/{first.pk}/mark_as_read/').status_code, 200)
+        self.assert_counters(2, 0)
+
+        second.delete()
+        self.assertEqual(self.client.delete(f'/api/notifications/{first.pk}/').status_code, 204)
+        self.assert_counters(1, 0)
+
+        Notification.objects.bulk_create([
+            Notification(user=self.user, title='Titre', message='Message', channel='in_app', notification_type='system_message')
+            for _ in range(2)
+        ])
+        BadgeService.notifications_created(Notification.objects.filter(user=self.user, is_read=False).exclude(pk=third.pk))
+        self.assert_counters(3, 0)
+
+        self.client.post('/api/notifications/mark_all_as_read/')
+        self.assert_counters(0, 0)
+
+    def test_message_counted_once(self):
+        conversation = Conversation.objects.create()
+        conversation.participants.add(self.user, self.contact)
+        messages = [
+            Message.objects.create(conversation=conversation, sender=self.contact, content=f'Message {index}')
+            for index in range(2)
+        ]
+        Message.objects.create(conversation=conversation, sender=self.user, content='Réponse')
+        for message in messages:
+            notify_message_recipients(message.id)
+        self.notify()
+
+        # Deux messages non lus et leurs notifications: comptés une seule fois
+        self.assertEqual(Notification.objects.filter(user=self.user, notification_type='new_message').count(), 2)
+        self.assert_counters(1, 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            cache.delete(BadgeService._cache_key(self.user.pk))
+        self.assertEqual(self.client.get('/api/notifications/unread_count/').data, {
+            'notifications': 1, 'messages': 2, 'total': 3
+        })
+
+        # Lire une notification de message ne modifie pas le badge des notifications
+        message_notification = Notification.objects.filter(user=self.user, notification_type='new_message').first()
+        self.client.post(f'/api/notifications/{message_notification.pk}/mark_as_read/')
+        self.assert_counters(1, 2)
+
+        ConversationReadState.mark_read(self.user.pk, conversation.pk, messages[0].pk)
+        self.assert_counters(1, 1)
+        messages[1].delete()
+        self.assert_counters(1, 0)
+
+        Notification.objects.filter(user=self.user, notification_type='new_message').delete()
+        self.client.post('/api/notifications/mark_all_as_read/')
+        self.assert_counters(0, 0)
+
+    def test_reconcile_repairs_drift(self):
+        self.notify(2)
+        UnreadCounter.objects.filter(user=self.user).update(notifications=50, messages=7)
+        self.assertEqual(BadgeService.reconcile([self.user.pk]), {self.user.pk: {'notifications': 2, 'messages': 0}})
+        self.assertEqual(self.counters(), {'notifications': 2, 'messages': 0})
+
+        # Compteur absent: recréé à la première variation
+        UnreadCounter.objects.filter(user=self.user).delete()
+        self.notify()
+        self.assertEqual(self.counters(), {'notifications': 3, 'messages': 0})
+
+class CompactNotificationsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='user@example.com', username='user', password='x')
+        self.template = NotificationTemplate.objects.create(
+            name='Mise à jour',
+            notification_type='event_update',
+            email_subject='{event_title} modifié',
+            email_body='Bonjour, {event_title} a été modifié.',
+            sms_body='{event_title}: nouvelle date.',
+            push_title='{event_title}',
+            push_body='Nouvelle date pour {event_title}',
+            in_app_title='Événement modifié',
+            in_app_body='{event_title} a été modifié.',
+            available_variables='event_title'
+        )
+        context = {'event_title': 'Concert'}
+        rows = [
+            # Textes identiques au rendu du template: compactables
+            ('in_app', 'event_update', 'Événement modifié', 'Concert a été modifié.', '', context),
+            ('email', 'event_update', 'Concert modifié', 'Bonjour, Concert a été modifié.', 'Concert modifié', context),
+            ('sms', 'event_update', 'SMS Notification', 'Concert: nouvelle date.', '', context),
+            ('push', 'event_update', 'Concert', 'Nouvelle date pour Concert', '', context),
+            # Textes personnalisés, paramètres manquants ou sans template: conservés
+            ('in_app', 'event_update', 'Événement modifié', 'Texte personnalisé', '', context),
+            ('in_app', 'event_update', 'Événement modifié', 'Concert a été modifié.', '', {}),
+            ('in_app', 'system_message', 'Maintenance', 'Service interrompu ce soir.', '', {}),
+        ]
+        self.notifications = Notification.objects.bulk_create([
+            Notification(
+                user=self.user, channel=channel, notification_type=notification_type, title=title,
+                message=message, email_subject=email_subject, extra_data=extra_data
+            )
+            for channel, notification_type, title, message, email_subject, extra_data in rows
+        ])
+
+    def rendered(self):
+        return {
+            notification.pk: (notification.get_title(), notification.get_message(), notification.get_email_subject())
+            for notification in Notification.objects.all()
+        }
+
+    def stored(self):
+        return dict(Notification.objects.values_list('pk', 'title'))
+
+    def compact(self, *args):
+        output = StringIO()
+        call_command('compact_notifications', *args, stdout=output)
+        return output.getvalue()
+
+    def test_compacted_rows_render_identically(self):
+        before = self.rendered()
+        self.assertIn('4/7', self.compact('--batch-size', '2'))
+
+        compacted = Notification.objects.filter(template=self.template)
+        self.assertEqual(
+            set(compacted.values_list('pk', flat=True)),
+            {notification.pk for notification in self.notifications[:4]}
+        )
+        self.assertFalse(compacted.exclude(title='', message='', email_subject='').exists())
+        self.assertEqual(self.rendered(), before)
+
+        # Idempotente: une seconde exécution ne modifie rien
+        stored = self.stored()
+        self.assertIn('0/3', self.compact())
+        self.assertEqual(self.stored(), stored)
+        self.assertEqual(self.rendered(), before)
+
+    def test_dry_run(self):
+        stored = self.stored()
+        self.assertIn('[simulation]', self.compact('--dry-run'))
+        self.assertEqual(self.stored(), stored)
+        self.assertFalse(Notification.objects.filter(template__isnull=False).exists())
+
+    def test_template_change_materializes_compacted_rows(self):
+        before = self.rendered()
+        self.compact()
+
+        self.template.in_app_body = '{event_title} est reporté.'
+        self.template.save()
+        self.assertEqual(self.rendered(), before)
+        self.assertFalse(Notification.objects.filter(title='').exists())
+
+        self.template.delete()
+        self.assertEqual(self.rendered(), before)
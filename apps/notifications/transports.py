@@ -0,0 +1,91 @@
+# notifications/transports.py
+import json
+import logging
+import threading
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+logger = logging.getLogger('apps')
+
+# Messages reçus par LocMemTransport (équivalent de django.core.mail.outbox)
+outbox = []
+_outbox_lock = threading.Lock()
+
+class BaseTransport:
+    """
+    Transport d'un canal de notification.
+
+    send_messages reçoit un lot de notifications et renvoie, dans le même ordre,
+    None pour chaque envoi réussi ou le message d'erreur de l'échec.
+    """
+
+    def send_messages(self, notifications):
+        raise NotImplementedError
+
+    @staticmethod
+    def payload(notification):
+        """Représentation sérialisable d'une notification"""
+        return {
+            'id': str(notification.id),
+            'channel': notification.channel,
+            'user_id': str(notification.user_id),
+            'phone_number': notification.phone_number,
+            'title': notification.get_title(),
+            'message': notification.get_message(),
+        }
+
+class EmailTransport(BaseTransport):
+    """
+    Envoi par le backend email de Django sur une connexion unique par lot.
+
+    Les backends console et fichier de Django servent de substituts locaux au SMTP.
+    """
+
+    def send_messages(self, notifications):
+        results = []
+        connection = get_connection()
+        connection.open()
+        try:
+            for notification in notifications:
+                message = EmailMessage(
+                    subject=notification.get_email_subject(),
+                    body=notification.get_message(),
+                    to=[notification.user.email],
+                    connection=connection
+                )
+                try:
+                    sent = connection.send_messages([message])
+                    results.append(None if sent else "Message refusé par le backend email")
+                except Exception as e:
+                    results.append(str(e))
+        finally:
+            connection.close()
+        return results
+
+class ConsoleTransport(BaseTransport):
+    """Écrit les messages dans les journaux (SMS et push en développement)"""
+
+    def send_messages(self, notifications):
+        for notification in notifications:
+            logger.info(f"[{notification.channel}] {json.dumps(self.payload(notification), ensure_ascii=False)}")
+        return [None] * len(notifications)
+
+class FileTransport(BaseTransport):
+    """Ajoute les messages, un objet JSON par ligne, au fichier NOTIFICATIONS['TRANSPORT_FILE_PATH']"""
+
+    def send_messages(self, notifications):
+        path = settings.NOTIFICATIONS.get('TRANSPORT_FILE_PATH', 'notifications.log')
+        sent_at = timezone.now().isoformat()
+        with open(path, 'a', encoding='utf-8') as stream:
+            for notification in notifications:
+                stream.write(json.dumps(dict(self.payload(notification), sent_at=sent_at), ensure_ascii=False) + '\n')
+        return [None] * len(notifications)
+
+class LocMemTransport(BaseTransport):
+    """Passerelle factice conservant les messages en mémoire dans transports.outbox (tests)"""
+
+    def send_messages(self, notifications):
+        with _outbox_lock:
+            outbox.extend(self.payload(notification) for notification in notifications)
+        return [None] * len(notifications)
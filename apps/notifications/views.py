@@ -4,8 +4,14 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from .models import Notification, NotificationTemplate
 from .serializers import NotificationSerializer, NotificationTemplateSerializer
+from .dispatcher import OutboxDispatcher
+from .badges import BadgeService
+from .realtime import format_event, get_broker
 from apps.core.permissions import IsAdminOrReadOnly
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
+import asyncio
 
 class NotificationViewSet(viewsets.ModelViewSet):
     queryset = Notification.objects.all()
@@ -29,22 +35,118 @@ class NotificationViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        notification.is_read = True
-        notification.read_at = timezone.now()
-        notification.save()
+        # Mise à jour conditionnelle: le badge n'est décrémenté qu'une fois
+        updated = Notification.objects.filter(pk=notification.pk, is_read=False).update(
+            is_read=True,
+            read_at=timezone.now()
+        )
+        if updated and BadgeService.is_counted(notification):
+            BadgeService.adjust('notifications', {request.user.pk: -1})
         
         return Response({'success': True})
     
     @action(detail=False, methods=['post'])
     def mark_all_as_read(self, request):
-        Notification.objects.filter(user=request.user, is_read=False).update(
-            is_read=True,
-            read_at=timezone.now()
-        )
+        now = timezone.now()
+        unread = Notification.objects.filter(user=request.user, is_read=False)
+        
+        # Seules les notifications in-app (hors nouveaux messages) comptent dans le badge
+        read_in_app = BadgeService.counted(unread).update(is_read=True, read_at=now)
+        unread.update(is_read=True, read_at=now)
+        BadgeService.adjust('notifications', {request.user.pk: -read_in_app})
         
         return Response({'success': True})
+    
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        """Compteurs de non-lus (notifications et messages) pour les badges"""
+        return Response(BadgeService.get_counts(request.user.pk))
+    
+    def perform_update(self, serializer):
+        # is_read peut être modifié directement: recalculer le badge du destinataire
+        notification = serializer.save()
+        BadgeService.reconcile([notification.user_id])
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def outbox_stats(self, request):
+        """État de la file d'envoi et débit par canal"""
+        return Response(OutboxDispatcher.get_metrics())
 
 class NotificationTemplateViewSet(viewsets.ModelViewSet):
     queryset = NotificationTemplate.objects.all()
     serializer_class = NotificationTemplateSerializer
-    permission_classes = [permissions.IsAuthenticated, IsAdminOrReadOnly]
\ No newline at end of file
+    permission_classes = [permissions.IsAuthenticated, IsAdminOrReadOnly]
+
+def _stream_token(request):
+    """Jeton JWT validé (en-tête Authorization ou paramètre token), None s'il est absent ou invalide"""
+    from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+    from apps.accounts.authentication import LazyJWTAuthentication
+    
+    authentication = LazyJWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else request.GET.get('token')
+    if not raw_token:
+        return None
+    
+    try:
+        return authentication.get_validated_token(raw_token)
+    except (InvalidToken, TokenError):
+        return None
+
+def _stream_user_id(token):
+    """
+    Identifiant de l'utilisateur du jeton, None si le jeton a été révoqué ou
+    le compte désactivé (contrôles de LazyJWTAuthentication, via UserCache)
+    """
+    from rest_framework.exceptions import AuthenticationFailed
+    from apps.accounts.authentication import LazyJWTAuthentication
+    
+    try:
+        return LazyJWTAuthentication().get_user(token).pk
+    except AuthenticationFailed:
+        return None
+
+async def notification_stream(request):
+    """
+    Flux Server-Sent Events des notifications et messages de l'utilisateur.
+    
+    Les navigateurs (EventSource) ne pouvant pas envoyer d'en-tête, le jeton
+    d'accès peut être passé en paramètre: /api/realtime/events/?token=<jeton>
+    Le jeton est contrôlé à nouveau à chaque message de maintien: le flux est
+    fermé après une révocation ou la désactivation du compte.
+    """
+    from asgiref.sync import sync_to_async
+    
+    token = _stream_token(request)
+    user_id = await sync_to_async(_stream_user_id)(token) if token is not None else None
+    if user_id is None:
+        return JsonResponse({'detail': 'Authentification requise.'}, status=401)
+    
+    counts = await sync_to_async(BadgeService.get_counts)(user_id)
+    broker = get_broker()
+    subscription = broker.subscribe(user_id)
+    heartbeat = settings.NOTIFICATIONS.get('REALTIME_HEARTBEAT_INTERVAL', 15)
+    
+    async def stream():
+        try:
+            yield format_event('badges', counts)
+            while True:
+                try:
+                    message = await subscription.get(heartbeat)
+                except asyncio.TimeoutError:
+                    if await sync_to_async(_stream_user_id)(token) is None:
+                        break
+                    # Commentaire SSE: maintient la connexion ouverte à travers les proxies
+                    yield ': ping\n\n'
+                    continue
+                if message is None:
+                    break
+                yield format_event(message['event'], message['data'])
+        finally:
+            broker.unsubscribe(subscription)
+    
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
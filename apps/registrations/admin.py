@@ -1,17 +1,23 @@
 from django.contrib import admin
-from .models import Registration, TicketType, TicketPurchase, Discount
+from .models import Registration, TicketType, TicketPurchase, Discount, FormFieldAnswer
 
 class TicketPurchaseInline(admin.TabularInline):
     model = TicketPurchase
     extra = 0
     readonly_fields = ('qr_code', 'is_checked_in', 'checked_in_at')
 
+class FormFieldAnswerInline(admin.TabularInline):
+    model = FormFieldAnswer
+    extra = 0
+    fields = ('field', 'value_text', 'value_number')
+    readonly_fields = ('field', 'value_text', 'value_number')
+
 class RegistrationAdmin(admin.ModelAdmin):
     list_display = ('reference_code', 'event', 'user', 'registration_type', 'status', 'created_at')
     list_filter = ('registration_type', 'status')
     search_fields = ('reference_code', 'event__title', 'user__email', 'user__username')
     readonly_fields = ('reference_code', 'created_at', 'updated_at', 'confirmed_at')
-    inlines = [TicketPurchaseInline]
+    inlines = [TicketPurchaseInline, FormFieldAnswerInline]
     fieldsets = (
         ('Informations générales', {'fields': ('reference_code', 'event', 'user', 'registration_type', 'status')}),
         ('Dates', {'fields': ('created_at', 'updated_at', 'confirmed_at')}),
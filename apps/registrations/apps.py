@@ -0,0 +1,11 @@
+# apps/registrations/apps.py
+from django.apps import AppConfig
+
+
+class RegistrationsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.registrations'
+    verbose_name = "Inscriptions"
+
+    def ready(self):
+        import apps.registrations.signals
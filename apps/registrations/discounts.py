@@ -0,0 +1,151 @@
+# registrations/discounts.py
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import Discount, TicketType
+
+class DiscountService:
+    """
+    Vérification et utilisation des codes promo.
+
+    La définition d'un code (événement, réduction, période, plafond, types de
+    billets concernés) est lue en une requête sur l'index unique de code et
+    mise en cache, y compris l'absence de code; le cache est invalidé à chaque
+    modification du code (voir signals). Le plafond d'utilisation n'est
+    contrôlé définitivement qu'au moment de l'utilisation, par une mise à jour
+    conditionnelle atomique: times_used ne dépasse jamais max_uses.
+    """
+
+    # Valeur mise en cache pour un code inexistant
+    MISSING = 'missing'
+
+    @staticmethod
+    def _cache_key(code):
+        return f"discount:{code}"
+
+    @staticmethod
+    def normalize(code):
+        return code.strip() if isinstance(code, str) else ''
+
+    @staticmethod
+    def lookup(code):
+        """Définition du code promo (dictionnaire), None s'il n'existe pas"""
+        code = DiscountService.normalize(code)
+        if not code:
+            return None
+
+        cache_key = DiscountService._cache_key(code)
+        definition = cache.get(cache_key)
+        if definition is None:
+            rows = list(Discount.objects.filter(code=code).values(
+                'id', 'code', 'event_id', 'discount_type', 'value', 'valid_from', 'valid_until',
+                'max_uses', 'times_used', 'applicable_ticket_types'
+            ))
+            if rows:
+                definition = {key: value for key, value in rows[0].items() if key != 'applicable_ticket_types'}
+                definition['ticket_types'] = {
+                    row['applicable_ticket_types'] for row in rows if row['applicable_ticket_types'] is not None
+                }
+            else:
+                definition = DiscountService.MISSING
+            cache.set(cache_key, definition, settings.REGISTRATIONS.get('DISCOUNT_CACHE_TIMEOUT', 60))
+
+        return None if definition == DiscountService.MISSING else definition
+
+    @staticmethod
+    def invalidate(code):
+        """Supprime la définition en cache après la validation de la transaction"""
+        if code:
+            cache_key = DiscountService._cache_key(code)
+            transaction.on_commit(lambda: cache.delete(cache_key))
+
+    @staticmethod
+    def check(definition, event_id, now=None):
+        """Message d'erreur si le code ne peut pas être utilisé pour l'événement, sinon None"""
+        if definition is None or str(definition['event_id']) != str(event_id):
+            return "Code invalide."
+
+        now = now or timezone.now()
+        if not definition['valid_from'] <= now <= definition['valid_until']:
+            return "Ce code n'est plus valide."
+        if definition['max_uses'] and definition['times_used'] >= definition['max_uses']:
+            return "Ce code n'est plus valide."
+        return None
+
+    @staticmethod
+    def line_discount(definition, ticket_type_id, unit_price, quantity):
+        """Réduction accordée sur une ligne (0 si le type de billet n'est pas concerné), au plus son montant"""
+        if definition['ticket_types'] and ticket_type_id not in definition['ticket_types']:
+            return Decimal('0.00')
+
+        if definition['discount_type'] == 'percentage':
+            amount = unit_price * definition['value'] / 100 * quantity
+        else:  # montant fixe
+            amount = definition['value'] * quantity
+        return min(amount, unit_price * quantity).quantize(Decimal('0.01'))
+
+    @staticmethod
+    def validate(code, event_id, lines):
+        """
+        Vérifie un code promo pour un événement et des lignes de commande
+        [(type de billet, quantité)], sans l'utiliser. Les prix sont lus en
+        une requête.
+        """
+        definition = DiscountService.lookup(code)
+        error = DiscountService.check(definition, event_id)
+        if error:
+            return {'valid': False, 'message': error}
+
+        quantities = {}
+        for ticket_type_id, quantity in lines:
+            quantities[ticket_type_id] = quantities.get(ticket_type_id, 0) + quantity
+        prices = dict(TicketType.objects.filter(
+            event_id=event_id,
+            pk__in=quantities
+        ).values_list('id', 'price'))
+
+        results = []
+        for ticket_type_id, quantity in quantities.items():
+            if ticket_type_id not in prices:
+                continue
+            amount = DiscountService.line_discount(definition, ticket_type_id, prices[ticket_type_id], quantity)
+            results.append({'ticket_type': ticket_type_id, 'quantity': quantity, 'discount_amount': amount})
+
+        total = sum((line['discount_amount'] for line in results), Decimal('0'))
+        if lines and not total:
+            return {'valid': False, 'message': "Ce code ne s'applique à aucun des billets sélectionnés."}
+
+        return {
+            'valid': True,
+            'discount': {
+                'code': DiscountService.normalize(code),
+                'discount_type': definition['discount_type'],
+                'value': definition['value']
+            },
+            'lines': results,
+            'total_discount': total
+        }
+
+    @staticmethod
+    def redeem(definition, uses=1):
+        """
+        Utilise le code: incrément atomique de times_used, refusé si le code
+        a expiré ou si le plafond serait dépassé. Retourne True en cas de succès.
+        """
+        now = timezone.now()
+        redeemed = Discount.objects.filter(
+            pk=definition['id'],
+            code=definition['code'],
+            valid_from__lte=now,
+            valid_until__gte=now
+        ).filter(
+            Q(max_uses=0) | Q(times_used__lte=F('max_uses') - uses)
+        ).update(times_used=F('times_used') + uses) > 0
+
+        if redeemed and definition['max_uses']:
+            # Le compteur en cache ne sert qu'aux vérifications préalables
+            DiscountService.invalidate(definition['code'])
+        return redeemed
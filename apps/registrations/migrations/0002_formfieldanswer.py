@@ -0,0 +1,30 @@
+# Generated by Django 5.1.7 on 2026-10-19 05:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0001_initial'),
+        ('registrations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FormFieldAnswer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.JSONField(blank=True, null=True)),
+                ('value_text', models.CharField(blank=True, max_length=255)),
+                ('value_number', models.FloatField(blank=True, null=True)),
+                ('field', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='events.customformfield')),
+                ('registration', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='registrations.registration')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['field', 'value_text'], name='registratio_field_i_5720aa_idx'), models.Index(fields=['field', 'value_number'], name='registratio_field_i_93c7cc_idx')],
+                'unique_together': {('registration', 'field')},
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.1.7 on 2026-10-19 05:46
+
+from django.db import migrations
+
+
+def backfill_form_answers(apps, schema_editor):
+    """Crée les réponses normalisées à partir des données JSON existantes"""
+    Registration = apps.get_model('registrations', 'Registration')
+    CustomFormField = apps.get_model('events', 'CustomFormField')
+    FormFieldAnswer = apps.get_model('registrations', 'FormFieldAnswer')
+
+    fields_by_event = {}
+    for field in CustomFormField.objects.all():
+        fields_by_event.setdefault(field.event_id, []).append(field)
+
+    registrations = Registration.objects.filter(
+        registration_type='inscription'
+    ).values_list('id', 'event_id', 'form_data')
+
+    batch = []
+    for registration_id, event_id, form_data in registrations.iterator(chunk_size=2000):
+        form_data = form_data or {}
+        for field in fields_by_event.get(event_id, []):
+            if field.label not in form_data:
+                continue
+
+            value = form_data[field.label]
+            if isinstance(value, list):
+                value_text = ', '.join(str(item) for item in value)
+            elif value is None:
+                value_text = ''
+            else:
+                value_text = str(value)
+
+            value_number = None
+            if field.field_type == 'number':
+                try:
+                    value_number = float(value)
+                except (TypeError, ValueError):
+                    pass
+
+            batch.append(FormFieldAnswer(
+                registration_id=registration_id,
+                field_id=field.id,
+                value=value,
+                value_text=value_text[:255],
+                value_number=value_number
+            ))
+
+        if len(batch) >= 5000:
+            FormFieldAnswer.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+
+    if batch:
+        FormFieldAnswer.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registrations', '0002_formfieldanswer'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_form_answers, migrations.RunPython.noop),
+    ]
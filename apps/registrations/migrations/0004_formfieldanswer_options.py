@@ -0,0 +1,52 @@
+# Generated by Django 5.1.7 on 2026-10-19 06:51
+
+from django.db import migrations
+
+
+def split_multiple_answers(apps, schema_editor):
+    """Remplace les réponses multiples (valeurs jointes) par une ligne par option"""
+    FormFieldAnswer = apps.get_model('registrations', 'FormFieldAnswer')
+
+    replaced, batch = [], []
+    for answer in FormFieldAnswer.objects.iterator(chunk_size=2000):
+        if not isinstance(answer.value, list):
+            continue
+
+        replaced.append(answer.pk)
+        seen = set()
+        for item in answer.value:
+            value_text = '' if item is None else str(item)[:255]
+            if value_text in seen:
+                continue
+            seen.add(value_text)
+            batch.append(FormFieldAnswer(
+                registration_id=answer.registration_id,
+                field_id=answer.field_id,
+                value=item,
+                value_text=value_text
+            ))
+
+        if len(replaced) >= 2000:
+            FormFieldAnswer.objects.filter(pk__in=replaced).delete()
+            FormFieldAnswer.objects.bulk_create(batch, ignore_conflicts=True)
+            replaced, batch = [], []
+
+    if replaced:
+        FormFieldAnswer.objects.filter(pk__in=replaced).delete()
+        FormFieldAnswer.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0001_initial'),
+        ('registrations', '0003_backfill_form_answers'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='formfieldanswer',
+            unique_together={('registration', 'field', 'value_text')},
+        ),
+        migrations.RunPython(split_multiple_answers, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,6 @@
 from django.db import models
 from apps.accounts.models import User
-from apps.events.models import Event
+from apps.events.models import Event, CustomFormField
 import uuid
 
 class TicketType(models.Model):
@@ -104,6 +104,76 @@ class Registration(models.Model):
     def __str__(self):
         return f"{self.reference_code} - {self.event.title}"
 
+class FormFieldAnswer(models.Model):
+    """
+    Réponse normalisée à un champ de formulaire personnalisé: une ligne par
+    inscription et par champ, ou par option cochée pour une réponse multiple
+    (cases à cocher).
+    """
+    registration = models.ForeignKey(Registration, on_delete=models.CASCADE, related_name='answers')
+    field = models.ForeignKey(CustomFormField, on_delete=models.CASCADE, related_name='answers')
+    
+    # Valeur brute et valeurs typées indexées pour le filtrage
+    value = models.JSONField(null=True, blank=True)
+    value_text = models.CharField(max_length=255, blank=True)
+    value_number = models.FloatField(null=True, blank=True)
+    
+    class Meta:
+        unique_together = ('registration', 'field', 'value_text')
+        indexes = [
+            models.Index(fields=['field', 'value_text']),
+            models.Index(fields=['field', 'value_number']),
+        ]
+    
+    @staticmethod
+    def build_answers(registration, fields, form_data):
+        """Construit (sans les enregistrer) les réponses normalisées d'une inscription"""
+        answers = []
+        form_data = form_data or {}
+        
+        for field in fields:
+            if field.label not in form_data:
+                continue
+            
+            value = form_data[field.label]
+            seen = set()
+            for item in (value if isinstance(value, list) else [value]):
+                value_text = '' if item is None else str(item)[:255]
+                if value_text in seen:
+                    continue
+                seen.add(value_text)
+                
+                value_number = None
+                if field.field_type == 'number':
+                    try:
+                        value_number = float(item)
+                    except (TypeError, ValueError):
+                        pass
+                
+                answers.append(FormFieldAnswer(
+                    registration=registration,
+                    field=field,
+                    value=item,
+                    value_text=value_text,
+                    value_number=value_number
+                ))
+        
+        return answers
+    
+    @staticmethod
+    def rebuild(registration):
+        """Remplace les réponses normalisées d'une inscription par celles de ses données de formulaire"""
+        registration.answers.all().delete()
+        if registration.registration_type == 'inscription':
+            FormFieldAnswer.objects.bulk_create(FormFieldAnswer.build_answers(
+                registration,
+                registration.event.form_fields.all(),
+                registration.form_data
+            ))
+    
+    def __str__(self):
+        return f"{self.field.label}: {self.value_text}"
+
 class TicketPurchase(models.Model):
     registration = models.ForeignKey(Registration, on_delete=models.CASCADE, related_name='tickets')
     ticket_type = models.ForeignKey(TicketType, on_delete=models.CASCADE, related_name='purchases')
@@ -1,5 +1,9 @@
+from django.db import transaction
+from django.db.models import F
 from rest_framework import serializers
-from .models import Registration, TicketType, TicketPurchase, Discount
+from apps.events.models import Event
+from .models import Registration, TicketType, TicketPurchase, Discount, FormFieldAnswer
+from .discounts import DiscountService
 from apps.events.serializers import EventListSerializer
 
 class DiscountSerializer(serializers.ModelSerializer):
@@ -43,6 +47,16 @@ class RegistrationSerializer(serializers.ModelSerializer):
                   'reference_code', 'form_data', 'form_data_size', 'tickets']
         read_only_fields = ['id', 'user', 'created_at', 'updated_at', 
                            'confirmed_at', 'reference_code']
+    
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        registration = super().update(instance, validated_data)
+        
+        # Les réponses normalisées suivent les données du formulaire modifiées
+        if 'form_data' in validated_data or 'registration_type' in validated_data or 'event' in validated_data:
+            FormFieldAnswer.rebuild(registration)
+        
+        return registration
 
 class RegistrationCreateSerializer(serializers.ModelSerializer):
     tickets = serializers.ListField(
@@ -75,14 +89,24 @@ class RegistrationCreateSerializer(serializers.ModelSerializer):
                     "Vous devez sélectionner au moins un billet"
                 )
             
-            # Vérifier chaque billet
+            # Vérifier chaque billet (types de billets chargés en une requête, réutilisés par create)
+            try:
+                self._ticket_types = {
+                    str(ticket_type.pk): ticket_type
+                    for ticket_type in TicketType.objects.filter(
+                        event=event,
+                        pk__in={ticket_data.get('ticket_type') for ticket_data in tickets}
+                    )
+                }
+            except (TypeError, ValueError):
+                raise serializers.ValidationError("Type de billet invalide")
+            
             for ticket_data in tickets:
                 ticket_type_id = ticket_data.get('ticket_type')
                 quantity = ticket_data.get('quantity', 0)
                 
-                try:
-                    ticket_type = TicketType.objects.get(id=ticket_type_id, event=event)
-                except TicketType.DoesNotExist:
+                ticket_type = self._ticket_types.get(str(ticket_type_id))
+                if ticket_type is None:
                     raise serializers.ValidationError(
                         f"Type de billet {ticket_type_id} non trouvé pour cet événement"
                     )
@@ -121,6 +145,7 @@ class RegistrationCreateSerializer(serializers.ModelSerializer):
         
         return data
     
+    @transaction.atomic
     def create(self, validated_data):
         tickets_data = validated_data.pop('tickets', [])
         user = self.context['request'].user
@@ -131,56 +156,59 @@ class RegistrationCreateSerializer(serializers.ModelSerializer):
             **validated_data
         )
         
+        # Enregistrer les réponses normalisées pour les événements de type inscription
+        if registration.registration_type == 'inscription':
+            FormFieldAnswer.objects.bulk_create(FormFieldAnswer.build_answers(
+                registration,
+                registration.event.form_fields.all(),
+                registration.form_data
+            ))
+        
         # Ajouter les billets pour les événements de type billetterie
         if registration.registration_type == 'billetterie':
-            for ticket_data in tickets_data:
-                ticket_type_id = ticket_data.get('ticket_type')
-                quantity = ticket_data.get('quantity')
-                
-                ticket_type = TicketType.objects.get(id=ticket_type_id)
-                
-                # Vérifier s'il y a un code de réduction
-                discount_code = ticket_data.get('discount_code')
+            lines = [
+                (self._ticket_types[str(ticket_data.get('ticket_type'))], ticket_data.get('quantity'),
+                 DiscountService.normalize(ticket_data.get('discount_code')))
+                for ticket_data in tickets_data
+            ]
+            
+            # Chaque code promo est vérifié une fois et utilisé une fois pour toutes ses lignes
+            discounts = {}
+            for code in {code for _, _, code in lines if code}:
+                definition = DiscountService.lookup(code)
+                if DiscountService.check(definition, registration.event_id) is not None:
+                    continue
+                amounts = [
+                    DiscountService.line_discount(definition, ticket_type.pk, ticket_type.price, quantity)
+                    for ticket_type, quantity, line_code in lines
+                    if line_code == code
+                ]
+                if any(amounts) and DiscountService.redeem(definition):
+                    discounts[code] = definition
+            
+            purchases = []
+            for ticket_type, quantity, code in lines:
                 discount_amount = 0
-                
-                if discount_code:
-                    try:
-                        discount = Discount.objects.get(code=discount_code, event=registration.event)
-                        
-                        if discount.is_valid() and (not discount.applicable_ticket_types.exists() or 
-                                                  discount.applicable_ticket_types.filter(id=ticket_type.id).exists()):
-                            # Calculer la réduction
-                            if discount.discount_type == 'percentage':
-                                discount_amount = (ticket_type.price * discount.value / 100) * quantity
-                            else:  # montant fixe
-                                discount_amount = discount.value * quantity
-                            
-                            # Mettre à jour le compteur d'utilisation
-                            discount.times_used += 1
-                            discount.save()
-                    except Discount.DoesNotExist:
-                        pass
-                
-                # Calculer le prix total
-                total_price = (ticket_type.price * quantity) - discount_amount
+                definition = discounts.get(code)
+                if definition is not None:
+                    discount_amount = DiscountService.line_discount(definition, ticket_type.pk, ticket_type.price, quantity)
                 
                 # Créer l'achat de billet
-                TicketPurchase.objects.create(
+                purchases.append(TicketPurchase(
                     registration=registration,
                     ticket_type=ticket_type,
                     quantity=quantity,
                     unit_price=ticket_type.price,
-                    discount_code=discount if discount_code and 'discount' in locals() else None,
+                    discount_code_id=definition['id'] if discount_amount else None,
                     discount_amount=discount_amount,
-                    total_price=total_price
-                )
-                
-                # Ne pas mettre à jour le nombre de billets vendus ici
-                # Cette mise à jour sera faite lors de la validation du paiement
+                    total_price=(ticket_type.price * quantity) - discount_amount
+                ))
+            TicketPurchase.objects.bulk_create(purchases)
+            
+            # Ne pas mettre à jour le nombre de billets vendus ici
+            # Cette mise à jour sera faite lors de la validation du paiement
         
         # Mettre à jour le compteur d'inscriptions de l'événement
-        event = registration.event
-        event.registration_count += 1
-        event.save()
+        Event.objects.filter(pk=registration.event_id).update(registration_count=F('registration_count') + 1)
         
         return registration
\ No newline at end of file
@@ -0,0 +1,32 @@
+# registrations/signals.py
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .discounts import DiscountService
+from .models import Discount
+
+@receiver(pre_save, sender=Discount)
+def invalidate_renamed_discount(sender, instance, raw=False, **kwargs):
+    """Un code renommé ne doit plus être reconnu sous son ancien nom"""
+    if raw or instance.pk is None:
+        return
+    previous = Discount.objects.filter(pk=instance.pk).values_list('code', flat=True).first()
+    if previous and previous != instance.code:
+        DiscountService.invalidate(previous)
+
+@receiver(post_save, sender=Discount)
+@receiver(post_delete, sender=Discount)
+def invalidate_discount(sender, instance, **kwargs):
+    DiscountService.invalidate(instance.code)
+
+@receiver(m2m_changed, sender=Discount.applicable_ticket_types.through)
+def invalidate_discount_ticket_types(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        DiscountService.invalidate(instance.code)
+        return
+
+    # Modification depuis le type de billet: codes promo concernés
+    discounts = Discount.objects.filter(pk__in=pk_set) if pk_set else instance.discounts.all()
+    for code in discounts.values_list('code', flat=True):
+        DiscountService.invalidate(code)
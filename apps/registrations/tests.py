@@ -0,0 +1,222 @@
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import connections
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.accounts.models import User
+from apps.events.models import CustomFormField, Event
+from .discounts import DiscountService
+from .models import Discount, FormFieldAnswer, Registration, TicketPurchase, TicketType
+
+def create_event(organizer, event_type='billetterie', **kwargs):
+    now = timezone.now()
+    return Event.objects.create(
+        title='Concert',
+        description='Description',
+        organizer=organizer,
+        event_type=event_type,
+        start_date=now + timedelta(days=3),
+        end_date=now + timedelta(days=4),
+        location_name='Salle',
+        location_address='Adresse',
+        location_city='Douala',
+        status='validated',
+        **kwargs
+    )
+
+class DiscountFixtureMixin:
+    def create_fixtures(self, max_uses=5):
+        cache.clear()
+        now = timezone.now()
+        self.organizer = User.objects.create_user(email='org@example.com', username='org', password='x', role='organizer')
+        self.user = User.objects.create_user(email='user@example.com', username='user', password='x')
+        self.event = create_event(self.organizer)
+        self.standard = TicketType.objects.create(
+            event=self.event, name='Standard', price=Decimal('100.00'), quantity_total=100,
+            sales_start=now - timedelta(days=1), sales_end=now + timedelta(days=1)
+        )
+        self.reduced = TicketType.objects.create(
+            event=self.event, name='Réduit', price=Decimal('50.00'), quantity_total=100,
+            sales_start=now - timedelta(days=1), sales_end=now + timedelta(days=1)
+        )
+        self.discount = Discount.objects.create(
+            event=self.event, code='PROMO', discount_type='percentage', value=Decimal('10'),
+            valid_from=now - timedelta(days=1), valid_until=now + timedelta(days=1), max_uses=max_uses
+        )
+        self.discount.applicable_ticket_types.add(self.standard)
+
+class DiscountCheckTests(DiscountFixtureMixin, TestCase):
+    def setUp(self):
+        self.create_fixtures()
+        self.client = APIClient()
+
+    def test_check_applies_to_eligible_tickets_only(self):
+        response = self.client.post('/api/discounts/check/', {
+            'code': 'PROMO',
+            'event': str(self.event.pk),
+            'tickets': [
+                {'ticket_type': self.standard.pk, 'quantity': 2},
+                {'ticket_type': self.reduced.pk, 'quantity': 1},
+            ]
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['valid'])
+        self.assertEqual(response.data['total_discount'], Decimal('20.00'))
+
+    def test_check_unknown_code(self):
+        response = self.client.post('/api/discounts/check/', {'code': 'NOPE', 'event': str(self.event.pk)}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['valid'])
+
+    def test_check_rejects_non_object_body(self):
+        for body in ([{'event': str(self.event.pk)}], ['PROMO'], 'PROMO'):
+            response = self.client.post('/api/discounts/check/', body, format='json')
+            self.assertEqual(response.status_code, 400)
+
+    def test_check_rejects_invalid_tickets(self):
+        response = self.client.post('/api/discounts/check/', {
+            'code': 'PROMO', 'event': str(self.event.pk), 'tickets': ['x']
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+class CheckoutTests(DiscountFixtureMixin, TestCase):
+    def setUp(self):
+        self.create_fixtures()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def checkout(self, tickets):
+        return self.client.post('/api/registrations/', {
+            'event': str(self.event.pk),
+            'registration_type': 'billetterie',
+            'tickets': tickets
+        }, format='json')
+
+    def test_code_used_once_per_order(self):
+        response = self.checkout([
+            {'ticket_type': self.standard.pk, 'quantity': 2, 'discount_code': 'PROMO'},
+            {'ticket_type': self.reduced.pk, 'quantity': 1, 'discount_code': 'PROMO'},
+            {'ticket_type': self.standard.pk, 'quantity': 1, 'discount_code': 'PROMO'},
+        ])
+        self.assertEqual(response.status_code, 201)
+
+        self.discount.refresh_from_db()
+        self.assertEqual(self.discount.times_used, 1)
+        purchases = TicketPurchase.objects.order_by('id')
+        self.assertEqual(
+            [(purchase.discount_amount, purchase.total_price) for purchase in purchases],
+            [(Decimal('20.00'), Decimal('180.00')), (Decimal('0.00'), Decimal('50.00')), (Decimal('10.00'), Decimal('90.00'))]
+        )
+        self.assertEqual(purchases[0].discount_code_id, self.discount.pk)
+        self.assertIsNone(purchases[1].discount_code_id)
+
+    def test_exhausted_code_gives_no_discount(self):
+        Discount.objects.filter(pk=self.discount.pk).update(times_used=5)
+        response = self.checkout([{'ticket_type': self.standard.pk, 'quantity': 1, 'discount_code': 'PROMO'}])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(TicketPurchase.objects.get().discount_amount, Decimal('0.00'))
+        self.assertEqual(Registration.objects.count(), 1)
+
+class DiscountRedeemConcurrencyTests(DiscountFixtureMixin, TransactionTestCase):
+    def setUp(self):
+        self.create_fixtures(max_uses=5)
+
+    def test_max_uses_never_exceeded(self):
+        Discount.objects.filter(pk=self.discount.pk).update(times_used=1)
+        workers = 20
+        results = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(workers)
+
+        def redeem():
+            try:
+                definition = DiscountService.lookup('PROMO')
+                barrier.wait()
+                redeemed = DiscountService.redeem(definition)
+                with lock:
+                    results.append(redeemed)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=redeem) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), workers)
+        self.assertEqual(sum(results), 4)
+        self.discount.refresh_from_db()
+        self.assertEqual(self.discount.times_used, 5)
+
+    def test_expired_code_not_redeemed(self):
+        definition = DiscountService.lookup('PROMO')
+        Discount.objects.filter(pk=self.discount.pk).update(valid_until=timezone.now() - timedelta(minutes=1))
+        self.assertFalse(DiscountService.redeem(definition))
+
+class FormAnswerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.organizer = User.objects.create_user(email='org@example.com', username='org', password='x', role='organizer')
+        self.user = User.objects.create_user(email='user@example.com', username='user', password='x')
+        self.event = create_event(self.organizer, event_type='inscription')
+        self.age = CustomFormField.objects.create(event=self.event, label='Âge', field_type='number', required=True)
+        self.meals = CustomFormField.objects.create(
+            event=self.event, label='Repas', field_type='checkbox', options='Midi, Soir'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def register(self, form_data):
+        response = self.client.post('/api/registrations/', {
+            'event': str(self.event.pk),
+            'registration_type': 'inscription',
+            'form_data': form_data
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return Registration.objects.get(pk=response.data['id'])
+
+    def answers(self, registration):
+        return sorted(registration.answers.values_list('field_id', 'value_text', 'value_number'))
+
+    def test_checkbox_answer_stored_per_option(self):
+        registration = self.register({'Âge': 30, 'Repas': ['Midi', 'Soir', 'Midi']})
+        self.assertEqual(self.answers(registration), [
+            (self.age.pk, '30', 30.0),
+            (self.meals.pk, 'Midi', None),
+            (self.meals.pk, 'Soir', None),
+        ])
+
+        response = self.client.get('/api/registrations/', {'field': self.meals.pk, 'answer': 'Soir'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+
+    def test_update_rebuilds_answers(self):
+        registration = self.register({'Âge': 30, 'Repas': ['Midi']})
+        response = self.client.patch(
+            f'/api/registrations/{registration.pk}/',
+            {'form_data': {'Âge': 41, 'Repas': ['Soir']}},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.answers(registration), [
+            (self.age.pk, '41', 41.0),
+            (self.meals.pk, 'Soir', None),
+        ])
+
+    def test_filter_by_number_range(self):
+        self.register({'Âge': 20})
+        self.register({'Âge': 35})
+        response = self.client.get('/api/registrations/', {'field': self.age.pk, 'answer_min': '30', 'answer_max': '40'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['form_data']['Âge'] for item in response.data['results']], [35])
+
+    def test_filter_rejects_invalid_parameters(self):
+        for params in ({'field': 'abc'}, {'field': '1.5'}, {'field': self.age.pk, 'answer_min': 'abc'},
+                       {'field': self.age.pk, 'answer_max': 'nan'}):
+            response = self.client.get('/api/registrations/', params)
+            self.assertEqual(response.status_code, 400, params)
+        self.assertEqual(FormFieldAnswer.objects.count(), 0)
@@ -1,7 +1,9 @@
+import math
 from rest_framework import viewsets, permissions, status, generics
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from .models import Registration, TicketType, TicketPurchase, Discount
+from .models import Registration, TicketType, TicketPurchase, Discount, FormFieldAnswer
 from .serializers import (
     RegistrationSerializer,
     TicketTypeSerializer,
@@ -10,6 +12,8 @@ from .serializers import (
     RegistrationCreateSerializer
 )
 from apps.core.permissions import IsOwnerOrReadOnly
+from apps.core.throttling import WRITE_THROTTLES
+from .discounts import DiscountService
 from django.shortcuts import get_object_or_404
 from apps.events.models import Event
 import qrcode
@@ -52,6 +56,14 @@ class DiscountViewSet(viewsets.ModelViewSet):
     queryset = Discount.objects.all()
     serializer_class = DiscountSerializer
     permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = WRITE_THROTTLES
+    throttle_scopes = {'validate': 'discount_validation', 'check': 'discount_check'}
+    
+    def get_throttle_resource(self, request):
+        # Essais de codes limités par code promo, ou par événement pour la vérification publique
+        if self.action == 'check':
+            return request.data.get('event') if isinstance(request.data, dict) else None
+        return self.kwargs.get('pk')
     
     def get_queryset(self):
         user = self.request.user
@@ -88,22 +100,79 @@ class DiscountViewSet(viewsets.ModelViewSet):
             'discount': DiscountSerializer(discount).data
         })
 
+    @action(detail=False, methods=['post'], permission_classes=[permissions.AllowAny])
+    def check(self, request):
+        """
+        Vérifie un code promo pour un événement sans en connaître l'identifiant:
+        {"code", "event", "tickets": [{"ticket_type", "quantity"}]} (billets facultatifs)
+        """
+        if not isinstance(request.data, dict):
+            return Response({'detail': 'Requête invalide.'}, status=status.HTTP_400_BAD_REQUEST)
+        event_id = request.data.get('event')
+        tickets = request.data.get('tickets') or []
+        try:
+            lines = [(int(ticket['ticket_type']), int(ticket.get('quantity', 1))) for ticket in tickets]
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return Response({'detail': 'Billets invalides.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not event_id or any(quantity < 1 for _, quantity in lines):
+            return Response({'detail': 'Événement et quantités requis.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(DiscountService.validate(request.data.get('code'), event_id, lines))
+
 class RegistrationViewSet(viewsets.ModelViewSet):
     queryset = Registration.objects.all()
     serializer_class = RegistrationSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly]
+    throttle_classes = WRITE_THROTTLES
+    throttle_scopes = {'create': 'registrations'}
+    
+    def get_throttle_resource(self, request):
+        # Débit d'inscription par événement
+        return request.data.get('event') if isinstance(request.data, dict) else None
     
     def get_queryset(self):
         user = self.request.user
         if user.is_staff:
-            return Registration.objects.all()
+            queryset = Registration.objects.all()
         
         # Si l'utilisateur est un organisateur, montrer les inscriptions à ses événements
-        if user.role == 'organizer':
-            return Registration.objects.filter(event__organizer=user)
+        elif user.role == 'organizer':
+            queryset = Registration.objects.filter(event__organizer=user)
         
         # Sinon, montrer seulement les inscriptions de l'utilisateur
-        return Registration.objects.filter(user=user)
+        else:
+            queryset = Registration.objects.filter(user=user)
+        
+        return self.filter_by_answer(queryset)
+    
+    def filter_by_answer(self, queryset):
+        """Filtre les inscriptions selon leur réponse à un champ de formulaire (?field=&answer=, ?field=&answer_min=&answer_max=)"""
+        field_id = self.request.query_params.get('field')
+        if not field_id:
+            return queryset
+        
+        try:
+            answers = FormFieldAnswer.objects.filter(field_id=int(field_id))
+        except ValueError:
+            raise ValidationError({'field': 'Identifiant de champ invalide.'})
+        
+        answer = self.request.query_params.get('answer')
+        if answer is not None:
+            answers = answers.filter(value_text=answer)
+        
+        for param, lookup in (('answer_min', 'value_number__gte'), ('answer_max', 'value_number__lte')):
+            bound = self.request.query_params.get(param)
+            if bound is None:
+                continue
+            try:
+                bound = float(bound)
+            except ValueError:
+                raise ValidationError({param: 'Nombre invalide.'})
+            if not math.isfinite(bound):
+                raise ValidationError({param: 'Nombre invalide.'})
+            answers = answers.filter(**{lookup: bound})
+        
+        return queryset.filter(id__in=answers.values('registration_id'))
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -7,7 +7,7 @@ class MessageInline(admin.TabularInline):
     model = Message
     extra = 0
     readonly_fields = ('created_at',)
-    fields = ('sender', 'content', 'created_at', 'read_by', 'reply_to', 'is_starred')
+    fields = ('sender', 'content', 'created_at', 'reply_to', 'is_starred')
     
     def get_queryset(self, request):
         qs = super().get_queryset(request)
@@ -38,7 +38,6 @@ class MessageAdmin(admin.ModelAdmin):
     list_filter = ('created_at', 'is_starred')
     search_fields = ('content', 'sender__email', 'sender__username')
     readonly_fields = ('created_at',)
-    filter_horizontal = ('read_by',)
     
     def truncated_content(self, obj):
         return obj.content[:50] + '...' if len(obj.content) > 50 else obj.content
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.7 on 2026-10-19 06:02
+
+import hashlib
+from django.db import migrations
+
+
+def backfill_participants_hash(apps, schema_editor):
+    """Calcule l'empreinte des participants; seule la plus ancienne conversation d'un même ensemble la reçoit"""
+    Conversation = apps.get_model('user_messages', 'Conversation')
+    Participant = Conversation.participants.through
+
+    participants = {}
+    rows = Participant.objects.order_by('conversation_id').values_list('conversation_id', 'user_id')
+    for conversation_id, user_id in rows.iterator(chunk_size=5000):
+        participants.setdefault(conversation_id, []).append(user_id)
+
+    seen = set()
+    batch = []
+    for conversation_id in sorted(participants):
+        canonical = ','.join(str(user_id) for user_id in sorted(set(participants[conversation_id])))
+        participants_hash = hashlib.sha256(canonical.encode()).hexdigest()
+        if participants_hash in seen:
+            continue
+        seen.add(participants_hash)
+        batch.append(Conversation(pk=conversation_id, participants_hash=participants_hash))
+        if len(batch) >= 1000:
+            Conversation.objects.bulk_update(batch, ['participants_hash'])
+            batch = []
+
+    if batch:
+        Conversation.objects.bulk_update(batch, ['participants_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_messages', '0005_conversation_participants_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_participants_hash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.1.7 on 2026-10-19 06:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+from django.utils import timezone
+
+
+def migrate_read_by(apps, schema_editor):
+    """Le repère de chaque (utilisateur, conversation) est le plus récent message marqué comme lu"""
+    Message = apps.get_model('user_messages', 'Message')
+    ConversationReadState = apps.get_model('user_messages', 'ConversationReadState')
+
+    now = timezone.now()
+    rows = Message.read_by.through.objects.values(
+        'message__conversation_id', 'user_id'
+    ).annotate(last_read=Max('message_id')).order_by()
+
+    batch = []
+    for row in rows.iterator(chunk_size=5000):
+        batch.append(ConversationReadState(
+            conversation_id=row['message__conversation_id'],
+            user_id=row['user_id'],
+            last_read_message_id=row['last_read'],
+            last_read_at=now
+        ))
+        if len(batch) >= 1000:
+            ConversationReadState.objects.bulk_create(batch)
+            batch = []
+
+    if batch:
+        ConversationReadState.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_messages', '0006_backfill_participants_hash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversationReadState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_read_message_id', models.PositiveBigIntegerField(default=0)),
+                ('last_read_at', models.DateTimeField(blank=True, null=True)),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_states', to='user_messages.conversation')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversation_read_states', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('conversation', 'user')},
+            },
+        ),
+        migrations.RunPython(migrate_read_by, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-19 06:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_messages', '0007_conversationreadstate'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='message',
+            name='read_by',
+        ),
+    ]
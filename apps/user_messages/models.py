@@ -1,14 +1,40 @@
 # apps/user_messages/models.py
-from django.db import models
+import hashlib
+import logging
+from django.db import IntegrityError, models, transaction
 from django.conf import settings
 
 class Conversation(models.Model):
     participants = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='conversations')
+    # Empreinte de l'ensemble des participants (maintenue par signal), pour retrouver
+    # une conversation existante en une recherche indexée. Vide pour les doublons.
+    participants_hash = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_archived = models.BooleanField(default=False)
     is_starred = models.BooleanField(default=False)
 
+    @staticmethod
+    def compute_participants_hash(user_ids):
+        """Empreinte canonique (indépendante de l'ordre) d'un ensemble d'utilisateurs"""
+        canonical = ','.join(str(user_id) for user_id in sorted({int(user_id) for user_id in user_ids}))
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def refresh_participants_hash(self):
+        """Recalcule l'empreinte après une modification des participants"""
+        participants_hash = self.compute_participants_hash(self.participants.values_list('id', flat=True))
+        try:
+            with transaction.atomic():
+                Conversation.objects.filter(pk=self.pk).update(participants_hash=participants_hash)
+        except IntegrityError:
+            # Une autre conversation réunit déjà ces participants
+            logging.getLogger('apps').warning(
+                f"Conversation {self.pk}: mêmes participants qu'une conversation existante"
+            )
+            participants_hash = None
+            Conversation.objects.filter(pk=self.pk).update(participants_hash=None)
+        self.participants_hash = participants_hash
+
     def __str__(self):
         participants_str = ", ".join([user.email for user in self.participants.all()[:3]])
         if self.participants.count() > 3:
@@ -32,12 +58,71 @@ class Message(models.Model):
     sender = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='sent_user_messages', on_delete=models.CASCADE)
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
-    read_by = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='read_user_messages', blank=True)
     reply_to = models.ForeignKey('self', null=True, blank=True, on_delete=models.SET_NULL, related_name='replies')
     is_starred = models.BooleanField(default=False)
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # Dernier message et pagination par curseur d'une conversation
+            models.Index(fields=['conversation', 'created_at']),
+        ]
         
     def __str__(self):
-        return f"Message de {self.sender} ({self.created_at.strftime('%d/%m/%Y %H:%M')})"
\ No newline at end of file
+        return f"Message de {self.sender} ({self.created_at.strftime('%d/%m/%Y %H:%M')})"
+class ConversationReadState(models.Model):
+    """
+    Repère de lecture d'un utilisateur dans une conversation: tous les messages
+    d'identifiant inférieur ou égal à last_read_message_id sont considérés lus.
+    """
+    conversation = models.ForeignKey(Conversation, related_name='read_states', on_delete=models.CASCADE)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='conversation_read_states', on_delete=models.CASCADE)
+    last_read_message_id = models.PositiveBigIntegerField(default=0)
+    last_read_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('conversation', 'user')
+
+    def __str__(self):
+        return f"{self.user} a lu {self.conversation_id} jusqu'au message {self.last_read_message_id}"
+
+    @staticmethod
+    def mark_read(user_id, conversation_id, message_id):
+        """
+        Avance le repère de lecture jusqu'au message indiqué (il ne recule jamais).
+        Retourne le nombre de messages d'autres participants nouvellement lus.
+        """
+        from django.utils import timezone
+        from apps.notifications.badges import BadgeService
+
+        with transaction.atomic():
+            state, _ = ConversationReadState.objects.select_for_update().get_or_create(
+                conversation_id=conversation_id,
+                user_id=user_id
+            )
+            if message_id <= state.last_read_message_id:
+                return 0
+
+            newly_read = Message.objects.filter(
+                conversation_id=conversation_id,
+                id__gt=state.last_read_message_id,
+                id__lte=message_id
+            ).exclude(sender_id=user_id).count()
+
+            state.last_read_message_id = message_id
+            state.last_read_at = timezone.now()
+            state.save(update_fields=['last_read_message_id', 'last_read_at'])
+            BadgeService.adjust('messages', {user_id: -newly_read})
+
+        return newly_read
+
+    @staticmethod
+    def watermarks(conversation_ids):
+        """Repères de lecture par conversation: {conversation_id: [(user_id, last_read_message_id), ...]}"""
+        watermarks = {conversation_id: [] for conversation_id in conversation_ids}
+        rows = ConversationReadState.objects.filter(
+            conversation_id__in=watermarks
+        ).values_list('conversation_id', 'user_id', 'last_read_message_id')
+        for conversation_id, user_id, last_read_message_id in rows:
+            watermarks[conversation_id].append((user_id, last_read_message_id))
+        return watermarks
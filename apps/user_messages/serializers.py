@@ -1,37 +1,92 @@
 # apps/user_messages/serializers.py
 from rest_framework import serializers
-from .models import Conversation, Message, UserMessagingSettings
+from .models import Conversation, ConversationReadState, Message, UserMessagingSettings
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+def display_name(user):
+    """Nom affiché d'un utilisateur"""
+    if user.first_name and user.last_name:
+        return f"{user.first_name} {user.last_name}"
+    return user.username or user.email
+
+class MessageListSerializer(serializers.ListSerializer):
+    """Charge en une requête les repères de lecture des conversations de la liste"""
+    
+    def to_representation(self, data):
+        messages = list(data.all() if hasattr(data, 'all') else data)
+        self.child.read_watermarks = ConversationReadState.watermarks(
+            {message.conversation_id for message in messages}
+        )
+        return super().to_representation(messages)
+
 class MessageSerializer(serializers.ModelSerializer):
     sender_name = serializers.SerializerMethodField()
+    read_by = serializers.SerializerMethodField()
     
     class Meta:
         model = Message
         fields = ['id', 'conversation', 'sender', 'sender_name', 'content', 
                   'created_at', 'read_by', 'reply_to', 'is_starred']
+        list_serializer_class = MessageListSerializer
     
     def get_sender_name(self, obj):
-        if obj.sender.first_name and obj.sender.last_name:
-            return f"{obj.sender.first_name} {obj.sender.last_name}"
-        return obj.sender.username or obj.sender.email
+        return display_name(obj.sender)
+    
+    def get_read_by(self, obj):
+        # Accusés de lecture déduits des repères de lecture des participants
+        watermarks = getattr(self, 'read_watermarks', {}).get(obj.conversation_id)
+        if watermarks is None:
+            watermarks = ConversationReadState.watermarks([obj.conversation_id])[obj.conversation_id]
+        return [
+            user_id for user_id, last_read_message_id in watermarks
+            if last_read_message_id >= obj.id and user_id != obj.sender_id
+        ]
 
 class ConversationSerializer(serializers.ModelSerializer):
+    """
+    Conversation sans ses messages (à charger par pages via l'action messages).
+    Le dernier message et le nombre de non-lus proviennent des annotations de
+    ConversationViewSet.get_queryset.
+    """
     participants = serializers.PrimaryKeyRelatedField(many=True, queryset=User.objects.all())
-    user_messages = MessageSerializer(many=True, read_only=True)
+    participants_summary = serializers.SerializerMethodField()
+    last_message = serializers.SerializerMethodField()
+    unread_count = serializers.SerializerMethodField()
+    
+    # Nombre de participants nommés dans le résumé
+    SUMMARY_SIZE = 3
     
     class Meta:
         model = Conversation
-        fields = ['id', 'participants', 'created_at', 'updated_at', 'user_messages', 
-                  'is_archived', 'is_starred']
+        fields = ['id', 'participants', 'participants_summary', 'created_at', 'updated_at',
+                  'last_message', 'unread_count', 'is_archived', 'is_starred']
+    
+    def get_participants_summary(self, obj):
+        participants = list(obj.participants.all())
+        return {
+            'count': len(participants),
+            'names': [display_name(user) for user in participants[:self.SUMMARY_SIZE]]
+        }
+    
+    def get_last_message(self, obj):
+        if getattr(obj, 'last_message_id', None) is None:
+            return None
+        return {
+            'id': obj.last_message_id,
+            'sender': obj.last_message_sender_id,
+            'preview': obj.last_message_preview,
+            'created_at': serializers.DateTimeField().to_representation(obj.last_message_at)
+        }
+    
+    def get_unread_count(self, obj):
+        return getattr(obj, 'unread_count', None)
 
     def create(self, validated_data):
         participants = validated_data.pop('participants')
         conversation = Conversation.objects.create(**validated_data)
-        for participant in participants:
-            conversation.participants.add(participant)
+        conversation.participants.add(*participants)
         return conversation
 
 class UserMessagingSettingsSerializer(serializers.ModelSerializer):
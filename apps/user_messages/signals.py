@@ -1,9 +1,11 @@
 # apps/user_messages/signals.py
-from django.db.models.signals import post_save
+import logging
+from django.db import transaction
+from django.db.models.signals import post_save, pre_delete, m2m_changed
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
-from .models import UserMessagingSettings, Message
-from apps.notifications.models import Notification
+from .models import Conversation, ConversationReadState, UserMessagingSettings, Message
+from apps.notifications.badges import BadgeService
 
 User = get_user_model()
 
@@ -14,31 +16,75 @@ def create_messaging_settings(sender, instance, created, **kwargs):
         UserMessagingSettings.objects.create(user=instance)
 
 @receiver(post_save, sender=Message)
-def notify_message_recipients(sender, instance, created, **kwargs):
-    """Envoie une notification aux destinataires d'un nouveau message"""
-    if created:
-        # Ne pas notifier l'expéditeur
-        recipients = instance.conversation.participants.exclude(id=instance.sender.id)
+def notify_message_recipients(sender, instance, created, raw=False, **kwargs):
+    """Programme la notification des destinataires d'un nouveau message, hors du thread de la requête"""
+    if created and not raw:
+        message_id = instance.id
         
-        for recipient in recipients:
-            # Vérifier si le destinataire n'a pas bloqué l'expéditeur
+        def schedule():
+            from .tasks import notify_message_recipients as notify_task
             try:
-                settings = UserMessagingSettings.objects.get(user=recipient)
-                if settings.messaging_enabled and instance.sender not in settings.blocked_users.all():
-                    # Créer une notification
-                    sender_name = f"{instance.sender.first_name} {instance.sender.last_name}".strip()
-                    if not sender_name:
-                        sender_name = instance.sender.username or instance.sender.email
-                        
-                    message_preview = instance.content[:50] + "..." if len(instance.content) > 50 else instance.content
-                    
-                    Notification.objects.create(
-                        recipient=recipient,
-                        actor=instance.sender,
-                        verb="message",
-                        action_object=instance,
-                        target=instance.conversation,
-                        description=f"Nouveau message de {sender_name}: {message_preview}"
-                    )
-            except UserMessagingSettings.DoesNotExist:
-                pass  # Si les paramètres n'existent pas, ne pas envoyer de notification
\ No newline at end of file
+                notify_task.delay(message_id)
+            except Exception as e:
+                # Courtier indisponible: notifier immédiatement
+                logging.getLogger('apps').warning(f"Impossible de programmer la notification du message {message_id}: {str(e)}")
+                notify_task(message_id)
+        
+        transaction.on_commit(schedule)
+
+@receiver(post_save, sender=Message)
+def count_unread_message(sender, instance, created, raw=False, **kwargs):
+    """Incrémente le badge des participants autres que l'expéditeur"""
+    if created and not raw:
+        recipient_ids = instance.conversation.participants.exclude(
+            id=instance.sender_id
+        ).values_list('id', flat=True)
+        BadgeService.adjust('messages', {user_id: 1 for user_id in recipient_ids})
+
+@receiver(pre_delete, sender=Message)
+def uncount_deleted_message(sender, instance, **kwargs):
+    """Retire le message supprimé du badge des participants qui ne l'avaient pas lu"""
+    reader_ids = ConversationReadState.objects.filter(
+        conversation_id=instance.conversation_id,
+        last_read_message_id__gte=instance.id
+    ).values('user_id')
+    unread_ids = instance.conversation.participants.exclude(
+        id=instance.sender_id
+    ).exclude(
+        id__in=reader_ids
+    ).values_list('id', flat=True)
+    BadgeService.adjust('messages', {user_id: -1 for user_id in unread_ids})
+
+@receiver(m2m_changed, sender=Conversation.participants.through)
+def refresh_participants_hash(sender, instance, action, reverse, pk_set, **kwargs):
+    """Maintient l'empreinte des participants des conversations modifiées"""
+    if action == 'pre_clear' and reverse:
+        instance._cleared_conversations = list(instance.conversations.all())
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    
+    if reverse:
+        # Modification depuis l'utilisateur (user.conversations)
+        if action == 'post_clear':
+            conversations = getattr(instance, '_cleared_conversations', [])
+        else:
+            conversations = Conversation.objects.filter(pk__in=pk_set or ())
+        for conversation in conversations:
+            conversation.refresh_participants_hash()
+    else:
+        instance.refresh_participants_hash()
+
+@receiver(m2m_changed, sender=Conversation.participants.through)
+def recount_participants_messages(sender, instance, action, reverse, pk_set, **kwargs):
+    """Recalcule le badge des participants ajoutés ou retirés d'une conversation"""
+    if reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            BadgeService.reconcile([instance.pk])
+        return
+    
+    if action == 'pre_clear':
+        instance._cleared_participant_ids = list(instance.participants.values_list('id', flat=True))
+    elif action == 'post_clear':
+        BadgeService.reconcile(getattr(instance, '_cleared_participant_ids', []))
+    elif action in ('post_add', 'post_remove'):
+        BadgeService.reconcile(list(pk_set or ()))
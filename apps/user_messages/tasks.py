@@ -0,0 +1,76 @@
+# apps/user_messages/tasks.py
+from celery import shared_task
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from apps.notifications.badges import BadgeService
+from apps.notifications.models import Notification
+from apps.notifications.realtime import publish
+from .models import Message
+from .serializers import display_name
+
+User = get_user_model()
+
+# Longueur de l'aperçu du message dans la notification
+PREVIEW_LENGTH = 50
+
+@shared_task
+def notify_message_recipients(message_id):
+    """
+    Notifie les destinataires d'un nouveau message.
+
+    Les paramètres de messagerie et les listes de blocage de tous les
+    destinataires sont résolus en une requête, puis les notifications sont
+    insérées avec bulk_create.
+    """
+    message = Message.objects.select_related('sender').filter(pk=message_id).first()
+    if message is None:
+        return 0
+
+    # Participants acceptant les messages et n'ayant pas bloqué l'expéditeur
+    recipient_ids = list(
+        User.objects.filter(
+            conversations=message.conversation_id,
+            messaging_settings__messaging_enabled=True
+        ).exclude(
+            pk=message.sender_id
+        ).exclude(
+            messaging_settings__blocked_users=message.sender_id
+        ).values_list('id', flat=True)
+    )
+    if not recipient_ids:
+        return 0
+
+    sender_name = display_name(message.sender)
+    preview = message.content[:PREVIEW_LENGTH] + "..." if len(message.content) > PREVIEW_LENGTH else message.content
+    now = timezone.now()
+
+    notifications = Notification.objects.bulk_create([
+        Notification(
+            user_id=user_id,
+            title=f"Nouveau message de {sender_name}",
+            message=preview,
+            notification_type='new_message',
+            related_object_id=str(message.conversation_id),
+            related_object_type='conversation',
+            channel='in_app',
+            is_sent=True,
+            sent_at=now,
+            delivery_status='sent',
+            extra_data={'message_id': message.id, 'sender_id': message.sender_id}
+        )
+        for user_id in recipient_ids
+    ])
+    BadgeService.notifications_created(notifications)
+
+    # Pousser le message en temps réel aux mêmes destinataires
+    publish(recipient_ids, 'message', {
+        'id': message.id,
+        'conversation_id': message.conversation_id,
+        'sender_id': message.sender_id,
+        'sender_name': sender_name,
+        'content': message.content,
+        'reply_to_id': message.reply_to_id,
+        'created_at': message.created_at,
+    })
+
+    return len(notifications)
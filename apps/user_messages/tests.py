@@ -0,0 +1,321 @@
+from importlib import import_module
+from unittest import mock
+from django.apps import apps
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+from rest_framework.test import APIClient
+from apps.accounts.models import User
+from apps.core.testing import query_budget
+from apps.notifications.models import Notification
+from .models import Conversation, ConversationReadState, Message, UserMessagingSettings
+from .tasks import notify_message_recipients
+from .views import ConversationViewSet, MessageCursorPagination
+
+class ConversationListBudgetTests(TestCase):
+    """
+    Requêtes et taille des réponses de la messagerie, indépendantes du nombre
+    de conversations et de messages (ici 60 conversations de 100 messages).
+    """
+
+    conversations = 60
+    messages_per_conversation = 100
+    content = 'Bonjour, ' + 'x' * 500
+
+    # Taille maximale (octets) d'une conversation et d'un message sérialisés
+    CONVERSATION_PAYLOAD = 600
+    MESSAGE_PAYLOAD = 800
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='user@example.com', username='user', password='x')
+        contacts = User.objects.bulk_create([
+            User(email=f'contact{index}@example.com', username=f'contact{index}', first_name='Contact', last_name=str(index))
+            for index in range(cls.conversations)
+        ])
+        cls.conversation_list = []
+        for contact in contacts:
+            conversation = Conversation.objects.create()
+            conversation.participants.add(cls.user, contact)
+            cls.conversation_list.append(conversation)
+
+        Message.objects.bulk_create([
+            Message(conversation=conversation, sender=cls.user if index % 2 else contact, content=cls.content)
+            for conversation, contact in zip(cls.conversation_list, contacts)
+            for index in range(cls.messages_per_conversation)
+        ], batch_size=2000)
+        ConversationReadState.objects.create(
+            conversation=cls.conversation_list[0],
+            user=cls.user,
+            last_read_message_id=Message.objects.filter(conversation=cls.conversation_list[0]).order_by('id')[9].id
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    @query_budget(3)
+    def test_conversation_list(self):
+        response = self.get('/api/conversations/')
+        results = response.data['results']
+        self.assertEqual(response.data['count'], self.conversations)
+        self.assertEqual(len(results), 20)
+
+        for conversation in results:
+            self.assertEqual(conversation['participants_summary']['count'], 2)
+            self.assertEqual(len(conversation['last_message']['preview']), ConversationViewSet.PREVIEW_LENGTH)
+            self.assertNotIn('user_messages', conversation)
+
+        self.assertLess(len(response.content), len(results) * self.CONVERSATION_PAYLOAD)
+
+    def test_unread_count_after_read_watermark(self):
+        # Messages des contacts (un sur deux), moins ceux sous le repère de lecture
+        read, unread = self.conversation_list[:2]
+        self.assertEqual(self.get(f'/api/conversations/{read.pk}/').data['unread_count'], 45)
+        self.assertEqual(self.get(f'/api/conversations/{unread.pk}/').data['unread_count'], 50)
+
+    @query_budget(3)
+    def test_message_page(self):
+        conversation = self.conversation_list[0]
+        response = self.get(f'/api/conversations/{conversation.pk}/messages/')
+        self.assertEqual(len(response.data['results']), MessageCursorPagination.page_size)
+        self.assertIsNotNone(response.data['next'])
+        self.assertLess(len(response.content), MessageCursorPagination.page_size * self.MESSAGE_PAYLOAD)
+
+    def test_message_pages_cover_conversation(self):
+        conversation = self.conversation_list[1]
+        url, seen = f'/api/conversations/{conversation.pk}/messages/', []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(message['id'] for message in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(len(seen), self.messages_per_conversation)
+        self.assertEqual(len(set(seen)), self.messages_per_conversation)
+
+    @query_budget(3)
+    def test_message_list_filtered_by_conversation(self):
+        response = self.get('/api/messages/', conversation=self.conversation_list[2].pk)
+        self.assertEqual(len(response.data['results']), MessageCursorPagination.page_size)
+        self.assertTrue(all(message['sender_name'] for message in response.data['results']))
+
+class ReadWatermarkTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='user@example.com', username='user', password='x')
+        self.contact = User.objects.create_user(email='contact@example.com', username='contact', password='x')
+        self.conversation = Conversation.objects.create()
+        self.conversation.participants.add(self.user, self.contact)
+        # Messages du contact, puis une réponse de l'utilisateur, puis encore du contact
+        self.messages = [
+            Message.objects.create(conversation=self.conversation, sender=sender, content=f'Message {index}')
+            for index, sender in enumerate([self.contact] * 3 + [self.user] + [self.contact] * 2)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def mark_read(self, **data):
+        return self.client.post(f'/api/conversations/{self.conversation.pk}/mark_read/', data, format='json')
+
+    def watermark(self):
+        return ConversationReadState.objects.get(conversation=self.conversation, user=self.user).last_read_message_id
+
+    def test_newly_read_counts_other_senders(self):
+        response = self.mark_read(message=self.messages[1].pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['last_read_message'], response.data['newly_read']), (self.messages[1].pk, 2))
+
+        # Jusqu'au dernier message: le message de l'utilisateur n'est pas compté
+        response = self.mark_read()
+        self.assertEqual((response.data['last_read_message'], response.data['newly_read']), (self.messages[-1].pk, 3))
+        self.assertEqual(self.watermark(), self.messages[-1].pk)
+
+    def test_watermark_never_moves_backwards(self):
+        self.assertEqual(ConversationReadState.mark_read(self.user.pk, self.conversation.pk, self.messages[4].pk), 4)
+        self.assertEqual(ConversationReadState.mark_read(self.user.pk, self.conversation.pk, self.messages[0].pk), 0)
+        self.assertEqual(ConversationReadState.mark_read(self.user.pk, self.conversation.pk, self.messages[4].pk), 0)
+        self.assertEqual(self.watermark(), self.messages[4].pk)
+
+        response = self.mark_read(message=self.messages[2].pk)
+        self.assertEqual(response.data['newly_read'], 0)
+        self.assertEqual(self.watermark(), self.messages[4].pk)
+
+    def test_invalid_message(self):
+        self.assertEqual(self.mark_read(message='abc').status_code, 400)
+        self.assertEqual(self.mark_read(message=[1]).status_code, 400)
+        self.assertEqual(self.mark_read(message=self.messages[-1].pk + 100).status_code, 404)
+        self.assertFalse(ConversationReadState.objects.filter(user=self.user).exists())
+
+    def test_read_receipts(self):
+        ConversationReadState.mark_read(self.user.pk, self.conversation.pk, self.messages[2].pk)
+        ConversationReadState.mark_read(self.contact.pk, self.conversation.pk, self.messages[3].pk)
+
+        response = self.client.get(f'/api/conversations/{self.conversation.pk}/read_receipts/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted((item['user_id'], item['last_read_message_id']) for item in response.data),
+            sorted([(self.user.pk, self.messages[2].pk), (self.contact.pk, self.messages[3].pk)])
+        )
+        self.assertTrue(all(item['last_read_at'] for item in response.data))
+
+        # read_by de chaque message, déduit des repères (l'expéditeur est exclu)
+        response = self.client.get(f'/api/conversations/{self.conversation.pk}/messages/')
+        read_by = {message['id']: message['read_by'] for message in response.data['results']}
+        self.assertEqual(read_by[self.messages[0].pk], [self.user.pk])
+        self.assertEqual(read_by[self.messages[3].pk], [self.contact.pk])
+        self.assertEqual(read_by[self.messages[4].pk], [])
+
+    def test_other_conversation_rejected(self):
+        self.client.force_authenticate(User.objects.create_user(email='other@example.com', username='other', password='x'))
+        self.assertEqual(self.mark_read().status_code, 404)
+        self.assertEqual(self.client.get(f'/api/conversations/{self.conversation.pk}/read_receipts/').status_code, 404)
+
+class ConversationDeduplicationTests(TestCase):
+    def setUp(self):
+        self.user, self.contact, self.other = [
+            User.objects.create_user(email=f'{name}@example.com', username=name, password='x')
+            for name in ('user', 'contact', 'other')
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create(self, *participants):
+        return self.client.post('/api/conversations/', {'participants': [user.pk for user in participants]}, format='json')
+
+    def test_same_participants_return_existing_conversation(self):
+        response = self.create(self.contact)
+        self.assertEqual(response.status_code, 201)
+        conversation = Conversation.objects.get(pk=response.data['id'])
+        self.assertEqual(
+            conversation.participants_hash,
+            Conversation.compute_participants_hash([self.user.pk, self.contact.pk])
+        )
+
+        # Même ensemble, quel que soit l'ordre ou la présence de l'utilisateur courant
+        for participants in ((self.contact,), (self.contact, self.user), (self.user, self.contact)):
+            response = self.create(*participants)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['id'], conversation.pk)
+
+        # Un autre ensemble crée une nouvelle conversation
+        response = self.create(self.contact, self.other)
+        self.assertEqual(response.status_code, 201)
+        self.assertNotEqual(response.data['id'], conversation.pk)
+        self.assertEqual(Conversation.objects.count(), 2)
+
+    def test_hash_follows_participant_changes(self):
+        conversation = Conversation.objects.create()
+        conversation.participants.add(self.user, self.contact)
+        conversation.participants.add(self.other)
+        conversation.refresh_from_db()
+        self.assertEqual(
+            conversation.participants_hash,
+            Conversation.compute_participants_hash([self.user.pk, self.contact.pk, self.other.pk])
+        )
+
+        # Modification depuis l'utilisateur
+        self.other.conversations.remove(conversation)
+        conversation.refresh_from_db()
+        self.assertEqual(
+            conversation.participants_hash,
+            Conversation.compute_participants_hash([self.user.pk, self.contact.pk])
+        )
+
+    def test_participants_hash_unique(self):
+        first = Conversation.objects.create()
+        first.participants.add(self.user, self.contact)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Conversation.objects.create(participants_hash=Conversation.objects.get(pk=first.pk).participants_hash)
+
+        # Un doublon créé par modification des participants garde une empreinte vide
+        second = Conversation.objects.create()
+        with self.assertLogs('apps', level='WARNING'):
+            second.participants.add(self.user, self.contact)
+        second.refresh_from_db()
+        self.assertIsNone(second.participants_hash)
+        self.assertEqual(self.create(self.contact).data['id'], first.pk)
+
+    def test_backfill_migration(self):
+        backfill = import_module('apps.user_messages.migrations.0006_backfill_participants_hash').backfill_participants_hash
+        pair, duplicate, group = [Conversation.objects.create() for _ in range(3)]
+        pair.participants.add(self.user, self.contact)
+        with self.assertLogs('apps', level='WARNING'):
+            duplicate.participants.add(self.contact, self.user)
+        group.participants.add(self.user, self.contact, self.other)
+        empty = Conversation.objects.create()
+        Conversation.objects.update(participants_hash=None)
+
+        backfill(apps, None)
+        hashes = dict(Conversation.objects.values_list('pk', 'participants_hash'))
+        self.assertEqual(hashes, {
+            pair.pk: Conversation.compute_participants_hash([self.user.pk, self.contact.pk]),
+            duplicate.pk: None,
+            group.pk: Conversation.compute_participants_hash([self.user.pk, self.contact.pk, self.other.pk]),
+            empty.pk: None,
+        })
+
+class MessageNotificationTests(TestCase):
+    def setUp(self):
+        # Tâches exécutées immédiatement, comme par un worker
+        conf = notify_message_recipients.app.conf
+        for name in ('task_always_eager', 'task_eager_propagates'):
+            self.addCleanup(setattr, conf, name, getattr(conf, name))
+            setattr(conf, name, True)
+
+        self.sender, self.first, self.second, self.muted, self.blocking = [
+            User.objects.create_user(email=f'{name}@example.com', username=name, password='x')
+            for name in ('sender', 'first', 'second', 'muted', 'blocking')
+        ]
+        UserMessagingSettings.objects.filter(user=self.muted).update(messaging_enabled=False)
+        self.blocking.messaging_settings.blocked_users.add(self.sender)
+
+        self.conversation = Conversation.objects.create()
+        self.conversation.participants.add(self.sender, self.first, self.second, self.muted, self.blocking)
+        self.client = APIClient()
+        self.client.force_authenticate(self.sender)
+
+    def send(self, content):
+        return self.client.post('/api/messages/', {
+            'conversation': self.conversation.pk, 'sender': self.sender.pk, 'content': content
+        }, format='json')
+
+    def test_recipients_notified_once_by_task(self):
+        with mock.patch.object(notify_message_recipients, 'delay', wraps=notify_message_recipients.delay) as delay:
+            with self.captureOnCommitCallbacks() as callbacks:
+                response = self.send('Bonjour à tous')
+            self.assertEqual(response.status_code, 201)
+
+            # Rien n'est fait dans la requête: la tâche est programmée après la validation
+            delay.assert_not_called()
+            self.assertFalse(Notification.objects.exists())
+
+            for callback in callbacks:
+                callback()
+            delay.assert_called_once_with(response.data['id'])
+
+        notifications = Notification.objects.filter(notification_type='new_message')
+        self.assertEqual(
+            sorted(notifications.values_list('user_id', flat=True)),
+            sorted([self.first.pk, self.second.pk])
+        )
+        notification = notifications.first()
+        self.assertEqual((notification.title, notification.message), ('Nouveau message de sender', 'Bonjour à tous'))
+        self.assertEqual(notification.extra_data, {'message_id': response.data['id'], 'sender_id': self.sender.pk})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.send('Deuxième message ' + 'x' * 100)
+        for user in (self.first, self.second):
+            self.assertEqual(Notification.objects.filter(user=user, notification_type='new_message').count(), 2)
+        self.assertFalse(Notification.objects.filter(user__in=[self.sender, self.muted, self.blocking]).exists())
+
+    def test_bulk_insert_query_count(self):
+        message = Message.objects.create(conversation=self.conversation, sender=self.sender, content='Bonjour')
+        # Message, destinataires, insertion groupée (le badge des messages est tenu par signal)
+        with self.assertNumQueries(3):
+            self.assertEqual(notify_message_recipients(message.id), 2)
+        self.assertEqual(notify_message_recipients(message.id + 100), 0)
@@ -2,27 +2,73 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from .models import Conversation, Message, UserMessagingSettings
+from rest_framework.pagination import CursorPagination
+from .models import Conversation, ConversationReadState, Message, UserMessagingSettings
 from .serializers import ConversationSerializer, MessageSerializer, UserMessagingSettingsSerializer
-from django.db.models import Q
+from django.db.models import F, Func, IntegerField, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce, Substr
 from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
+from apps.core.throttling import WRITE_THROTTLES
 
 User = get_user_model()
 
+class MessageCursorPagination(CursorPagination):
+    """Pagination par curseur (keyset) des messages, du plus récent au plus ancien"""
+    ordering = '-created_at'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+def message_queryset():
+    """Messages avec leur expéditeur (les accusés de lecture proviennent des repères de lecture)"""
+    return Message.objects.select_related('sender')
+
 class ConversationViewSet(viewsets.ModelViewSet):
     serializer_class = ConversationSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    # Longueur de l'aperçu du dernier message
+    PREVIEW_LENGTH = 100
+
     def get_queryset(self):
-        """Renvoie les conversations auxquelles l'utilisateur participe"""
-        return Conversation.objects.filter(participants=self.request.user)
+        """
+        Renvoie les conversations auxquelles l'utilisateur participe, avec le
+        dernier message et le nombre de messages non lus calculés par sous-requêtes
+        """
+        user = self.request.user
+        last_message = Message.objects.filter(conversation=OuterRef('pk')).order_by('-created_at', '-id')
+        read_watermark = ConversationReadState.objects.filter(
+            conversation=OuterRef('pk'),
+            user=user
+        ).values('last_read_message_id')[:1]
+        unread = Message.objects.filter(
+            conversation=OuterRef('pk'),
+            id__gt=OuterRef('read_watermark')
+        ).exclude(sender=user).order_by().annotate(
+            count=Func(F('pk'), function='COUNT', output_field=IntegerField())
+        ).values('count')
+
+        return Conversation.objects.filter(participants=user).annotate(
+            last_message_id=Subquery(last_message.values('id')[:1]),
+            last_message_sender_id=Subquery(last_message.values('sender_id')[:1]),
+            last_message_preview=Subquery(last_message.annotate(
+                preview=Substr('content', 1, self.PREVIEW_LENGTH)
+            ).values('preview')[:1]),
+            last_message_at=Subquery(last_message.values('created_at')[:1]),
+            read_watermark=Coalesce(Subquery(read_watermark), 0)
+        ).annotate(
+            unread_count=Coalesce(Subquery(unread), 0),
+            last_activity=Coalesce('last_message_at', 'created_at')
+        ).prefetch_related(
+            Prefetch('participants', queryset=User.objects.only('id', 'first_name', 'last_name', 'username', 'email'))
+        ).order_by('-last_activity', '-id')
 
     def perform_create(self, serializer):
         """Ajoute automatiquement l'utilisateur actuel comme participant"""
-        conversation = serializer.save()
-        if self.request.user not in conversation.participants.all():
-            conversation.participants.add(self.request.user)
+        participants = set(serializer.validated_data.get('participants', []))
+        participants.add(self.request.user)
+        serializer.save(participants=list(participants))
 
     def create(self, request, *args, **kwargs):
         # Vérifier si la conversation existe déjà entre ces participants
@@ -31,14 +77,16 @@ class ConversationViewSet(viewsets.ModelViewSet):
             participants.add(request.user.id)  # Ajouter l'utilisateur actuel
             
             # Chercher une conversation existante avec exactement ces participants
-            existing_conversations = Conversation.objects.all()
+            try:
+                participants_hash = Conversation.compute_participants_hash(participants)
+            except (TypeError, ValueError):
+                participants_hash = None  # Identifiants invalides: la validation du serializer répondra
             
-            for conv in existing_conversations:
-                conv_participants = set(conv.participants.values_list('id', flat=True))
-                if conv_participants == participants:
-                    # Conversation trouvée, renvoyer l'existante
-                    serializer = self.get_serializer(conv)
-                    return Response(serializer.data, status=status.HTTP_200_OK)
+            existing = Conversation.objects.filter(participants_hash=participants_hash).first() if participants_hash else None
+            if existing:
+                # Conversation trouvée, renvoyer l'existante
+                serializer = self.get_serializer(self.get_queryset().get(pk=existing.pk))
+                return Response(serializer.data, status=status.HTTP_200_OK)
         
         # Si on n'a pas trouvé de conversation existante, en créer une nouvelle
         return super().create(request, *args, **kwargs)
@@ -78,20 +126,71 @@ class ConversationViewSet(viewsets.ModelViewSet):
             'is_starred': conversation.is_starred
         })
 
+    @action(detail=True, methods=['get'])
+    def messages(self, request, pk=None):
+        """Messages de la conversation, paginés par curseur (?cursor=...)"""
+        conversation = get_object_or_404(Conversation, pk=pk, participants=request.user)
+        paginator = MessageCursorPagination()
+        page = paginator.paginate_queryset(
+            message_queryset().filter(conversation=conversation),
+            request,
+            view=self
+        )
+        serializer = MessageSerializer(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['post'])
+    def mark_read(self, request, pk=None):
+        """Marque la conversation comme lue jusqu'au message indiqué (par défaut le dernier)"""
+        conversation = get_object_or_404(Conversation, pk=pk, participants=request.user)
+        messages = Message.objects.filter(conversation=conversation)
+        
+        message_id = request.data.get('message')
+        if message_id is not None:
+            try:
+                message_id = int(message_id)
+            except (TypeError, ValueError):
+                return Response({'error': 'Invalid message id'}, status=400)
+            message = messages.filter(pk=message_id).values_list('id', flat=True).first()
+            if message is None:
+                return Response({'error': 'Message not found'}, status=404)
+        else:
+            message = messages.order_by('-id').values_list('id', flat=True).first()
+        
+        newly_read = ConversationReadState.mark_read(request.user.pk, conversation.pk, message) if message else 0
+        return Response({'status': 'success', 'last_read_message': message, 'newly_read': newly_read})
+
+    @action(detail=True, methods=['get'])
+    def read_receipts(self, request, pk=None):
+        """Repères de lecture des participants: un message est lu par ceux dont le repère est supérieur ou égal à son identifiant"""
+        conversation = get_object_or_404(Conversation, pk=pk, participants=request.user)
+        return Response(list(
+            ConversationReadState.objects.filter(conversation=conversation).values(
+                'user_id', 'last_read_message_id', 'last_read_at'
+            )
+        ))
+
 
 class MessageViewSet(viewsets.ModelViewSet):
     serializer_class = MessageSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = MessageCursorPagination
+    throttle_classes = WRITE_THROTTLES
+    throttle_scopes = {'create': 'messages'}
+
+    def get_throttle_resource(self, request):
+        """Débit d'envoi par conversation"""
+        return request.data.get('conversation') if isinstance(request.data, dict) else None
 
     def get_queryset(self):
         """Renvoie les messages des conversations auxquelles l'utilisateur participe"""
         conversation_id = self.request.query_params.get('conversation')
         if conversation_id:
-            return Message.objects.filter(
+            return message_queryset().filter(
                 conversation_id=conversation_id,
                 conversation__participants=self.request.user
             )
-        return Message.objects.filter(
+        return message_queryset().filter(
             conversation__participants=self.request.user
         )
 
@@ -101,9 +200,9 @@ class MessageViewSet(viewsets.ModelViewSet):
         
     @action(detail=True, methods=['post'])
     def mark_as_read(self, request, pk=None):
-        """Marque un message comme lu par l'utilisateur actuel"""
+        """Marque un message (et les précédents de la conversation) comme lu par l'utilisateur actuel"""
         message = self.get_object()
-        message.read_by.add(request.user)
+        ConversationReadState.mark_read(request.user.pk, message.conversation_id, message.id)
         return Response({'status': 'message marked as read'})
         
     @action(detail=True, methods=['post'])
@@ -13,4 +13,6 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
+# Le flux temps réel /api/realtime/events/ (Server-Sent Events) garde les connexions
+# ouvertes: servir l'application avec un serveur ASGI (uvicorn, daphne) plutôt qu'en WSGI.
 application = get_asgi_application()
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 import os
+import sys
 from datetime import timedelta
 from pathlib import Path
 
@@ -74,6 +75,31 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'apps.analytics.tasks.clean_old_reports',
         'schedule': crontab(hour=0, minute=0, day_of_week=1),  # Lundi à minuit
     },
+    # Recalculer les prévisions de revenus de tous les organisateurs
+    'refresh-revenue-forecasts': {
+        'task': 'apps.analytics.tasks.refresh_revenue_forecasts',
+        'schedule': crontab(minute=30),  # Chaque heure à la minute 30
+    },
+    # Reprendre les notifications en attente (nouvelles tentatives, lots expirés)
+    'dispatch-notifications': {
+        'task': 'apps.notifications.tasks.dispatch_notifications',
+        'schedule': crontab(),  # Chaque minute
+    },
+    # Mettre à jour les scores des événements tendance
+    'update-trending-events': {
+        'task': 'apps.events.tasks.update_trending_events',
+        'schedule': crontab(minute='*/5'),  # Toutes les 5 minutes
+    },
+    # Recalculer les recommandations d'événements
+    'refresh-recommendations': {
+        'task': 'apps.events.tasks.refresh_recommendations',
+        'schedule': crontab(hour=2, minute=0),  # Chaque jour à 2h
+    },
+    # Corriger la dérive éventuelle des compteurs de non-lus
+    'reconcile-unread-counters': {
+        'task': 'apps.notifications.tasks.reconcile_unread_counters',
+        'schedule': crontab(hour=3, minute=0),  # Chaque jour à 3h
+    },
 }
 
 # Configuration des bibliothèques d'analyse
@@ -93,6 +119,89 @@ ANALYTICS = {
     'MAX_DATA_POINTS': 100,  # Nombre maximal de points de données à afficher dans les graphiques
     'DEFAULT_DASHBOARD_THEME': 'light',
     'ALLOWED_EXPORT_FORMATS': ['pdf', 'csv', 'json'],
+    'FORECAST_CACHE_TIMEOUT': 3600,  # Durée de mise en cache des tendances et prévisions de revenus en secondes
+    'FORM_ANALYSIS_CACHE_TIMEOUT': 7 * 24 * 3600,  # Durée de conservation de l'état incrémental d'analyse des formulaires
+}
+
+# Configuration des notifications
+NOTIFICATIONS = {
+    'BULK_BATCH_SIZE': 500,  # Nombre de destinataires traités par sous-tâche d'envoi groupé
+    'TEMPLATE_VERSION_CHECK_INTERVAL': 5,  # Intervalle (s) de vérification des templates modifiés par un autre processus
+    # File d'envoi (outbox) des canaux email, SMS et push
+    'OUTBOX_CHANNELS': {
+        'email': {'BATCH_SIZE': 100, 'MAX_IN_FLIGHT': 200},  # Taille de lot et envois simultanés maximum
+        'sms': {'BATCH_SIZE': 50, 'MAX_IN_FLIGHT': 50},
+        'push': {'BATCH_SIZE': 500, 'MAX_IN_FLIGHT': 1000},
+    },
+    'OUTBOX_MAX_ATTEMPTS': 5,  # Tentatives avant abandon (dead letter)
+    'OUTBOX_RETRY_BASE_DELAY': 60,  # Délai (s) avant la 2e tentative, doublé à chaque échec
+    'OUTBOX_RETRY_MAX_DELAY': 3600,  # Délai maximal (s) entre deux tentatives
+    'OUTBOX_LEASE_TIMEOUT': 300,  # Durée (s) de réservation d'un lot par un worker
+    'OUTBOX_DISPATCH_TIME_LIMIT': 50,  # Durée maximale (s) d'un vidage de la file
+    'TRANSPORTS': {
+        'email': 'apps.notifications.transports.EmailTransport',
+        'sms': os.environ.get('SMS_TRANSPORT', 'apps.notifications.transports.ConsoleTransport'),
+        'push': os.environ.get('PUSH_TRANSPORT', 'apps.notifications.transports.ConsoleTransport'),
+    },
+    'TRANSPORT_FILE_PATH': os.path.join(BASE_DIR, 'logs', 'notifications.log'),  # Utilisé par FileTransport
+    'BADGE_CACHE_TIMEOUT': 300,  # Durée (s) de mise en cache des compteurs de non-lus par utilisateur
+    # Notifications en temps réel (Server-Sent Events sur le serveur ASGI)
+    # Les événements sont publiés par les workers Celery: InMemoryBroker ne convient qu'à un processus unique
+    'REALTIME_BROKER': os.environ.get('REALTIME_BROKER', 'apps.notifications.realtime.RedisBroker'),
+    'REALTIME_REDIS_URL': os.environ.get('REALTIME_REDIS_URL', 'redis://localhost:6379/0'),
+    'REALTIME_QUEUE_SIZE': 100,  # Événements en attente par connexion avant resynchronisation du client
+    'REALTIME_MAX_CONNECTIONS_PER_USER': 5,  # Les connexions les plus anciennes sont fermées au-delà
+    'REALTIME_HEARTBEAT_INTERVAL': 15,  # Intervalle (s) des messages de maintien de connexion
+}
+
+# Authentification par jeton (voir apps.accounts.authentication)
+ACCOUNTS = {
+    'USER_CACHE_TIMEOUT': 30,  # Durée (s) du cache des utilisateurs par processus: délai maximal de prise en compte d'une révocation
+    'USER_CACHE_MAX_SIZE': 10000,  # Utilisateurs conservés par processus
+}
+
+# Inscriptions et billetterie
+REGISTRATIONS = {
+    'DISCOUNT_CACHE_TIMEOUT': 60,  # Durée (s) de mise en cache des définitions de codes promo (et des codes inexistants)
+}
+
+# Détection des événements en double (MinHash et LSH)
+EVENTS = {
+    'DUPLICATE_NUM_PERM': 128,  # Nombre de fonctions de hachage de la signature MinHash
+    'DUPLICATE_BANDS': 32,  # Bandes LSH (4 valeurs par bande: paires candidates à partir d'une similarité ≈ 0.42)
+    'DUPLICATE_SHINGLE_SIZE': 3,  # Nombre de mots par fragment de texte
+    'DUPLICATE_THRESHOLD': 0.5,  # Similarité de Jaccard estimée minimale d'un doublon probable
+    'DUPLICATE_MAX_BUCKET_SIZE': 200,  # Compartiments plus grands ignorés par le balayage du catalogue
+    # Recommandations d'événements
+    'RECOMMENDATIONS_SIZE': 20,  # Nombre de recommandations précalculées par utilisateur
+    'RECOMMENDATION_NEIGHBORS': 50,  # Événements similaires conservés par événement (filtrage collaboratif)
+    'RECOMMENDATION_MAX_HISTORY': 100,  # Interactions les plus fortes retenues par utilisateur
+    'RECOMMENDATION_CONTENT_WEIGHT': 0.3,  # Part des catégories et tags dans le score (le reste: co-inscriptions)
+    'RECOMMENDATION_POPULARITY_WEIGHT': 0.05,  # Départage par popularité
+    'RECOMMENDATION_BATCH_SIZE': 1000,  # Utilisateurs évalués par lot
+    'POPULAR_EVENTS_CACHE_TIMEOUT': 3600,  # Durée (s) de mise en cache des événements populaires (démarrage à froid)
+    # Événements tendance
+    'TRENDING_HALF_LIFE_HOURS': 24,  # Une activité perd la moitié de son poids toutes les 24 heures
+    'TRENDING_REGISTRATION_WEIGHT': 1.0,  # Poids d'une inscription
+    'TRENDING_VIEW_WEIGHT': 0.05,  # Poids d'une vue (20 vues valent une inscription)
+    'TRENDING_RATING_WEIGHT': 1.0,  # Poids d'une note de 5 étoiles (proportionnel au nombre d'étoiles)
+    'TRENDING_LOCK_TIMEOUT': 600,  # Durée (s) maximale du verrou empêchant deux mises à jour simultanées
+}
+
+# Configuration des avis sur les événements
+FEEDBACK = {
+    'RATING_PRIOR_MEAN': 3.5,  # Note a priori de la moyenne bayésienne
+    'RATING_PRIOR_WEIGHT': 10,  # Nombre d'avis fictifs à la note a priori (lisse les notes des événements peu évalués)
+    # Classement des meilleurs avis
+    'RANKING_HALF_LIFE_DAYS': 30,  # Un avis perd la moitié de son poids tous les 30 jours
+    'RANKING_COMMENT_WEIGHT': 1.0,  # Bonus maximal d'un commentaire détaillé (poids x2)
+    'RANKING_COMMENT_LENGTH': 280,  # Longueur de commentaire donnant le bonus maximal
+    'RANKING_FEATURED_BOOST': 3.0,  # Multiplicateur des avis mis en avant
+    'TOP_REVIEWS_SIZE': 10,  # Nombre d'avis de la liste des meilleurs avis d'un événement
+    'TOP_REVIEWS_CACHE_TIMEOUT': 600,  # Durée (s) de mise en cache de cette liste
+    # File de modération des signalements
+    'MODERATION_VELOCITY_HALF_LIFE_HOURS': 6,  # Un signalement perd la moitié de son poids toutes les 6 heures
+    'MODERATION_VERIFIED_REPORTER_BOOST': 1.5,  # Multiplicateur de confiance des utilisateurs vérifiés
 }
 
 X_FRAME_OPTIONS = 'SAMEORIGIN'  # Requis pour l'éditeur de couleurs
@@ -232,6 +341,24 @@ DATABASES = {
     }
 }
 
+# Cache partagé par tous les processus (web, ASGI, workers Celery): limitation
+# de débit, versions des templates de notification, verrous des tâches
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.redis.RedisCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'redis://localhost:6379/1'),
+    }
+}
+
+# Tests: cache local en mémoire (un seul processus), sauf backend imposé
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+if TESTING and 'CACHE_BACKEND' not in os.environ:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -279,7 +406,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.accounts.authentication.LazyJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_FILTER_BACKENDS': [
@@ -287,6 +414,24 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # Débits des points d'écriture limités (voir apps.core.throttling):
+    # '<portée>' par utilisateur, '<portée>_ip' par adresse IP, '<portée>_resource' par ressource visée
+    'DEFAULT_THROTTLE_RATES': {
+        'registrations': '10/min',
+        'registrations_ip': '30/min',
+        'registrations_resource': '600/min',  # Par événement
+        'password_reset_ip': '10/hour',
+        'password_reset_resource': '3/hour',  # Par adresse email
+        'discount_validation': '10/min',
+        'discount_validation_ip': '30/min',
+        'discount_validation_resource': '60/min',  # Par code promo
+        'discount_check': '20/min',
+        'discount_check_ip': '60/min',
+        'discount_check_resource': '1200/min',  # Par événement
+        'messages': '30/min',
+        'messages_ip': '120/min',
+        'messages_resource': '120/min',  # Par conversation
+    },
 }
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Eventez API',
@@ -28,7 +28,7 @@ from apps.events.views import EventViewSet, EventCategoryViewSet, EventTagViewSe
 from apps.registrations.views import RegistrationViewSet, TicketTypeViewSet, TicketPurchaseViewSet, DiscountViewSet
 from apps.payments.views import PaymentViewSet, RefundViewSet, InvoiceViewSet
 from apps.feedback.views import EventFeedbackViewSet, EventFlagViewSet, EventValidationViewSet
-from apps.notifications.views import NotificationViewSet, NotificationTemplateViewSet
+from apps.notifications.views import NotificationViewSet, NotificationTemplateViewSet, notification_stream
 from apps.user_messages.views import ConversationViewSet, MessageViewSet, UserMessagingSettingsViewSet
 from rest_framework import routers
 from apps.accounts import views as accounts_views
@@ -77,6 +77,7 @@ urlpatterns = [
     path('api/register/organizer/', OrganizerRegistrationView.as_view(), name='organizer-register'),
     path('api/token/refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'),
     path('api/analytics/', include('apps.analytics.urls')),
+    path('api/realtime/events/', notification_stream, name='notification-stream'),
     
      # Schéma OpenAPI
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),